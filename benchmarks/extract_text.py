@@ -0,0 +1,115 @@
+"""Compare the streaming text extractor with the BeautifulSoup tree walk it replaced
+
+Usage:
+    python benchmarks/extract_text.py [--size-mb 20] [FILING.htm ...]
+
+Without filings a synthetic 10-K shaped document of --size-mb megabytes is used.
+Each extractor runs once for timing and once under tracemalloc for peak memory.
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+from pyseek import htmltext
+
+BLOCKS = ["p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "td", "th"]
+
+
+def soup_extract_text(report: str) -> str:
+    """The BeautifulSoup implementation of submissions.extractText before it was replaced"""
+
+    def _extract_blocks(parent_tag) -> list:
+        extracted_blocks = []
+        for tag in parent_tag:
+            if tag.name in BLOCKS:
+                extracted_blocks.append(tag)
+                continue
+            if isinstance(tag, Tag):
+                if len(tag.contents) > 0:
+                    extracted_blocks.extend(_extract_blocks(tag))
+        return extracted_blocks
+
+    soup = BeautifulSoup(report, features="lxml")
+    return "\n".join(block.get_text().strip() for block in _extract_blocks(soup.body))
+
+
+def synthetic_filing(size_mb: float, seed: int = 0) -> str:
+    """Build a document with the paragraph/table mix of a typical 10-K"""
+    rng = random.Random(seed)
+    words = "revenue net income risk factors liquidity capital resources market".split()
+    parts = ["<html><head><title>10-K</title></head><body>"]
+    size = 0
+    item = 0
+    while size < size_mb * 1024 * 1024:
+        item += 1
+        section = [f'<div style="margin-top:12pt"><h2>Item {item}.</h2>']
+        for _ in range(20):
+            text = " ".join(rng.choice(words) for _ in range(60))
+            section.append(
+                f'<div><p style="font-family:Times"><span>{text}</span></p></div>'
+            )
+        section.append("<table>")
+        for _ in range(15):
+            cells = "".join(
+                f'<td style="padding:2px"><p>$ {rng.randint(1, 99999):,}</p></td>'
+                for _ in range(6)
+            )
+            section.append(f"<tr>{cells}</tr>")
+        section.append("</table></div>")
+        chunk = "".join(section)
+        parts.append(chunk)
+        size += len(chunk)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def measure(function, report):
+    start = time.perf_counter()
+    result = function(report)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function(report)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("filings", nargs="*", type=Path)
+    parser.add_argument("--size-mb", type=float, default=20)
+    args = parser.parse_args()
+
+    if args.filings:
+        reports = [
+            (path.name, path.read_text(errors="replace")) for path in args.filings
+        ]
+    else:
+        reports = [(f"synthetic {args.size_mb:g} MB", synthetic_filing(args.size_mb))]
+
+    for name, report in reports:
+        mb = len(report) / 1024**2
+        print(f"{name}: {mb:.1f} MB")
+        expected, soup_seconds, soup_peak = measure(soup_extract_text, report)
+        result, stream_seconds, stream_peak = measure(htmltext.extract_text, report)
+        for label, seconds, peak in [
+            ("beautifulsoup", soup_seconds, soup_peak),
+            ("streaming", stream_seconds, stream_peak),
+        ]:
+            print(
+                f"  {label:<14} {seconds:7.2f}s {mb / seconds:8.1f} MB/s"
+                f"  peak {peak / 1024**2:8.1f} MB"
+            )
+        print(
+            f"  speedup {soup_seconds / stream_seconds:.1f}x, same output: {result == expected}"
+        )
+
+
+if __name__ == "__main__":
+    main()
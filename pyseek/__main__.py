@@ -1,12 +1,44 @@
 """Holds the main entry point for the CLI"""
 
+import requests
 import typer
-from typing import Optional
-from . import _read, edgar, models, config, utils, setup, submissions
+from pathlib import Path
+from typing import List, Optional
+from . import (
+    _read,
+    archives,
+    bulk,
+    cache,
+    concepts,
+    extract,
+    edgar,
+    frames,
+    fullindex,
+    models,
+    config,
+    utils,
+    setup,
+    submissions,
+    session,
+    ratelimit,
+    search,
+    sections,
+    stream,
+    syncstate,
+    tables,
+    tickers,
+    warehouse,
+)
 from pyseek import __app_name__, __version__, SUCCESS
 
 app = typer.Typer()
 app.add_typer(submissions.app, name="submissions")
+app.add_typer(cache.app, name="cache")
+app.add_typer(warehouse.app, name="warehouse")
+app.add_typer(archives.app, name="archives")
+app.add_typer(fullindex.app, name="index")
+app.add_typer(sections.app, name="sections")
+app.add_typer(tables.app, name="tables")
 
 
 def _version_callback(value: bool) -> None:
@@ -50,13 +82,20 @@ def init(
     result = config.init_config(user_agent)
     if result == SUCCESS:
         typer.echo("Configuration file created successfully")
+        session.close_session()
+        ratelimit.reset_limiter()
+        cache.reset_cache()
+        syncstate.reset_state()
         if download:
             typer.echo(f"Downloading company tickers information")
-            tickers = edgar.get_cik_numbers()
-            config.create_file(filename="company_tickers.json")
+            company_tickers = edgar.get_cik_numbers()
+            config.create_file(filename=tickers.TICKERS_FILE)
             utils.write_file(
-                tickers, "company_tickers.json", directory=setup.CONFIGURATION_DIRECTORY
+                company_tickers,
+                tickers.TICKERS_FILE,
+                directory=setup.CONFIGURATION_DIRECTORY,
             )
+            tickers.build_index(company_tickers)
 
 
 @app.command("settings")
@@ -83,6 +122,27 @@ def get_cik(
         print(edgar.get_cik_number(ticker))
 
 
+@app.command()
+def find_company(
+    query: str = typer.Argument(..., help="Ticker or (part of) the company name"),
+    limit: int = typer.Option(10, "--limit", "-n", help="Number of results"),
+):
+    """Search the stored company tickers by ticker or company name"""
+    for company in tickers.get_index().search(query, limit=limit):
+        print(models.CIK(**company))
+
+
+def _get_submissions(company: models.CIK) -> dict:
+    """The company's submissions document, exiting with an error when it cannot be fetched"""
+    try:
+        return utils.get_json(edgar.submissions_url(company.cik_str))
+    except (requests.RequestException, ValueError) as err:
+        typer.echo(
+            f"Could not fetch the submissions of {company.ticker}: {err}", err=True
+        )
+        raise typer.Exit(code=1)
+
+
 @app.command()
 def company_facts(
     company: str = typer.Argument(..., help="CIK number or ticker of the company"),
@@ -92,13 +152,51 @@ def company_facts(
         "-c",
         help="Print the company concepts categories for the company",
     ),
+    table: Path = typer.Option(
+        None,
+        "--table",
+        "-t",
+        help="Also add the facts to the parquet facts table in this directory",
+    ),
+    force: bool = typer.Option(
+        False, "--force", help="Download even if nothing was filed since last time"
+    ),
 ) -> dict:
-    """Get all the company facts for a given company"""
+    """Get all the company facts for a given company
+
+    The facts are only downloaded again when the company filed since the last time.
+    """
     company = utils.validate_ticker_or_cik(company)
-    result = edgar.get_all_company_facts(company.cik_str)
-    utils.write_file(result, company.ticker + "_facts.json")
+    filename = company.ticker + "_facts.json"
+    state = syncstate.get_state()
+    # --force downloads without asking what was filed, and so records nothing
+    latest = None if force else syncstate.latest_accession(_get_submissions(company))
+    if (
+        force
+        or not Path(filename).exists()
+        or state.changed(company.cik_str, models.Dataset.facts.value, latest)
+    ):
+        try:
+            utils.write_stream(
+                utils.stream_content(edgar.company_facts_url(company.cik_str)),
+                filename,
+            )
+        except requests.RequestException as err:
+            typer.echo(
+                f"Could not download the facts of {company.ticker}: {err}", err=True
+            )
+            raise typer.Exit(code=1)
+        if not force:
+            state.record(company.cik_str, models.Dataset.facts.value, latest)
+    else:
+        typer.echo(f"{filename} is up to date")
     if show_concepts_categories:
-        print(result.get("facts").keys())
+        taxonomies = {}
+        for taxonomy, _, _ in stream.iter_concepts(stream.read_chunks(filename)):
+            taxonomies[taxonomy] = None
+        print(taxonomies.keys())
+    if table:
+        _read.write_facts_table(_read.read_facts(filename), table)
 
 
 @app.command()
@@ -123,6 +221,94 @@ def company_concept(
     utils.write_file(result, company.ticker + "_" + concept + ".json")
 
 
+@app.command("concepts")
+def concepts_table(
+    companies: List[str] = typer.Argument(
+        ..., help="CIK numbers or tickers of the companies, or 'all'"
+    ),
+    names: List[str] = typer.Option(
+        ...,
+        "--concept",
+        "-c",
+        help="Concepts to get, e.g. Revenues or dei:EntityCommonStockSharesOutstanding",
+    ),
+    output: Path = typer.Option(
+        Path("concepts.csv"), "--output", "-o", help="A .csv or .parquet file"
+    ),
+    all_filings: bool = typer.Option(
+        False, "--all-filings", help="Keep every filed value, not just the latest"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of concurrent requests"
+    ),
+):
+    """Get several concepts for many companies into one table"""
+    companies = bulk.resolve_companies(companies)
+    with typer.progressbar(length=len(companies), label="Fetching") as progress:
+        result = concepts.get_concepts(
+            companies,
+            names,
+            workers=workers,
+            latest=not all_filings,
+            callback=lambda company: progress.update(1),
+        )
+    if output.suffix == ".parquet":
+        result.facts.to_parquet(output, index=False)
+    else:
+        result.facts.to_csv(output, index=False)
+    typer.echo(
+        f"{len(result.facts)} facts from {result.facts_documents} companyfacts documents "
+        f"and {result.concept_requests} companyconcept requests in {result.seconds:.1f}s"
+    )
+    for failure in result.failed:
+        typer.echo(failure, err=True)
+
+
+@app.command("frames")
+def frames_panel(
+    concept: str = typer.Argument(..., help="The concept, e.g. Revenues"),
+    unit: str = typer.Option("USD", "--unit", "-u", help="Unit of measure"),
+    taxonomy: str = typer.Option("us-gaap", "--taxonomy", "-t", help="Taxonomy"),
+    first: int = typer.Option(2010, "--from", help="First calendar year"),
+    last: int = typer.Option(2024, "--to", help="Last calendar year"),
+    quarterly: bool = typer.Option(
+        False, "--quarterly", "-q", help="Quarterly instead of annual periods"
+    ),
+    instantaneous: bool = typer.Option(
+        False,
+        "--instantaneous",
+        "-i",
+        help="Values at the end of each quarter, for balance sheet concepts",
+    ),
+    output: Path = typer.Option(
+        None, "--output", "-o", help="Write the panel to a .csv or .parquet file"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of concurrent requests"
+    ),
+):
+    """Get a concept for every filer over a range of calendar periods"""
+    try:
+        df = frames.get_panel(
+            concept,
+            frames.periods(first, last, quarterly, instantaneous),
+            unit=unit,
+            taxonomy=taxonomy,
+            workers=workers,
+        )
+    except (requests.RequestException, ValueError) as err:
+        # a missing period would leave a hole in the panel, so nothing is written
+        typer.echo(f"Could not fetch the {concept} frames: {err}", err=True)
+        raise typer.Exit(code=1)
+    if output is None:
+        output = Path(f"{concept}_{unit}_frames.csv")
+    if output.suffix == ".parquet":
+        df.to_parquet(output, index=False)
+    else:
+        df.to_csv(output, index=False)
+    typer.echo(f"{len(df)} facts from {df['cik'].nunique()} filers in {output}")
+
+
 @app.command(deprecated=True)
 def company_concept_categories(
     company: str = typer.Argument(..., help="CIK number or ticker of the company"),
@@ -159,20 +345,50 @@ def company_submissions(
     filename: str = typer.Option(
         None, "--filename", "-f", help="Filename to save the data"
     ),
+    recent_only: bool = typer.Option(
+        False, "--recent-only", help="Only the most recent filings, skip older pages"
+    ),
+    force: bool = typer.Option(
+        False, "--force", help="Rewrite the file even if nothing was filed since"
+    ),
 ) -> dict:
     """Get all the company submissions for a given CIK, returns a csv"""
     company = utils.validate_ticker_or_cik(company)
-    results = edgar.get_all_company_submissions(company.cik_str)
-    # utils.write_file(results, company.ticker + "_submissions.json")
-    df = _read.read_submissions(results)
-
     if not filename:
         filename = f"{company.ticker}_submissions.csv"
     else:
         if not filename.endswith(".csv"):
             filename = filename + ".csv"
 
+    results = _get_submissions(company)
+    latest = syncstate.latest_accession(results)
+    state = syncstate.get_state()
+    dataset = models.Dataset.submissions.value
+    # only the complete history is tracked, --recent-only always writes
+    if (
+        not force
+        and not recent_only
+        and Path(filename).exists()
+        and not state.changed(company.cik_str, dataset, latest)
+    ):
+        typer.echo(f"{filename} is up to date")
+        return
+    if recent_only:
+        df = _read.read_submissions(results)
+    else:
+        try:
+            pages = edgar.get_submissions_pages(results)
+        except (requests.RequestException, ValueError) as err:
+            typer.echo(
+                f"Could not fetch the older submissions of {company.ticker}: {err}",
+                err=True,
+            )
+            raise typer.Exit(code=1)
+        df = _read.read_submissions(results, pages)
+
     df.to_csv(filename, index=False)
+    if not recent_only:
+        state.record(company.cik_str, dataset, latest)
 
 
 @app.command()
@@ -190,6 +406,9 @@ def download_submission(
         "-f",
         help="The name of the file to create holding the company submission information",
     ),
+    compression: models.Compression = typer.Option(
+        models.Compression.none, "--compress", "-c", help="Compress the file"
+    ),
 ) -> dict:
     """Download a company submission for a given CIK"""
     if not isinstance(cik_number, int):
@@ -200,10 +419,162 @@ def download_submission(
     if not filename:
         filename = f"{cik_number}_{accession_number}_{primaryDocument}.txt"
 
-    result = edgar.download_company_submission(
-        cik_number, accession_number, primaryDocument
+    edgar.download_company_submission_to_file(
+        cik_number, accession_number, primaryDocument, filename, compression
+    )
+
+
+@app.command("bulk")
+def bulk_fetch(
+    companies: List[str] = typer.Argument(
+        ..., help="CIK numbers or tickers of the companies, or 'all'"
+    ),
+    datasets: List[models.Dataset] = typer.Option(
+        list(models.Dataset), "--dataset", "-d", help="Which documents to fetch"
+    ),
+    directory: Path = typer.Option(
+        Path("bulk"), "--directory", "-o", help="Directory to write the documents to"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of concurrent requests"
+    ),
+    refresh: bool = typer.Option(
+        False,
+        "--refresh",
+        "-r",
+        help="Update existing documents, facts only for companies that filed since",
+    ),
+):
+    """Fetch submissions and company facts for many companies at once
+
+    Documents already in the directory are skipped, so an interrupted run can be
+    restarted. With --refresh the directory is brought up to date instead.
+    """
+    companies = bulk.resolve_companies(companies)
+    with typer.progressbar(
+        length=len(companies) * len(datasets), label="Fetching"
+    ) as progress:
+        result = bulk.fetch_all(
+            companies,
+            datasets,
+            directory=directory,
+            workers=workers,
+            callback=lambda path: progress.update(1),
+            refresh=refresh,
+        )
+    typer.echo(
+        f"fetched {result.fetched}, skipped {result.skipped}, failed {len(result.failed)} "
+        f"in {result.seconds:.1f}s ({result.rate:.1f} req/s)"
+    )
+    for failure in result.failed:
+        typer.echo(failure, err=True)
+
+
+@app.command("extract")
+def extract_text(
+    source: Path = typer.Argument(
+        ...,
+        help="Directory of downloaded filings, or a file listing one filing per line",
+    ),
+    output: Path = typer.Option(
+        Path("text"), "--output", "-o", help="Output directory, or .jsonl file"
+    ),
+    output_format: models.TextFormat = typer.Option(
+        models.TextFormat.text,
+        "--format",
+        "-f",
+        help="One .txt per filing or a single jsonl file",
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of processes, defaults to the cpu count"
+    ),
+    chunksize: int = typer.Option(
+        16, "--chunksize", help="Filings handed to a worker at a time"
+    ),
+    max_memory: int = typer.Option(
+        None, "--max-memory", help="Memory limit per worker in MB"
+    ),
+    max_tasks: int = typer.Option(
+        64, "--max-tasks", help="Chunks a worker handles before it is replaced"
+    ),
+):
+    """Extract the text of downloaded filings using all cpus"""
+    filings = extract.find_filings(source)
+    with typer.progressbar(length=len(filings), label="Extracting") as progress:
+        result = extract.extract_filings(
+            filings,
+            output,
+            output_format,
+            root=source if source.is_dir() else None,
+            workers=workers,
+            chunksize=chunksize,
+            max_memory=max_memory * 1024**2 if max_memory else None,
+            max_tasks_per_worker=max_tasks,
+            callback=lambda path: progress.update(1),
+        )
+    typer.echo(
+        f"extracted {result.extracted}, failed {len(result.failed)} in {result.seconds:.1f}s "
+        f"({result.bytes / 1024**2 / result.seconds if result.seconds else 0:.1f} MB/s)"
+    )
+    for failure in result.failed:
+        typer.echo(failure, err=True)
+
+
+@app.command("search-index")
+def search_index(
+    sources: List[Path] = typer.Argument(
+        ..., help="Text files or filings, or directories searched recursively"
+    ),
+    form: str = typer.Option(
+        None,
+        "--form",
+        "-f",
+        help="Form type of the files, defaults to the one in names like AAPL_10-K.txt",
+    ),
+    directory: Path = typer.Option(
+        None, "--index", "-i", help="Index directory, defaults to the configuration"
+    ),
+):
+    """Add new and changed files to the full text search index"""
+    paths = [
+        path
+        for source in sources
+        for path in (extract.find_filings(source) if source.is_dir() else [source])
+    ]
+    index = search.SearchIndex(directory)
+    with typer.progressbar(length=len(paths), label="Indexing") as progress:
+        added = index.add(paths, form=form, callback=lambda path: progress.update(1))
+    stats = index.stats()
+    typer.echo(
+        f"indexed {added} new or changed files, {stats['documents']} documents "
+        f"in {stats['segments']} segments"
     )
-    utils.write_file(result, filename)
+    index.close()
+
+
+@app.command("search")
+def search_text(
+    query: str = typer.Argument(
+        ..., help='Words, all of which must match, and "quoted phrases"'
+    ),
+    forms: List[str] = typer.Option(
+        None, "--form", "-f", help="Only filings of these form types"
+    ),
+    phrase: bool = typer.Option(
+        False, "--phrase", "-p", help="Match the whole query as one phrase"
+    ),
+    limit: int = typer.Option(10, "--limit", "-n", help="Number of results"),
+    directory: Path = typer.Option(
+        None, "--index", "-i", help="Index directory, defaults to the configuration"
+    ),
+):
+    """Search the indexed filings, best matches first"""
+    if phrase:
+        query = f'"{query}"'
+    index = search.SearchIndex(directory)
+    for hit in index.search(query, forms=forms or None, limit=limit):
+        print(f"{hit.score:8.3f}  {hit.form or '-':8} {hit.ticker or '-':8} {hit.path}")
+    index.close()
 
 
 if __name__ == "__main__":
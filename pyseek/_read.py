@@ -1,5 +1,47 @@
 import pandas as pd
 import json
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from pyseek import stream
+
+# the filing arrays of a submissions document
+SUBMISSIONS_COLUMNS = [
+    "accessionNumber",
+    "filingDate",
+    "reportDate",
+    "acceptanceDateTime",
+    "act",
+    "form",
+    "fileNumber",
+    "filmNumber",
+    "items",
+    "size",
+    "isXBRL",
+    "isInlineXBRL",
+    "primaryDocument",
+    "primaryDocDescription",
+]
+# one row per reported value in a companyfacts document
+FACT_COLUMNS = [
+    "cik",
+    "taxonomy",
+    "tag",
+    "unit",
+    "start",
+    "end",
+    "val",
+    "accn",
+    "fy",
+    "fp",
+    "form",
+    "filed",
+    "frame",
+]
+# low cardinality strings are dictionary encoded
+CATEGORICAL_FACT_COLUMNS = ["taxonomy", "tag", "unit", "accn", "fp", "form", "frame"]
+DATE_FACT_COLUMNS = ["start", "end", "filed"]
+FACTS_TABLE_FILE = "facts.parquet"
 
 
 def load_file(file: str) -> dict:
@@ -15,41 +57,120 @@ def load_file(file: str) -> dict:
         return json.load(f)
 
 
-def read_submissions(results: dict) -> pd.DataFrame:
+def read_submissions(results: dict, pages: Iterable[dict] = ()) -> pd.DataFrame:
     """Reads the submissions file and returns a pandas dataframe
 
     Args:
-        submissions_file (str): The submissions file
+        results (dict): The submissions document
+        pages (Iterable[dict], optional): additional submissions files from
+            `edgar.get_company_submissions_history`, appended after the recent filings
 
     Returns:
         pd.DataFrame: The submissions dataframe
     """
     filings = results["filings"]
     filings = filings["recent"]
-    df = pd.DataFrame(filings)
-    return df
+    pages = list(pages)
+    if not pages:
+        return pd.DataFrame(filings)
+    # build each column once instead of concatenating a dataframe per page
+    columns = {}
+    for column, values in filings.items():
+        merged = list(values)
+        for page in pages:
+            merged.extend(page.get(column, [None] * len(page["accessionNumber"])))
+        columns[column] = merged
+    return pd.DataFrame(columns)
+
+
+def normalize_facts(records: Iterable[stream.FactRecord], cik: int) -> pd.DataFrame:
+    """Flatten company facts into one long, typed table
+
+    Args:
+        records (Iterable[stream.FactRecord]): e.g. from `stream.iter_company_facts`
+        cik (int): the company the facts belong to
+
+    Returns:
+        pd.DataFrame: one row per fact with the columns in FACT_COLUMNS
+    """
+    columns = {column: [] for column in FACT_COLUMNS[1:]}
+    for taxonomy, tag, unit, fact in records:
+        columns["taxonomy"].append(taxonomy)
+        columns["tag"].append(tag)
+        columns["unit"].append(unit)
+        for column in FACT_COLUMNS[4:]:
+            columns[column].append(fact.get(column))
+
+    df = pd.DataFrame(
+        {
+            column: pd.Categorical(values)
+            for column, values in columns.items()
+            if column in CATEGORICAL_FACT_COLUMNS
+        }
+    )
+    for column in DATE_FACT_COLUMNS:
+        df[column] = pd.to_datetime(columns[column], format="%Y-%m-%d")
+    df["val"] = pd.to_numeric(pd.Series(columns["val"], dtype="object")).astype(
+        "float64"
+    )
+    df["fy"] = pd.array(columns["fy"], dtype="Int16")
+    df.insert(0, "cik", pd.array([int(cik)] * len(df), dtype="uint32"))
+    return df[FACT_COLUMNS]
 
 
 def read_facts(facts_file: str) -> pd.DataFrame:
-    """Reads the facts file and returns a pandas dataframe
-    Problem: the facts tags don't line up exactly. more thought needed
+    """Reads a companyfacts file into one long, typed table
 
     Args:
         facts_file (str): The facts file
 
     Returns:
-        pd.DataFrame: The facts dataframe
+        pd.DataFrame: The facts dataframe, see `normalize_facts`
+    """
+    metadata = {}
+    records = list(stream.iter_company_facts(stream.read_chunks(facts_file), metadata))
+    return normalize_facts(records, metadata["cik"])
+
+
+def write_facts_table(df: pd.DataFrame, directory: str) -> List[Path]:
+    """Write normalized facts to parquet, one partition per CIK
+
+    Each company lands in `<directory>/cik=<cik>/facts.parquet`, replacing what was
+    there, so refreshing a company does not duplicate its rows.
+
+    Args:
+        df (pd.DataFrame): facts from `normalize_facts`
+        directory (str): root of the facts table
+
+    Returns:
+        List[Path]: the files written
+    """
+    written = []
+    for cik, facts in df.groupby("cik", observed=True):
+        partition = Path(directory) / f"cik={cik}"
+        partition.mkdir(parents=True, exist_ok=True)
+        path = partition / FACTS_TABLE_FILE
+        facts.drop(columns="cik").to_parquet(path, index=False)
+        written.append(path)
+    return written
+
+
+def read_facts_table(
+    directory: str,
+    columns: Optional[List[str]] = None,
+    ciks: Optional[Iterable[int]] = None,
+) -> pd.DataFrame:
+    """Load facts written by `write_facts_table`
+
+    Only the requested columns and companies are read from disk.
+
+    Args:
+        directory (str): root of the facts table
+        columns (List[str], optional): columns to load. Defaults to all of them.
+        ciks (Iterable[int], optional): companies to load. Defaults to all of them.
+
+    Returns:
+        pd.DataFrame: the facts
     """
-    try:
-        fp = load_file(facts_file)
-        facts = fp["facts"]
-        results = {}
-        for key, value in facts.items():
-            results[key] = pd.DataFrame(value)
-
-    except FileNotFoundError:
-        pass
-    except KeyError:
-        pass
-
-    return pd.read_json(facts_file)
+    filters = [("cik", "in", [int(cik) for cik in ciks])] if ciks is not None else None
+    return pd.read_parquet(directory, columns=columns, filters=filters)
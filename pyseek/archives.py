@@ -0,0 +1,324 @@
+"""Ingest the SEC's nightly bulk archives instead of calling the API per company
+
+companyfacts.zip and submissions.zip hold the same json documents the API serves,
+one member per company. The archive is memory-mapped and each worker process
+opens the zip directory over the same mapping. Members are decompressed one at a
+time, straight from the page cache, so nothing is extracted to disk. The members
+are parsed with the same functions used for API responses.
+"""
+
+import json
+import mmap
+import os
+import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import typer
+
+from pyseek import _read, setup, stream, utils, warehouse
+
+app = typer.Typer()
+
+COMPANY_FACTS_ARCHIVE = (
+    "https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip"
+)
+SUBMISSIONS_ARCHIVE = (
+    "https://www.sec.gov/Archives/edgar/daily-index/bulkdata/submissions.zip"
+)
+# company documents, as opposed to the additional submissions pages
+COMPANY_MEMBER = re.compile(r"^CIK(\d{10})\.json$")
+# members handed to a worker at a time
+CHUNKSIZE = 32
+
+_archive: Optional[zipfile.ZipFile] = None
+_members: frozenset = frozenset()
+
+
+class _Mapping(mmap.mmap):
+    """A read-only mapping zipfile accepts as a file, mmap has no seekable before 3.13"""
+
+    def seekable(self) -> bool:
+        return True
+
+
+@dataclass
+class IngestResult:
+    companies: int = 0
+    failed: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def _download_archive(url: str, path: Path) -> Path:
+    path = utils.download_to_file(url, path)
+    try:
+        # reads only the central directory, which a spliced file rarely has intact
+        zipfile.ZipFile(path).close()
+    except zipfile.BadZipFile as err:
+        path.unlink()
+        raise IOError(f"{path} is not a valid archive, run again: {err}") from err
+    return path
+
+
+def download(directory: Optional[Path] = None) -> Tuple[Path, Path]:
+    """Download (or resume downloading) both bulk archives
+
+    The SEC rewrites the archives every night. An interrupted download is only
+    resumed while the archive is unchanged, see `utils.download_to_file`, and is
+    started over otherwise.
+
+    Args:
+        directory (Path, optional): where to put them. Defaults to bulk/ in the configuration directory.
+
+    Raises:
+        IOError: when a downloaded archive is incomplete or corrupt
+
+    Returns:
+        Tuple[Path, Path]: companyfacts.zip and submissions.zip
+    """
+    directory = Path(directory or Path(setup.CONFIGURATION_DIRECTORY) / "bulk")
+    directory.mkdir(parents=True, exist_ok=True)
+    return (
+        _download_archive(COMPANY_FACTS_ARCHIVE, directory / "companyfacts.zip"),
+        _download_archive(SUBMISSIONS_ARCHIVE, directory / "submissions.zip"),
+    )
+
+
+def open_archive(path: Path) -> zipfile.ZipFile:
+    """Open a zip file over a read-only memory map of it
+
+    Args:
+        path (Path): the archive
+
+    Returns:
+        zipfile.ZipFile: the archive, reading members from the mapping
+    """
+    with open(path, "rb") as fp:
+        mapping = _Mapping(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    return zipfile.ZipFile(mapping)
+
+
+def company_members(path: Path, ciks: Optional[Iterable] = None) -> List[str]:
+    """List the company documents in an archive
+
+    Args:
+        path (Path): the archive
+        ciks (Iterable, optional): only these companies. Defaults to all of them.
+
+    Returns:
+        List[str]: member names
+    """
+    wanted = {int(cik) for cik in ciks} if ciks is not None else None
+    with open_archive(path) as archive:
+        names = archive.namelist()
+    return [
+        name
+        for name in names
+        if (match := COMPANY_MEMBER.match(name))
+        and (wanted is None or int(match.group(1)) in wanted)
+    ]
+
+
+def _open_worker_archive(path: Path) -> None:
+    """Pool initializer, every worker maps the archive once"""
+    global _archive, _members
+    _archive = open_archive(path)
+    _members = frozenset(_archive.namelist())
+
+
+def _read_member(name: str) -> Iterator[bytes]:
+    with _archive.open(name) as fp:
+        yield from iter(lambda: fp.read(stream.CHUNK_SIZE), b"")
+
+
+def _facts_member(name: str) -> Tuple[int, Optional[pd.DataFrame], Optional[str]]:
+    """Normalize one companyfacts member inside a worker"""
+    cik = int(COMPANY_MEMBER.match(name).group(1))
+    try:
+        records = stream.iter_company_facts(_read_member(name))
+        return cik, _read.normalize_facts(records, cik), None
+    except (ValueError, KeyError, zipfile.BadZipFile) as err:
+        return cik, None, f"{name}: {err}"
+
+
+def _submissions_member(name: str) -> Tuple[int, Optional[pd.DataFrame], Optional[str]]:
+    """Read one submissions member, and its additional pages, inside a worker"""
+    cik = int(COMPANY_MEMBER.match(name).group(1))
+    try:
+        results = json.loads(b"".join(_read_member(name)))
+        pages = [
+            json.loads(b"".join(_read_member(page["name"])))
+            for page in results["filings"].get("files", [])
+            if page["name"] in _members
+        ]
+        return cik, _read.read_submissions(results, pages), None
+    except (ValueError, KeyError, zipfile.BadZipFile) as err:
+        return cik, None, f"{name}: {err}"
+
+
+def _read_members(reader, names: List[str]) -> list:
+    """Read a chunk of members inside a worker"""
+    return [reader(name) for name in names]
+
+
+def _iter_members(
+    path: Path, reader, ciks: Optional[Iterable], workers: Optional[int]
+) -> Iterator[Tuple[int, Optional[pd.DataFrame], Optional[str]]]:
+    names = iter(company_members(path, ciks))
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_open_worker_archive, initargs=(path,)
+    ) as pool:
+        for chunk in iter(lambda: list(islice(names, CHUNKSIZE)), []):
+            pending.append(pool.submit(_read_members, reader, chunk))
+            # keep a bounded window of chunks in flight, Executor.map would submit
+            # every member up front and hold all of their results
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def iter_company_facts(
+    path: Path, ciks: Optional[Iterable] = None, workers: Optional[int] = None
+) -> Iterator[Tuple[int, Optional[pd.DataFrame], Optional[str]]]:
+    """Normalize every company in companyfacts.zip in parallel
+
+    Args:
+        path (Path): companyfacts.zip
+        ciks (Iterable, optional): only these companies. Defaults to all of them.
+        workers (int, optional): number of processes. Defaults to the cpu count.
+
+    Returns:
+        Iterator[tuple]: cik, facts from `_read.normalize_facts` and an error message
+    """
+    return _iter_members(Path(path), _facts_member, ciks, workers)
+
+
+def iter_submissions(
+    path: Path, ciks: Optional[Iterable] = None, workers: Optional[int] = None
+) -> Iterator[Tuple[int, Optional[pd.DataFrame], Optional[str]]]:
+    """Read the complete filing history of every company in submissions.zip in parallel
+
+    Args:
+        path (Path): submissions.zip
+        ciks (Iterable, optional): only these companies. Defaults to all of them.
+        workers (int, optional): number of processes. Defaults to the cpu count.
+
+    Returns:
+        Iterator[tuple]: cik, submissions from `_read.read_submissions` and an error message
+    """
+    return _iter_members(Path(path), _submissions_member, ciks, workers)
+
+
+def ingest(
+    facts_archive: Optional[Path] = None,
+    submissions_archive: Optional[Path] = None,
+    db=None,
+    table: Optional[Path] = None,
+    ciks: Optional[Iterable] = None,
+    workers: Optional[int] = None,
+    callback: Optional[Callable[[int], None]] = None,
+) -> IngestResult:
+    """Load the bulk archives into the warehouse and/or the parquet facts table
+
+    Args:
+        facts_archive (Path, optional): companyfacts.zip
+        submissions_archive (Path, optional): submissions.zip
+        db (sqlite3.Connection, optional): the warehouse to load into
+        table (Path, optional): the facts table to write, see `_read.write_facts_table`
+        ciks (Iterable, optional): only these companies. Defaults to all of them.
+        workers (int, optional): number of processes. Defaults to the cpu count.
+        callback (Callable, optional): called with the cik after every company
+
+    Returns:
+        IngestResult: number of company documents loaded and failures
+    """
+    result = IngestResult()
+    start = time.monotonic()
+    sources = []
+    if submissions_archive:
+        sources.append(
+            ("submissions", iter_submissions(submissions_archive, ciks, workers))
+        )
+    if facts_archive:
+        sources.append(("facts", iter_company_facts(facts_archive, ciks, workers)))
+    for kind, documents in sources:
+        for cik, df, error in documents:
+            if error:
+                result.failed.append(error)
+            else:
+                if db is not None and kind == "submissions":
+                    warehouse.store(db, cik, submissions=df)
+                if db is not None and kind == "facts":
+                    warehouse.store(db, cik, facts_df=df)
+                if table is not None and kind == "facts" and len(df):
+                    _read.write_facts_table(df, table)
+                result.companies += 1
+            if callback:
+                callback(cik)
+    result.seconds = time.monotonic() - start
+    return result
+
+
+@app.command("download")
+def download_command(
+    directory: Path = typer.Option(
+        None, "--directory", "-o", help="Where to save the archives"
+    ),
+):
+    """Download companyfacts.zip and submissions.zip, resuming partial downloads"""
+    for path in download(directory):
+        typer.echo(f"{path} ({path.stat().st_size / 1024**2:.0f} MB)")
+
+
+@app.command("ingest")
+def ingest_command(
+    facts_archive: Path = typer.Option(
+        None, "--facts", "-f", help="Path to companyfacts.zip"
+    ),
+    submissions_archive: Path = typer.Option(
+        None, "--submissions", "-s", help="Path to submissions.zip"
+    ),
+    database: Path = typer.Option(
+        None, "--database", "-d", help="The warehouse file to load into"
+    ),
+    table: Path = typer.Option(
+        None, "--table", "-t", help="Also write the facts to this parquet table"
+    ),
+    companies: List[str] = typer.Option(
+        None, "--company", "-c", help="Only these CIK numbers or tickers"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of processes, defaults to the cpu count"
+    ),
+):
+    """Load the bulk archives into the warehouse without calling the API per company"""
+    if not facts_archive and not submissions_archive:
+        raise typer.BadParameter("You must provide --facts and/or --submissions")
+    ciks = None
+    if companies:
+        ciks = [utils.validate_ticker_or_cik(company).cik_str for company in companies]
+    db = warehouse.connect(database)
+    result = ingest(
+        facts_archive,
+        submissions_archive,
+        db=db,
+        table=table,
+        ciks=ciks,
+        workers=workers,
+    )
+    typer.echo(
+        f"loaded {result.companies} documents, failed {len(result.failed)} "
+        f"in {result.seconds:.1f}s"
+    )
+    for failure in result.failed:
+        typer.echo(failure, err=True)
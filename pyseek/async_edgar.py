@@ -0,0 +1,258 @@
+"""Defines coroutine counterparts of the `edgar` functions for asyncio programs
+
+Requests go through one pooled `httpx.AsyncClient` per event loop, so hundreds
+of lookups can be in flight from a single thread. They take their tokens from
+the same `ratelimit` bucket as the blocking functions, waiting with
+`asyncio.sleep` rather than blocking the loop, and read and fill the same
+response cache. The bucket's file lock and the cache's sqlite lookups are
+shared with other threads and processes, so they are only used from worker
+threads. Every coroutine can be cancelled, and takes a per request
+timeout; wrap calls in `asyncio.wait_for` for an overall deadline.
+
+httpx is an optional dependency: pip install pyseek[async]
+"""
+
+import asyncio
+import json
+import weakref
+from typing import Optional
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - only needed for the async client
+    httpx = None
+
+from pyseek import cache, coalesce, config, edgar, ratelimit, utils
+
+# event loop -> its client
+_clients = weakref.WeakKeyDictionary()
+
+
+def _build_client() -> "httpx.AsyncClient":
+    """Create a client with a connection pool sized from config.ini
+
+    Returns:
+        httpx.AsyncClient: client with the SEC headers already applied
+    """
+    if httpx is None:
+        raise ImportError("the async client needs httpx: pip install pyseek[async]")
+    pool = config.get_connection_settings()
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=pool["pool_maxsize"],
+            max_keepalive_connections=pool["pool_connections"],
+        ),
+        headers={
+            "User-Agent": config.get_api_settings()["User-Agent"],
+            "Accept-Encoding": "gzip, deflate",
+        },
+    )
+
+
+def get_client() -> "httpx.AsyncClient":
+    """Return the client of the running event loop, creating it on first use
+
+    A client's connections belong to the loop that opened them, so every loop
+    gets its own.
+
+    Returns:
+        httpx.AsyncClient: the shared client
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = _build_client()
+    return client
+
+
+async def close_client() -> None:
+    """Close the client of the running event loop so the next call rebuilds it"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def get_response(
+    url: str, timeout: Optional[float] = 5, headers: Optional[dict] = None
+) -> "httpx.Response":
+    """Send a GET through the shared client under the SEC rate limit
+
+    Throttled responses are retried like `utils.get_response` does.
+
+    Args:
+        url (str): url to request
+        timeout (float, optional): seconds to wait for the server, None to wait forever. Defaults to 5.
+        headers (dict, optional): extra request headers
+
+    Raises:
+        httpx.HTTPStatusError: when the response is an error, or still throttled after the retries
+
+    Returns:
+        httpx.Response: the response, which is a 304 when headers made it conditional
+    """
+    limiter = ratelimit.get_limiter()
+    client = get_client()
+    # waiting for a pooled connection is bounded by the rate limit, not the timeout
+    timeout = httpx.Timeout(timeout, pool=None)
+    for attempt in range(utils.MAX_RETRIES + 1):
+        await limiter.acquire_async()
+        r = await client.get(url, headers=headers, timeout=timeout)
+        if (
+            r.status_code not in utils.RETRY_STATUS_CODES
+            or attempt == utils.MAX_RETRIES
+        ):
+            break
+        delay = utils._retry_after(r)
+        await asyncio.to_thread(
+            limiter.pause, utils._backoff(attempt) if delay is None else delay
+        )
+    if r.is_error:
+        r.raise_for_status()
+    return r
+
+
+async def get_content(url: str, timeout: Optional[float] = 5) -> bytes:
+    """Return the body for url, from the response cache when possible, see `utils.get_content`
+
+    Args:
+        url (str): url to request
+        timeout (float, optional): seconds to wait for the server. Defaults to 5.
+
+    Returns:
+        bytes: the response body
+    """
+    responses = cache.get_cache()
+    # the cache is a sqlite file shared with other threads and processes, and
+    # bodies can be large, so it is only used off the event loop
+    entry = await asyncio.to_thread(responses.lookup, url) if responses else None
+    if entry and entry.fresh:
+        return await asyncio.to_thread(responses.read, entry)
+    headers = entry.conditional_headers() if entry else {}
+    r = await get_response(url, timeout=timeout, headers=headers)
+    if entry and r.status_code == 304:
+        await asyncio.to_thread(responses.revalidated, entry, r.headers)
+        return await asyncio.to_thread(responses.read, entry)
+    if responses:
+        await asyncio.to_thread(responses.store, url, r.content, r.headers)
+    return r.content
+
+
+async def _fetch_json(url: str, timeout: Optional[float]) -> tuple:
+    body = await get_content(url, timeout=timeout)
+    return json.loads(body), len(body)
+
+
+async def make_request(url: str, timeout: Optional[float] = 5) -> dict:
+    """Return the json for url
+
+    Like `utils.make_request` concurrent calls for the same url share one
+    download and one parsed document, which must not be modified. Unlike it
+    errors are raised, not printed.
+
+    Args:
+        url (str): url to request
+        timeout (float, optional): seconds to wait for the server. Defaults to 5.
+
+    Returns:
+        dict: the json returned
+    """
+    return await coalesce.load_async(url, lambda: _fetch_json(url, timeout))
+
+
+async def get_all_company_submissions(
+    cik: edgar.central_index_key, timeout: Optional[float] = 5
+) -> dict:
+    """Return the entity's current filing history, see `edgar.get_all_company_submissions`
+
+    Args:
+        cik (central_index_key): CIK, str, int
+        timeout (float, optional): seconds to wait for the server. Defaults to 5.
+
+    Returns:
+        dict: Filing history with metadata
+    """
+    return await make_request(edgar.submissions_url(cik), timeout=timeout)
+
+
+async def get_all_company_facts(
+    cik: edgar.central_index_key, timeout: Optional[float] = 30
+) -> dict:
+    """Returns all the company concepts data for an entity, see `edgar.get_all_company_facts`
+
+    Args:
+        cik (central_index_key): CIK, str, int
+        timeout (float, optional): seconds to wait for the server. Defaults to 30.
+
+    Returns:
+        dict: metadata, along with time series of different company concepts
+    """
+    return await make_request(edgar.company_facts_url(cik), timeout=timeout)
+
+
+async def get_company_concept(
+    cik: edgar.central_index_key,
+    concept: str,
+    taxonomy: str = "us-gaap",
+    timeout: Optional[float] = 5,
+) -> dict:
+    """Get the concept for a given company, see `edgar.get_company_concept`
+
+    Args:
+        cik (central_index_key): CIK, str, int
+        concept (str): the concept to search for
+        taxonomy (str, optional): Defaults to "us-gaap".
+        timeout (float, optional): seconds to wait for the server. Defaults to 5.
+
+    Returns:
+        dict: metadata, along with time series of different company concepts
+    """
+    return await make_request(
+        edgar.company_concept_url(cik, concept, taxonomy), timeout=timeout
+    )
+
+
+async def get_frames(
+    fact: str,
+    period: str,
+    unit: str = "USD",
+    taxonomy: str = "us-gaap",
+    timeout: Optional[float] = 30,
+) -> dict:
+    """One fact for every reporting entity in a period, see `edgar.get_frames`
+
+    Args:
+        fact (str): the concept, e.g. Revenues
+        period (str): CY2019 for annual, CY2019Q1 for quarterly and CY2019Q1I for instantaneous data
+        unit (str, optional): unit of measure. Defaults to "USD".
+        taxonomy (str, optional): Defaults to "us-gaap".
+        timeout (float, optional): seconds to wait for the server. Defaults to 30.
+
+    Returns:
+        dict: metadata, along with one fact per reporting entity under data
+    """
+    return await make_request(
+        edgar.frames_url(fact, period, unit, taxonomy), timeout=timeout
+    )
+
+
+async def download_company_submission(
+    cik: edgar.central_index_key,
+    accession_number: str,
+    primaryDocument: str,
+    timeout: Optional[float] = 60,
+) -> str:
+    """Download a company submission, see `edgar.download_company_submission`
+
+    Args:
+        cik (central_index_key): CIK, str, int
+        accession_number (str): Accession number of the submission
+        primaryDocument (str): Name of the primary document
+        timeout (float, optional): seconds to wait for the server. Defaults to 60.
+
+    Returns:
+        str: The submission as a string
+    """
+    r = await get_response(
+        utils.document_url(cik, accession_number, primaryDocument), timeout=timeout
+    )
+    return r.text
@@ -0,0 +1,348 @@
+"""Fetch submissions, company facts and filings for many companies concurrently
+
+Requests are spread over a bounded thread pool. Every request still goes through
+`utils.get_response`, so the pool runs as fast as the shared SEC rate limiter
+allows and no faster. Each document is written to disk as soon as it arrives,
+and documents whose file already exists are skipped, so an interrupted run picks
+up where it stopped.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import requests
+
+from pyseek import _read, config, edgar, models, syncstate, utils
+
+URLS = {
+    models.Dataset.submissions: edgar.submissions_url,
+    models.Dataset.facts: edgar.company_facts_url,
+}
+# what `download_filings` records about the filings it writes
+MANIFEST_FILE = "manifest.csv"
+MANIFEST_COLUMNS = ["cik", "accessionNumber", "form"]
+
+
+@dataclass
+class BulkResult:
+    fetched: int = 0
+    skipped: int = 0
+    failed: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+    bytes: int = 0
+
+    @property
+    def rate(self) -> float:
+        """Documents per second achieved by the run"""
+        return self.fetched / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """Download throughput achieved by the run"""
+        return self.bytes / 1024**2 / self.seconds if self.seconds else 0.0
+
+
+def resolve_companies(companies: Iterable[str]) -> List[models.CIK]:
+    """Turn tickers, CIK numbers or "all" into company records
+
+    Args:
+        companies (Iterable[str]): tickers and/or CIK numbers, or the single value "all"
+
+    Returns:
+        List[models.CIK]: the companies to fetch
+    """
+    companies = list(companies)
+    if [c.lower() for c in companies] == ["all"]:
+        return [models.CIK(**company) for company in utils.all_companies()]
+    return [utils.validate_ticker_or_cik(company) for company in companies]
+
+
+def output_path(directory: Path, dataset: models.Dataset, cik: str) -> Path:
+    """Where the document for a company is written
+
+    Args:
+        directory (Path): root directory of the bulk run
+        dataset (models.Dataset): submissions or facts
+        cik (str): zero padded CIK number
+
+    Returns:
+        Path: <directory>/<dataset>/CIK##########.json
+    """
+    return Path(directory) / models.Dataset(dataset).value / f"CIK{cik}.json"
+
+
+def _fetch(url: str, path: Path) -> int:
+    """Download url to path, only renaming it into place once it is complete"""
+    response = utils.get_response(url, requestTimeout=30)
+    tmp = path.with_suffix(".part")
+    with open(tmp, "wb") as fp:
+        fp.write(response.content)
+    os.replace(tmp, path)
+    return len(response.content)
+
+
+def _run(
+    jobs: Iterable[Tuple[Path, Callable[[], Optional[int]]]],
+    workers: int,
+    callback: Optional[Callable[[Path], None]] = None,
+    skip_existing: bool = True,
+) -> BulkResult:
+    """Run download jobs over a thread pool, skipping those whose output exists
+
+    Args:
+        jobs (Iterable[Tuple[Path, Callable]]): output path and a function writing it, returning the bytes written or None when it decided there was nothing to do
+        workers (int): size of the thread pool
+        callback (Callable, optional): called with the path after every job, whether run, skipped or failed
+        skip_existing (bool, optional): skip jobs whose output exists without running them. Defaults to True.
+
+    Returns:
+        BulkResult: counts of fetched, skipped and failed jobs
+    """
+    result = BulkResult()
+    start = time.monotonic()
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def collect(done):
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    written = future.result()
+                    if written is None:
+                        result.skipped += 1
+                    else:
+                        result.bytes += written
+                        result.fetched += 1
+                except (requests.RequestException, OSError, ValueError) as err:
+                    result.failed.append(f"{path}: {err}")
+                if callback:
+                    callback(path)
+
+        for path, job in jobs:
+            if skip_existing and path.exists():
+                result.skipped += 1
+                if callback:
+                    callback(path)
+                continue
+            pending[pool.submit(job)] = path
+            # keep a bounded window of queued work so "all" doesn't queue 20k futures
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(wait(pending).done)
+
+    result.seconds = time.monotonic() - start
+    return result
+
+
+def _refresh_facts(
+    company: models.CIK, path: Path, state: syncstate.SyncState
+) -> Optional[int]:
+    """Fetch a company's facts again only when it filed since they were fetched"""
+    latest = syncstate.latest_accession(
+        utils.get_json(edgar.submissions_url(company.cik_str))
+    )
+    if path.exists() and not state.changed(
+        company.cik_str, models.Dataset.facts.value, latest
+    ):
+        return None
+    written = _fetch(edgar.company_facts_url(company.cik_str), path)
+    state.record(company.cik_str, models.Dataset.facts.value, latest)
+    return written
+
+
+def fetch_all(
+    companies: Iterable[models.CIK],
+    datasets: Iterable[models.Dataset] = tuple(models.Dataset),
+    directory: Path = Path("bulk"),
+    workers: Optional[int] = None,
+    callback: Optional[Callable[[Path], None]] = None,
+    refresh: bool = False,
+) -> BulkResult:
+    """Fetch the datasets for every company, writing each one as it completes
+
+    By default documents already in the directory are skipped. With refresh,
+    submissions are fetched again, and company facts only for companies that filed
+    since their facts were fetched, as recorded in `<directory>/sync_state.sqlite`.
+
+    Args:
+        companies (Iterable[models.CIK]): companies to fetch
+        datasets (Iterable[models.Dataset], optional): which documents to fetch. Defaults to all of them.
+        directory (Path, optional): root output directory. Defaults to "bulk".
+        workers (int, optional): size of the thread pool. Defaults to the connection pool size.
+        callback (Callable, optional): called with the output path after every company/dataset
+        refresh (bool, optional): bring existing documents up to date. Defaults to False.
+
+    Returns:
+        BulkResult: counts of fetched, skipped and failed documents
+    """
+    if workers is None:
+        workers = config.get_connection_settings()["pool_maxsize"]
+    datasets = [models.Dataset(dataset) for dataset in datasets]
+    for dataset in datasets:
+        (Path(directory) / dataset.value).mkdir(parents=True, exist_ok=True)
+    state = (
+        syncstate.SyncState(Path(directory) / syncstate.STATE_FILE) if refresh else None
+    )
+
+    def job(company: models.CIK, dataset: models.Dataset):
+        path = output_path(directory, dataset, company.cik_str)
+        if refresh and dataset == models.Dataset.facts:
+            return path, partial(_refresh_facts, company, path, state)
+        return path, partial(_fetch, URLS[dataset](company.cik_str), path)
+
+    jobs = (job(company, dataset) for company in companies for dataset in datasets)
+    try:
+        return _run(jobs, workers, callback, skip_existing=not refresh)
+    finally:
+        if state:
+            state.close()
+
+
+def load_submissions(
+    companies: Iterable[models.CIK],
+    workers: Optional[int] = None,
+    failed: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Fetch the complete submissions history of many companies into one table
+
+    Companies whose submissions cannot be fetched are left out.
+
+    Args:
+        companies (Iterable[models.CIK]): companies to fetch
+        workers (int, optional): size of the thread pool. Defaults to the connection pool size.
+        failed (List[str], optional): the companies left out are appended here, with their error
+
+    Returns:
+        pd.DataFrame: the submissions, with a cik column in front
+    """
+    if workers is None:
+        workers = config.get_connection_settings()["pool_maxsize"]
+
+    def load(company):
+        df = _read.read_submissions(
+            *edgar.get_company_submissions_history(company.cik_str, workers=1)
+        )
+        df.insert(0, "cik", int(company.cik_str))
+        return df
+
+    frames = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(load, company): company for company in companies}
+        for future, company in futures.items():
+            try:
+                frames.append(future.result())
+            except (requests.RequestException, ValueError) as err:
+                if failed is not None:
+                    failed.append(f"{company.cik_str}: {err}")
+    if not frames:
+        return pd.DataFrame(columns=["cik", *_read.SUBMISSIONS_COLUMNS])
+    return pd.concat(frames, ignore_index=True)
+
+
+def filing_path(
+    directory: Path,
+    cik: int,
+    accession_number: str,
+    primaryDocument: str,
+    compression: models.Compression = models.Compression.none,
+) -> Path:
+    """Where a downloaded filing is written
+
+    Returns:
+        Path: <directory>/<cik>/<accession number>_<primary document>[.gz|.zst]
+    """
+    return (
+        Path(directory)
+        / str(int(cik))
+        / (
+            f"{accession_number}_{primaryDocument}"
+            + utils.COMPRESSION_SUFFIXES[models.Compression(compression)]
+        )
+    )
+
+
+def write_manifest(directory: Path, filings: pd.DataFrame) -> None:
+    """Record the form type of filings downloaded to a directory
+
+    Filings keep their accession number and primary document as file name, see
+    `filing_path`, so the form type is kept in `<directory>/manifest.csv`.
+
+    Args:
+        directory (Path): root output directory
+        filings (pd.DataFrame): with the cik, accessionNumber and form columns
+    """
+    path = Path(directory) / MANIFEST_FILE
+    df = filings[MANIFEST_COLUMNS].astype(str)
+    if path.exists():
+        df = pd.concat([pd.read_csv(path, dtype=str), df], ignore_index=True)
+        df = df.drop_duplicates("accessionNumber", keep="last")
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False)
+
+
+def read_manifest(directory: Path) -> Dict[str, str]:
+    """The form type of every filing downloaded to a directory, by accession number"""
+    path = Path(directory) / MANIFEST_FILE
+    if not path.exists():
+        return {}
+    df = pd.read_csv(path, dtype=str)
+    return dict(zip(df["accessionNumber"], df["form"]))
+
+
+def download_filings(
+    filings: pd.DataFrame,
+    directory: Path = Path("filings"),
+    workers: Optional[int] = None,
+    compression: models.Compression = models.Compression.none,
+    callback: Optional[Callable[[Path], None]] = None,
+) -> BulkResult:
+    """Download the primary document of every filing in a submissions table
+
+    Filings are deduplicated by accession number and those already on disk are
+    skipped. Downloads are streamed and resumable, see `utils.download_to_file`.
+    The form types are recorded with `write_manifest` when the table has them.
+
+    Args:
+        filings (pd.DataFrame): needs the cik, accessionNumber and primaryDocument columns
+        directory (Path, optional): root output directory. Defaults to "filings".
+        workers (int, optional): size of the thread pool. Defaults to the connection pool size.
+        compression (models.Compression, optional): compress each file. Defaults to none.
+        callback (Callable, optional): called with the output path after every filing
+
+    Returns:
+        BulkResult: counts of downloaded, skipped and failed filings, and bytes downloaded
+    """
+    if workers is None:
+        workers = config.get_connection_settings()["pool_maxsize"]
+    filings = filings.drop_duplicates("accessionNumber")
+    filings = filings[filings["primaryDocument"].fillna("") != ""]
+    if "form" in filings:
+        write_manifest(directory, filings)
+
+    def download(cik, accession_number, primaryDocument):
+        path = filing_path(directory, cik, accession_number, primaryDocument)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        written = utils.download_to_file(
+            utils.document_url(cik, accession_number, primaryDocument),
+            path,
+            compression,
+        )
+        return written.stat().st_size
+
+    jobs = (
+        (
+            filing_path(directory, cik, accn, document, compression),
+            partial(download, cik, accn, document),
+        )
+        for cik, accn, document in filings[
+            ["cik", "accessionNumber", "primaryDocument"]
+        ].itertuples(index=False, name=None)
+    )
+    return _run(jobs, workers, callback)
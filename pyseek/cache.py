@@ -0,0 +1,401 @@
+"""Holds the on-disk cache of SEC responses
+
+Response bodies are stored content-addressed (by sha256 of the body) under
+`<configuration directory>/cache/objects`, and a small sqlite index maps each url
+to its body along with the ETag/Last-Modified validators and fetch time. A body
+younger than its endpoint's TTL is served straight from disk. An older one is
+revalidated with a conditional GET, and a 304 means the local copy is still
+current. When the cache grows past its size limit, the least recently used
+entries are evicted.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from pyseek import config, setup
+
+app = typer.Typer()
+
+# frames of a period stop changing once late and amended filings for it are in
+FRAMES_SETTLED_AFTER = 365 * 24 * 60 * 60
+FRAMES_TTL = 24 * 60 * 60
+# a quarter's full index is rebuilt nightly until shortly after the quarter ends
+FULL_INDEX_SETTLED_AFTER = 7 * 24 * 60 * 60
+FULL_INDEX_TTL = 60 * 60
+
+
+def _period_end(year: int, quarter: Optional[str]) -> datetime:
+    """The first moment after a calendar year or quarter"""
+    if not quarter:
+        return datetime(year + 1, 1, 1)
+    month = 3 * int(quarter) + 1
+    return datetime(year + month // 13, (month - 1) % 12 + 1, 1)
+
+
+def _closed_period_ttl(settled_after: float, ttl: float):
+    """A TTL that never expires once the period in the url ended settled_after ago"""
+
+    def period_ttl(match: re.Match) -> Optional[float]:
+        end = _period_end(int(match["year"]), match["quarter"])
+        if time.time() - end.timestamp() > settled_after:
+            return None
+        return ttl
+
+    return period_ttl
+
+
+# seconds a response is served without revalidation, None never expires, or a
+# function of the match for endpoints where it depends on the url
+TTLS = [
+    # additional submissions pages are published once and never change
+    (re.compile(r"/submissions/CIK\d+-submissions-\d+\.json$"), None),
+    (re.compile(r"/submissions/"), 60 * 60),
+    (re.compile(r"/api/xbrl/companyfacts/"), 24 * 60 * 60),
+    (re.compile(r"/api/xbrl/companyconcept/"), 24 * 60 * 60),
+    (
+        re.compile(
+            r"/api/xbrl/frames/.+/CY(?P<year>\d{4})(?:Q(?P<quarter>[1-4]))?I?\.json$"
+        ),
+        _closed_period_ttl(FRAMES_SETTLED_AFTER, FRAMES_TTL),
+    ),
+    (re.compile(r"/api/xbrl/frames/"), FRAMES_TTL),
+    # daily indexes are published once a day is over
+    (re.compile(r"/Archives/edgar/daily-index/\d{4}/QTR[1-4]/"), None),
+    (
+        re.compile(
+            r"/Archives/edgar/full-index/(?P<year>\d{4})/QTR(?P<quarter>[1-4])/"
+        ),
+        _closed_period_ttl(FULL_INDEX_SETTLED_AFTER, FULL_INDEX_TTL),
+    ),
+    (re.compile(r"/files/company_tickers\.json$"), 24 * 60 * 60),
+    (re.compile(r"/Archives/edgar/data/"), None),
+]
+DEFAULT_TTL = 0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+CREATE INDEX IF NOT EXISTS responses_digest ON responses (digest);
+"""
+
+
+def ttl_for(url: str) -> Optional[float]:
+    """Return how long a response for url stays fresh
+
+    Args:
+        url (str): the requested url
+
+    Returns:
+        Optional[float]: seconds, or None if the response never expires
+    """
+    for pattern, ttl in TTLS:
+        match = pattern.search(url)
+        if match:
+            return ttl(match) if callable(ttl) else ttl
+    return DEFAULT_TTL
+
+
+@dataclass
+class Entry:
+    url: str
+    digest: str
+    size: int
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    @property
+    def fresh(self) -> bool:
+        """Whether the entry can be served without revalidation"""
+        ttl = ttl_for(self.url)
+        return ttl is None or time.time() - self.fetched_at < ttl
+
+    def conditional_headers(self) -> dict:
+        """Headers that turn the next request into a conditional GET"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Content-addressed response store with a sqlite index
+
+    Args:
+        directory (Path): where the index and the objects are kept
+        max_bytes (int): total body size at which least recently used entries are evicted
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.max_bytes = max_bytes
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.directory / "index.sqlite", timeout=30, check_same_thread=False
+        )
+        self._db.executescript(_SCHEMA)
+
+    def _path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def lookup(self, url: str) -> Optional[Entry]:
+        """Find the cached entry for url
+
+        Args:
+            url (str): the requested url
+
+        Returns:
+            Optional[Entry]: the entry, None when the url was never cached
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, digest, size, etag, last_modified, fetched_at"
+                " FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        entry = Entry(*row)
+        if not self._path(entry.digest).exists():
+            return None
+        return entry
+
+    def path(self, entry: Entry) -> Path:
+        """Return the file holding the body of entry and mark it as recently used"""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE responses SET accessed_at = ? WHERE url = ?",
+                (time.time(), entry.url),
+            )
+        return self._path(entry.digest)
+
+    def read(self, entry: Entry) -> bytes:
+        """Read the body of entry and mark it as recently used"""
+        return self.path(entry).read_bytes()
+
+    def store(self, url: str, body: bytes, headers: dict) -> Entry:
+        """Save a response body and its validators
+
+        Args:
+            url (str): the requested url
+            body (bytes): the response body
+            headers (dict): the response headers
+
+        Returns:
+            Entry: the new entry
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}")
+            tmp.write_bytes(body)
+            os.replace(tmp, path)
+        return self._index(url, digest, len(body), headers)
+
+    def temporary_path(self) -> Path:
+        """A unique path inside the cache for a download in progress"""
+        return self.directory / f"download.{os.getpid()}.{threading.get_ident()}"
+
+    def store_file(self, url: str, file: Path, headers: dict) -> Entry:
+        """Move an already downloaded body into the cache
+
+        Args:
+            url (str): the requested url
+            file (Path): the downloaded body, it is moved into the cache
+            headers (dict): the response headers
+
+        Returns:
+            Entry: the new entry
+        """
+        sha = hashlib.sha256()
+        with open(file, "rb") as fp:
+            for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        path = self._path(digest)
+        path.parent.mkdir(exist_ok=True)
+        size = Path(file).stat().st_size
+        os.replace(file, path)
+        return self._index(url, digest, size, headers)
+
+    def _index(self, url: str, digest: str, size: int, headers: dict) -> Entry:
+        now = time.time()
+        entry = Entry(
+            url,
+            digest,
+            size,
+            headers.get("ETag"),
+            headers.get("Last-Modified"),
+            now,
+        )
+        with self._lock, self._db:
+            previous = self._db.execute(
+                "SELECT digest FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, size, entry.etag, entry.last_modified, now, now),
+            )
+            if previous and previous[0] != digest:
+                self._remove_orphan(previous[0])
+        self.evict()
+        return entry
+
+    def revalidated(self, entry: Entry, headers: dict) -> None:
+        """Record that the server answered 304 for entry"""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ?,"
+                " etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)"
+                " WHERE url = ?",
+                (
+                    time.time(),
+                    time.time(),
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
+                    entry.url,
+                ),
+            )
+
+    def _remove_orphan(self, digest: str) -> None:
+        """Delete a body once no url refers to it. Must hold the lock"""
+        (used,) = self._db.execute(
+            "SELECT COUNT(*) FROM responses WHERE digest = ?", (digest,)
+        ).fetchone()
+        if not used:
+            self._path(digest).unlink(missing_ok=True)
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits in max_bytes
+
+        Returns:
+            int: the number of entries evicted
+        """
+        evicted = 0
+        with self._lock, self._db:
+            (total,) = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            if total <= self.max_bytes:
+                return 0
+            rows = self._db.execute(
+                "SELECT url, digest, size FROM responses ORDER BY accessed_at"
+            ).fetchall()
+            for url, digest, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._remove_orphan(digest)
+                total -= size
+                evicted += 1
+        return evicted
+
+    def stats(self) -> dict:
+        """Number of entries and bytes held, and how many are still fresh"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, digest, size, etag, last_modified, fetched_at FROM responses"
+            ).fetchall()
+        entries = [Entry(*row) for row in rows]
+        return {
+            "entries": len(entries),
+            "fresh": sum(entry.fresh for entry in entries),
+            "bytes": sum(entry.size for entry in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self) -> int:
+        """Remove every entry
+
+        Returns:
+            int: the number of entries removed
+        """
+        with self._lock, self._db:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+            self._db.execute("DELETE FROM responses")
+            for path in self.objects.glob("*/*"):
+                path.unlink(missing_ok=True)
+        return count
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """Return the process wide cache, None when disabled in config.ini
+
+    Returns:
+        Optional[ResponseCache]: the cache in the configuration directory
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = config.get_cache_settings()
+                if not settings["enabled"]:
+                    return None
+                _cache = ResponseCache(
+                    Path(setup.CONFIGURATION_DIRECTORY) / "cache",
+                    settings["max_bytes"],
+                )
+    return _cache
+
+
+def reset_cache() -> None:
+    """Close the process wide cache so the next call reopens it from the settings"""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = None
+
+
+@app.command()
+def stats():
+    """Show how much the response cache holds"""
+    cache = get_cache()
+    if cache is None:
+        typer.echo("The response cache is disabled")
+        raise typer.Exit()
+    result = cache.stats()
+    typer.echo(f"entries: {result['entries']} ({result['fresh']} fresh)")
+    typer.echo(
+        f"size: {result['bytes'] / 1024**2:.1f} MiB of {result['max_bytes'] / 1024**2:.1f} MiB"
+    )
+
+
+@app.command()
+def clear():
+    """Remove every cached response"""
+    cache = get_cache()
+    if cache is None:
+        typer.echo("The response cache is disabled")
+        raise typer.Exit()
+    typer.echo(f"Removed {cache.clear()} cached responses")
@@ -0,0 +1,232 @@
+"""Share one fetch and one parsed document between concurrent callers
+
+When several threads, or coroutines, ask for the same url at the same time only
+the first one fetches and parses it; the others wait for that call and get its
+result, or its exception. Parsed documents are also kept in a small least
+recently used memo, bounded by the size of the bodies they were parsed from.
+A document is reused only while the cached response it was parsed from is
+fresh and unchanged, or for the url's TTL when the cache is disabled. Urls the
+cache always revalidates are not memoized.
+
+The same document object is handed to every caller, so it must not be modified.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from pyseek import cache
+
+MEMO_MAX_BYTES = 64 * 1024**2
+
+
+class SingleFlight:
+    """Run a function once for all threads calling with the same key at the same time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Call fn, or wait for the call already running for key
+
+        Args:
+            key (Hashable): identifies the call, e.g. the url
+            fn (Callable): does the work
+
+        Returns:
+            Any: what fn returned, its exception is raised in every caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            result = fn()
+        except BaseException as err:
+            call.set_exception(err)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Run a coroutine once for all coroutines awaiting the same key at the same time
+
+    The shared call runs as a task of its own, so a caller that is cancelled stops
+    waiting without cancelling the call for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]) -> Any:
+        """Await fn(), or the call already running for key in this event loop
+
+        Args:
+            key (Hashable): identifies the call, e.g. the url
+            fn (Callable): returns the awaitable doing the work
+
+        Returns:
+            Any: its result, its exception is raised in every caller
+        """
+        call = (asyncio.get_running_loop(), key)
+        task = self._calls.get(call)
+        if task is None:
+            task = self._calls[call] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._done(call, done))
+        return await asyncio.shield(task)
+
+    def _done(self, call, task: asyncio.Task) -> None:
+        if self._calls.get(call) is task:
+            del self._calls[call]
+        # every caller may have gone, which would leave the error unretrieved
+        if not task.cancelled():
+            task.exception()
+
+
+class Memo:
+    """Recently parsed documents, safe to share between threads
+
+    Args:
+        max_bytes (int): total size of the bodies behind the kept documents
+    """
+
+    def __init__(self, max_bytes: int = MEMO_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # url -> document, body size, when it expires and the version of the
+        # cached response it was parsed from
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, url: str) -> Optional[Any]:
+        """The document parsed from url, None when it is not kept or out of date"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            self._entries.move_to_end(url)
+        document, _, expires, fetched_at = entry
+        if fetched_at is None:
+            current = expires is None or time.monotonic() < expires
+        else:
+            responses = cache.get_cache()
+            cached = responses.lookup(url) if responses else None
+            current = cached is not None and cached.fresh
+            current = current and cached.fetched_at == fetched_at
+        if not current:
+            with self._lock:
+                if self._entries.get(url) is entry:
+                    self._remove(url)
+            return None
+        return document
+
+    def put(self, url: str, document: Any, size: int) -> None:
+        """Keep a document, dropping the least recently used ones beyond max_bytes
+
+        Args:
+            url (str): where it came from, which decides how long it is kept, see `cache.ttl_for`
+            document (Any): the parsed document
+            size (int): bytes of the body it was parsed from
+        """
+        ttl = cache.ttl_for(url)
+        if document is None or ttl == 0 or size > self.max_bytes:
+            return
+        responses = cache.get_cache()
+        cached = responses.lookup(url) if responses else None
+        fetched_at = cached.fetched_at if cached else None
+        expires = None if ttl is None or cached else time.monotonic() + ttl
+        with self._lock:
+            if url in self._entries:
+                self._remove(url)
+            self._entries[url] = (document, size, expires, fetched_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, url: str) -> None:
+        self._bytes -= self._entries.pop(url)[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_memo = Memo()
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+
+
+def get_memo() -> Memo:
+    """Return the process wide memo"""
+    return _memo
+
+
+def reset_memo() -> None:
+    """Forget every memoized document"""
+    _memo.clear()
+
+
+def load(url: str, fetch: Callable[[], Tuple[Any, int]]) -> Any:
+    """The parsed document for url, fetched at most once for concurrent callers
+
+    Args:
+        url (str): the url
+        fetch (Callable): fetches and parses url, returning the document and the body size
+
+    Returns:
+        Any: the document, shared with other callers
+    """
+    document = _memo.get(url)
+    if document is not None:
+        return document
+
+    def fetch_once():
+        # the call before this one may have finished since the memo was checked
+        document = _memo.get(url)
+        if document is None:
+            document, size = fetch()
+            _memo.put(url, document, size)
+        return document
+
+    return _flights.do(url, fetch_once)
+
+
+async def load_async(url: str, fetch: Callable[[], Awaitable[Tuple[Any, int]]]) -> Any:
+    """The parsed document for url, fetched at most once for concurrent coroutines, see `load`
+
+    Args:
+        url (str): the url
+        fetch (Callable): returns an awaitable of the document and the body size
+
+    Returns:
+        Any: the document, shared with other callers
+    """
+    # checking a memoized document looks up its cache entry, off the event loop
+    document = await asyncio.to_thread(_memo.get, url)
+    if document is not None:
+        return document
+
+    async def fetch_once():
+        document = await asyncio.to_thread(_memo.get, url)
+        if document is None:
+            document, size = await fetch()
+            await asyncio.to_thread(_memo.put, url, document, size)
+        return document
+
+    return await _async_flights.do(url, fetch_once)
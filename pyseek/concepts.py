@@ -0,0 +1,179 @@
+"""Fetch a set of concepts for many companies at once
+
+A company's concepts can come from one companyfacts document, which holds every
+concept it ever reported, or from one companyconcept request per concept. For a
+handful of concepts the small requests are cheaper, for many of them the single
+large document is. `prefers_company_facts` picks whichever should transfer fewer
+bytes for each company, counting responses that are already cached as free.
+Companies are fetched concurrently and everything lands in one long table.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import requests
+
+from pyseek import _read, cache, config, edgar, models, stream, utils
+
+# typical transfer sizes, used until a response is in the cache
+ESTIMATED_CONCEPT_BYTES = 32 * 1024
+ESTIMATED_FACTS_BYTES = 4 * 1024**2
+DEFAULT_TAXONOMY = "us-gaap"
+# a fact is identified by these, later filings restate earlier ones
+KEY_COLUMNS = ["cik", "taxonomy", "tag", "unit", "start", "end"]
+
+
+@dataclass
+class ConceptsResult:
+    facts: pd.DataFrame
+    facts_documents: int = 0
+    concept_requests: int = 0
+    failed: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def parse_concept(name: str) -> Tuple[str, str]:
+    """Split "taxonomy:Concept", a bare concept is in us-gaap
+
+    Args:
+        name (str): e.g. Revenues or dei:EntityCommonStockSharesOutstanding
+
+    Returns:
+        Tuple[str, str]: taxonomy and concept
+    """
+    taxonomy, _, concept = name.rpartition(":")
+    return taxonomy or DEFAULT_TAXONOMY, concept
+
+
+def _expected_bytes(url: str, default: int) -> int:
+    """Bytes a request for url should transfer, nothing when the cache serves it"""
+    responses = cache.get_cache()
+    entry = responses.lookup(url) if responses else None
+    if entry is None:
+        return default
+    return 0 if entry.fresh else entry.size
+
+
+def prefers_company_facts(cik: str, concepts: List[Tuple[str, str]]) -> bool:
+    """Decide how to fetch concepts for one company
+
+    Args:
+        cik (str): zero padded CIK number
+        concepts (List[Tuple[str, str]]): taxonomy and concept pairs
+
+    Returns:
+        bool: True for one companyfacts document, False for one companyconcept request per concept
+    """
+    by_concept = sum(
+        _expected_bytes(
+            edgar.company_concept_url(cik, concept, taxonomy), ESTIMATED_CONCEPT_BYTES
+        )
+        for taxonomy, concept in concepts
+    )
+    by_document = _expected_bytes(edgar.company_facts_url(cik), ESTIMATED_FACTS_BYTES)
+    return by_document < by_concept
+
+
+def _concept_records(document: dict) -> Iterable[stream.FactRecord]:
+    for unit, facts in document.get("units", {}).items():
+        for fact in facts:
+            yield stream.FactRecord(document["taxonomy"], document["tag"], unit, fact)
+
+
+def _fetch(
+    company: models.CIK, concepts: List[Tuple[str, str]]
+) -> Tuple[pd.DataFrame, int, int]:
+    """Fetch the concepts of one company the cheaper way
+
+    Returns:
+        tuple: the facts, and the number of companyfacts and companyconcept requests
+    """
+    if prefers_company_facts(company.cik_str, concepts):
+        wanted = set(concepts)
+        records = (
+            record
+            for record in edgar.stream_company_facts(company.cik_str)
+            if (record.taxonomy, record.concept) in wanted
+        )
+        return _read.normalize_facts(records, int(company.cik_str)), 1, 0
+    records = []
+    for taxonomy, concept in concepts:
+        try:
+            document = utils.get_json(
+                edgar.company_concept_url(company.cik_str, concept, taxonomy)
+            )
+        except requests.HTTPError as err:
+            # the company never reported this concept
+            if err.response is None or err.response.status_code != 404:
+                raise
+            continue
+        records.extend(_concept_records(document))
+    return _read.normalize_facts(records, int(company.cik_str)), 0, len(concepts)
+
+
+def latest_facts(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep only the most recently filed value of every fact
+
+    Args:
+        df (pd.DataFrame): from `_read.normalize_facts`
+
+    Returns:
+        pd.DataFrame: one row per cik, taxonomy, tag, unit, start and end
+    """
+    df = df.sort_values("filed", kind="stable")
+    df = df.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+    return df.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
+
+
+def get_concepts(
+    companies: Iterable[models.CIK],
+    concepts: Iterable[str],
+    workers: Optional[int] = None,
+    latest: bool = True,
+    callback: Optional[Callable[[models.CIK], None]] = None,
+) -> ConceptsResult:
+    """Fetch several concepts for many companies
+
+    Args:
+        companies (Iterable[models.CIK]): the companies
+        concepts (Iterable[str]): see `parse_concept`
+        workers (int, optional): companies fetched concurrently. Defaults to the connection pool size.
+        latest (bool, optional): keep only the latest filed value of each fact, see `latest_facts`. Defaults to True.
+        callback (Callable, optional): called after every company
+
+    Returns:
+        ConceptsResult: the facts in one table, in the `_read.FACT_COLUMNS` layout
+    """
+    concepts = [parse_concept(name) for name in concepts]
+    if workers is None:
+        workers = config.get_connection_settings()["pool_maxsize"]
+    result = ConceptsResult(facts=_read.normalize_facts([], 0))
+    start = time.monotonic()
+    tables = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_fetch, company, concepts): company for company in companies
+        }
+        for future in as_completed(futures):
+            company = futures[future]
+            try:
+                df, documents, requests_made = future.result()
+            except (requests.RequestException, ValueError) as err:
+                result.failed.append(f"{company.cik_str}: {err}")
+            else:
+                tables.append(df)
+                result.facts_documents += documents
+                result.concept_requests += requests_made
+            if callback:
+                callback(company)
+    if tables:
+        facts = pd.concat(tables, ignore_index=True)
+        # concat falls back to object when the categories differ between companies
+        for column in _read.CATEGORICAL_FACT_COLUMNS:
+            facts[column] = facts[column].astype("category")
+        result.facts = latest_facts(facts) if latest else facts
+    result.seconds = time.monotonic() - start
+    return result
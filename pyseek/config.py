@@ -6,6 +6,13 @@ from pyseek import SUCCESS, DIR_ERROR, FILE_ERROR, CONFIG_ERROR
 from pathlib import Path
 from pyseek import setup
 
+# one pool per SEC host (www.sec.gov, data.sec.gov)
+DEFAULT_POOL_CONNECTIONS = 2
+DEFAULT_POOL_MAXSIZE = 10
+# SEC fair access policy
+DEFAULT_REQUESTS_PER_SECOND = 10
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024**3
+
 
 def create_file(
     configuration_directory: str = setup.CONFIGURATION_DIRECTORY,
@@ -45,6 +52,15 @@ def init_config(user_agent: str):
         config = configparser.ConfigParser()
         config["API"] = {"User-Agent": user_agent}
         config["TickerUpdateFrequency"] = {"Frequency": "never"}
+        config["Connection"] = {
+            "PoolConnections": str(DEFAULT_POOL_CONNECTIONS),
+            "PoolMaxsize": str(DEFAULT_POOL_MAXSIZE),
+            "RequestsPerSecond": str(DEFAULT_REQUESTS_PER_SECOND),
+        }
+        config["Cache"] = {
+            "Enabled": "yes",
+            "MaxBytes": str(DEFAULT_CACHE_MAX_BYTES),
+        }
         try:
             with open(Path(setup.CONFIGURATION_DIRECTORY) / f, "w") as configfile:
                 config.write(configfile)
@@ -63,6 +79,47 @@ def get_api_settings() -> configparser.SectionProxy:
     return config["API"]
 
 
+def get_connection_settings() -> dict:
+    """Get the connection pool and rate limit settings from the config file
+
+    Falls back to the defaults when the config file predates the Connection section.
+
+    Returns:
+        dict: pool_connections, pool_maxsize and requests_per_second
+    """
+    settings_file = Path(setup.CONFIGURATION_DIRECTORY) / "config.ini"
+    config = configparser.ConfigParser()
+    config.read(settings_file)
+    return {
+        "pool_connections": config.getint(
+            "Connection", "PoolConnections", fallback=DEFAULT_POOL_CONNECTIONS
+        ),
+        "pool_maxsize": config.getint(
+            "Connection", "PoolMaxsize", fallback=DEFAULT_POOL_MAXSIZE
+        ),
+        "requests_per_second": config.getfloat(
+            "Connection", "RequestsPerSecond", fallback=DEFAULT_REQUESTS_PER_SECOND
+        ),
+    }
+
+
+def get_cache_settings() -> dict:
+    """Get the response cache settings from the config file
+
+    Returns:
+        dict: enabled and max_bytes
+    """
+    settings_file = Path(setup.CONFIGURATION_DIRECTORY) / "config.ini"
+    config = configparser.ConfigParser()
+    config.read(settings_file)
+    return {
+        "enabled": config.getboolean("Cache", "Enabled", fallback=True),
+        "max_bytes": config.getint(
+            "Cache", "MaxBytes", fallback=DEFAULT_CACHE_MAX_BYTES
+        ),
+    }
+
+
 if __name__ == "__main__":
     setting = get_api_settings()
     print(setting)
@@ -1,13 +1,50 @@
 """Defines the functions for interacting with the SEC Edgar API"""
 
 import json
-from typing import List, TypeVar
-from pyseek import models
-from pyseek.utils import make_request, download_document
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Tuple, TypeVar
+from pyseek import config, models, stream
+from pyseek.utils import (
+    get_json,
+    make_request,
+    download_document,
+    download_to_file,
+    document_url,
+    stream_content,
+)
 
 central_index_key = TypeVar("central_index_key", str, int, models.CIK)
 
 
+def submissions_url(cik: central_index_key) -> str:
+    """Url of the submissions json for a company"""
+    return f"https://data.sec.gov/submissions/CIK{cik}.json"
+
+
+def submissions_page_url(name: str) -> str:
+    """Url of one of the additional submissions files listed under filings.files"""
+    return f"https://data.sec.gov/submissions/{name}"
+
+
+def company_facts_url(cik: central_index_key) -> str:
+    """Url of the companyfacts json for a company"""
+    return f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json"
+
+
+def company_concept_url(
+    cik: central_index_key, concept: str, taxonomy: str = "us-gaap"
+) -> str:
+    """Url of the companyconcept json for one concept of a company"""
+    return f"https://data.sec.gov/api/xbrl/companyconcept/CIK{cik}/{taxonomy}/{concept}.json"
+
+
+def frames_url(
+    concept: str, period: str, unit: str = "USD", taxonomy: str = "us-gaap"
+) -> str:
+    """Url of the frame of one concept and unit for a calendar period, e.g. CY2019Q1I"""
+    return f"https://data.sec.gov/api/xbrl/frames/{taxonomy}/{concept}/{unit}/{period}.json"
+
+
 def get_cik_numbers() -> dict:
     """Download all the company ticker information from the SEC"""
     return make_request("https://www.sec.gov/files/company_tickers.json")
@@ -45,7 +82,57 @@ def get_all_company_submissions(cik: central_index_key) -> dict:
         dict: Filing history with metadata
     """
 
-    return make_request(f"https://data.sec.gov/submissions/CIK{cik}.json")
+    return make_request(submissions_url(cik))
+
+
+def get_company_submissions_history(
+    cik: central_index_key, workers: int = None
+) -> Tuple[dict, List[dict]]:
+    """Return the entity's complete filing history
+
+    The submissions document only holds the most recent filings. Older ones are
+    split over the files listed in filings.files, which are fetched concurrently here.
+    Those files never change once published, so the response cache keeps them and
+    later calls only fetch pages that are new.
+
+    Args:
+        cik (central_index_key): CIK, str, int
+        workers (int, optional): concurrent requests. Defaults to the connection pool size.
+
+    Raises:
+        requests.RequestException: when the document or one of its pages cannot be fetched
+        ValueError: when one of them is not json
+
+    Returns:
+        Tuple[dict, List[dict]]: the submissions document and its additional pages, oldest last
+    """
+    results = get_json(submissions_url(cik))
+    return results, get_submissions_pages(results, workers)
+
+
+def get_submissions_pages(results: dict, workers: int = None) -> List[dict]:
+    """Fetch the additional submissions files listed in a submissions document
+
+    Args:
+        results (dict): from `get_all_company_submissions`
+        workers (int, optional): concurrent requests. Defaults to the connection pool size.
+
+    Raises:
+        requests.RequestException: when a page cannot be fetched
+        ValueError: when a page is not json
+
+    Returns:
+        List[dict]: the additional pages, oldest last
+    """
+    files = results["filings"].get("files", [])
+    if not files:
+        return []
+    if workers is None:
+        workers = config.get_connection_settings()["pool_maxsize"]
+    with ThreadPoolExecutor(max_workers=min(workers, len(files))) as pool:
+        return list(
+            pool.map(get_json, (submissions_page_url(f["name"]) for f in files))
+        )
 
 
 def get_all_company_facts(cik: central_index_key) -> dict:
@@ -57,7 +144,22 @@ def get_all_company_facts(cik: central_index_key) -> dict:
     Returns:
         dict: metadata, along with time series of different company concepts
     """
-    return make_request(f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json")
+    return make_request(company_facts_url(cik))
+
+
+def stream_company_facts(cik: central_index_key) -> Iterator[stream.FactRecord]:
+    """Yield the company facts one at a time while the document downloads
+
+    Memory stays flat regardless of the size of the filer, and the download stops
+    as soon as the caller stops iterating.
+
+    Args:
+        cik (central_index_key): CIK, str, int
+
+    Returns:
+        Iterator[stream.FactRecord]: taxonomy, concept, unit and fact
+    """
+    return stream.iter_company_facts(stream_content(company_facts_url(cik)))
 
 
 def get_company_concept(
@@ -72,9 +174,7 @@ def get_company_concept(
     Returns:
         dict: metadata, along with time series of different company concepts
     """
-    return make_request(
-        f"https://data.sec.gov/api/xbrl/companyconcept/CIK{cik}/{taxonomy}/{concept}.json"
-    )
+    return make_request(company_concept_url(cik, concept, taxonomy))
 
 
 def get_company_concepts_categories(cik: central_index_key) -> List[str]:
@@ -86,8 +186,11 @@ def get_company_concepts_categories(cik: central_index_key) -> List[str]:
     Returns:
         List[str]: list of the categories that are searchable
     """
-    cats = get_all_company_facts(cik)
-    return cats.get("facts").keys()
+    taxonomies = []
+    for taxonomy, _, _ in stream.iter_concepts(stream_content(company_facts_url(cik))):
+        if taxonomy not in taxonomies:
+            taxonomies.append(taxonomy)
+    return taxonomies
 
 
 def get_company_facts_by_concept(cik: central_index_key, category: str) -> List[str]:
@@ -99,8 +202,16 @@ def get_company_facts_by_concept(cik: central_index_key, category: str) -> List[
     Returns:
         List[str]: list of the us-gaap concepts that are searchable
     """
-    facts = get_all_company_facts(cik)
-    return facts.get("facts").get(category)
+    concepts = {}
+    for taxonomy, concept, body in stream.iter_concepts(
+        stream_content(company_facts_url(cik))
+    ):
+        if taxonomy == category:
+            concepts[concept] = body
+        elif concepts:
+            # taxonomies are contiguous, nothing more to find
+            break
+    return concepts or None
 
 
 def get_company_fact(fact: str, cik: central_index_key) -> dict:
@@ -118,10 +229,22 @@ def get_company_fact(fact: str, cik: central_index_key) -> dict:
     return make_request(f"https:/data.sec.gov/api/xbrl/companyconcept/CIK/{cik}")
 
 
-def get_frames(fact: str, period: str, unit: str = "USD") -> dict:
-    return make_request(
-        f"https:/data.sec.gov/api/xbrl/frames/{fact}/{unit}/{period}.json"
-    )
+def get_frames(
+    fact: str, period: str, unit: str = "USD", taxonomy: str = "us-gaap"
+) -> dict:
+    """The xbrl/frames API aggregates one fact for each reporting entity that is last
+    filed that most closely fits the calendrical period requested
+
+    Args:
+        fact (str): the concept, e.g. Revenues
+        period (str): CY2019 for annual, CY2019Q1 for quarterly and CY2019Q1I for instantaneous data
+        unit (str, optional): unit of measure. Defaults to "USD".
+        taxonomy (str, optional): Defaults to "us-gaap".
+
+    Returns:
+        dict: metadata, along with one fact per reporting entity under data
+    """
+    return make_request(frames_url(fact, period, unit, taxonomy))
 
 
 def download_company_submission(
@@ -134,12 +257,39 @@ def download_company_submission(
         accession_number (str): Accession number of the submission
         primaryDocument (str): Name of the primary document
 
+    Raises:
+        requests.HTTPError: when the document is missing or the server fails
+
     Returns:
         str: The submission as a string
     """
     return download_document(cik, accession_number, primaryDocument)
 
 
+def download_company_submission_to_file(
+    cik: central_index_key,
+    accession_number: str,
+    primaryDocument: str,
+    filename: str,
+    compression: models.Compression = models.Compression.none,
+):
+    """Stream a company submission to disk, resuming a partial download
+
+    Args:
+        cik (central_index_key): CIK, str, int
+        accession_number (str): Accession number of the submission
+        primaryDocument (str): Name of the primary document
+        filename (str): The file to create
+        compression (models.Compression, optional): Compress the file. Defaults to none.
+
+    Returns:
+        Path: The file written
+    """
+    return download_to_file(
+        document_url(cik, accession_number, primaryDocument), filename, compression
+    )
+
+
 if __name__ == "__main__":
     with open("temporary/tesla_forms.json", "r") as fp:
         data = json.load(fp)
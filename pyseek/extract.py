@@ -0,0 +1,231 @@
+"""Extract the text of many downloaded filings across a pool of processes
+
+Text extraction is CPU bound, so threads would all wait on the GIL. Filings are
+handed to a `multiprocessing.Pool` in chunks to keep the messaging overhead low.
+Each worker can be given an address space limit, and is replaced after a fixed
+number of filings so memory fragmentation from very large documents doesn't pile
+up over a long run.
+"""
+
+import gzip
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - windows has no rlimits
+    resource = None
+
+from pyseek import htmltext, models, stream
+
+FILING_SUFFIXES = (".htm", ".html", ".txt", ".xml")
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+
+@dataclass
+class ExtractResult:
+    extracted: int = 0
+    bytes: int = 0
+    failed: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def find_filings(source: Path) -> List[Path]:
+    """List the filings to extract
+
+    Args:
+        source (Path): a directory searched recursively, or a manifest file with one path per line
+
+    Returns:
+        List[Path]: the filings, in a stable order
+    """
+    source = Path(source)
+    if source.is_dir():
+        return sorted(
+            path
+            for path in source.rglob("*")
+            if path.is_file() and _filing_name(path).lower().endswith(FILING_SUFFIXES)
+        )
+    with open(source, "r") as fp:
+        return [Path(line.strip()) for line in fp if line.strip()]
+
+
+def _filing_name(path: Path) -> str:
+    """The file name without a compression suffix"""
+    name = path.name
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.lower().endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def read_filing(path: Path, chunk_size: int = stream.CHUNK_SIZE) -> Iterator[bytes]:
+    """Read a filing in chunks, decompressing gzip and zstd files
+
+    Args:
+        path (Path): the filing
+        chunk_size (int, optional): bytes per chunk. Defaults to stream.CHUNK_SIZE.
+
+    Returns:
+        Iterator[bytes]: the filing contents
+    """
+    path = Path(path)
+    if path.suffix == ".gz":
+        with gzip.open(path, "rb") as fp:
+            yield from iter(lambda: fp.read(chunk_size), b"")
+    elif path.suffix == ".zst":
+        import zstandard
+
+        with open(path, "rb") as raw:
+            with zstandard.ZstdDecompressor().stream_reader(raw) as fp:
+                yield from iter(lambda: fp.read(chunk_size), b"")
+    else:
+        yield from stream.read_chunks(path, chunk_size)
+
+
+def _limit_memory(max_bytes: Optional[int]) -> None:
+    """Pool initializer capping the address space of a worker"""
+    if max_bytes and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+
+
+def _run(job: Tuple[Callable, Path, Path]) -> Tuple[str, int, Any, Optional[str]]:
+    """Run the work of `run_pool` on one filing inside a worker"""
+    work, path, output = job
+    try:
+        size = 0
+
+        def chunks():
+            nonlocal size
+            for chunk in read_filing(path):
+                size += len(chunk)
+                yield chunk
+
+        value = work(chunks(), output)
+        return str(path), size, value, None
+    # one bad filing, e.g. a truncated .gz or a .zst without zstandard, must not end the run
+    except Exception as err:
+        return str(path), 0, None, f"{type(err).__name__}: {err}"
+
+
+def run_pool(
+    work: Callable[[Iterator[str], Optional[Path]], Any],
+    jobs: Iterable[Tuple[Path, Optional[Path]]],
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    max_memory: Optional[int] = None,
+    max_tasks_per_worker: Optional[int] = 64,
+) -> Iterator[Tuple[str, int, Any, Optional[str]]]:
+    """Hand filings to a pool of capped, recycled workers
+
+    Args:
+        work (Callable): a module level function called in a worker with the chunks of a filing and its output path
+        jobs (Iterable[Tuple[Path, Optional[Path]]]): the filings and where to write them
+        workers (int, optional): number of processes. Defaults to the number of cpus.
+        chunksize (int, optional): filings handed to a worker at a time. Defaults to 16.
+        max_memory (int, optional): address space limit per worker in bytes. Defaults to no limit.
+        max_tasks_per_worker (int, optional): chunks a worker handles before it is replaced. Defaults to 64.
+
+    Yields:
+        tuple: the filing path, bytes read, what work returned and an error message, in completion order
+    """
+    with Pool(
+        processes=workers,
+        initializer=_limit_memory,
+        initargs=(max_memory,),
+        maxtasksperchild=max_tasks_per_worker,
+    ) as pool:
+        yield from pool.imap_unordered(
+            _run,
+            ((work, path, output) for path, output in jobs),
+            chunksize=chunksize,
+        )
+
+
+def _write_text(chunks: Iterator[str], output: Optional[Path]) -> Optional[str]:
+    """Write the text of a filing to output, or return it when output is None"""
+    blocks = (block for block in htmltext.iter_text_blocks(chunks) if block)
+    if output is None:
+        return "\n".join(blocks)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + ".part")
+    with open(tmp, "w") as fp:
+        for block in blocks:
+            fp.write(block + "\n")
+    os.replace(tmp, output)
+    return None
+
+
+def extract_filings(
+    filings: Iterable[Path],
+    output: Path,
+    output_format: models.TextFormat = models.TextFormat.text,
+    root: Optional[Path] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    max_memory: Optional[int] = None,
+    max_tasks_per_worker: Optional[int] = 64,
+    callback: Optional[Callable[[str], None]] = None,
+) -> ExtractResult:
+    """Extract the text of every filing over a pool of processes
+
+    Args:
+        filings (Iterable[Path]): the filings to extract
+        output (Path): a directory of .txt files, or the .jsonl file to write
+        output_format (models.TextFormat, optional): text or jsonl. Defaults to text.
+        root (Path, optional): text files mirror the filing paths relative to root. Defaults to flat names.
+        workers (int, optional): number of processes. Defaults to the number of cpus.
+        chunksize (int, optional): filings handed to a worker at a time. Defaults to 16.
+        max_memory (int, optional): address space limit per worker in bytes. Defaults to no limit.
+        max_tasks_per_worker (int, optional): chunks a worker handles before it is replaced. Defaults to 64.
+        callback (Callable, optional): called with the filing path after each filing
+
+    Returns:
+        ExtractResult: number of filings extracted, bytes read and failures
+    """
+    output = Path(output)
+    output_format = models.TextFormat(output_format)
+    if output_format == models.TextFormat.text:
+        output.mkdir(parents=True, exist_ok=True)
+
+    def jobs():
+        for path in filings:
+            path = Path(path)
+            if output_format == models.TextFormat.jsonl:
+                yield path, None
+                continue
+            name = path.relative_to(root) if root else Path(path.name)
+            text_name = Path(_filing_name(name)).stem + ".txt"
+            yield path, output / name.with_name(text_name)
+
+    result = ExtractResult()
+    start = time.monotonic()
+    jsonl = open(output, "w") if output_format == models.TextFormat.jsonl else None
+    try:
+        for path, size, text, error in run_pool(
+            _write_text,
+            jobs(),
+            workers=workers,
+            chunksize=chunksize,
+            max_memory=max_memory,
+            max_tasks_per_worker=max_tasks_per_worker,
+        ):
+            if error:
+                result.failed.append(f"{path}: {error}")
+            else:
+                result.extracted += 1
+                result.bytes += size
+                if jsonl:
+                    jsonl.write(json.dumps({"path": path, "text": text}) + "\n")
+            if callback:
+                callback(path)
+    finally:
+        if jsonl:
+            jsonl.close()
+    result.seconds = time.monotonic() - start
+    return result
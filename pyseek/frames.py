@@ -0,0 +1,129 @@
+"""Cross sectional data from the xbrl/frames API
+
+One frames request returns a concept for every filer in a calendar period, where
+getting the same from companyfacts takes one request per company. `get_panel`
+fans out over many periods at once and stacks the frames into one typed table.
+Frames of periods that closed long enough ago are cached without expiry (see
+`cache.ttl_for`), so rebuilding a panel only fetches the recent periods.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+import pandas as pd
+import requests
+
+from pyseek import config, edgar, utils
+
+# one row per filer and period
+FRAME_COLUMNS = ["period", "cik", "entityName", "loc", "start", "end", "val", "accn"]
+CATEGORICAL_FRAME_COLUMNS = ["period", "entityName", "loc", "accn"]
+
+
+def periods(
+    first: int, last: int, quarterly: bool = False, instantaneous: bool = False
+) -> List[str]:
+    """List the frame periods between two years, both included
+
+    Args:
+        first (int): first calendar year
+        last (int): last calendar year
+        quarterly (bool, optional): quarters instead of years. Defaults to False.
+        instantaneous (bool, optional): point in time values at the end of each
+            quarter, as used by balance sheet concepts. Implies quarterly. Defaults to False.
+
+    Returns:
+        List[str]: e.g. CY2019, CY2019Q1 or CY2019Q1I
+    """
+    if not (quarterly or instantaneous):
+        return [f"CY{year}" for year in range(first, last + 1)]
+    suffix = "I" if instantaneous else ""
+    return [
+        f"CY{year}Q{quarter}{suffix}"
+        for year in range(first, last + 1)
+        for quarter in range(1, 5)
+    ]
+
+
+def read_frame(frame: dict, period: Optional[str] = None) -> pd.DataFrame:
+    """Turn a frames response into a typed table
+
+    Args:
+        frame (dict): from `edgar.get_frames`
+        period (str, optional): the requested period. Defaults to the one in the response.
+
+    Returns:
+        pd.DataFrame: one row per filer with the columns in FRAME_COLUMNS
+    """
+    df = pd.DataFrame(frame.get("data", []), columns=FRAME_COLUMNS[1:])
+    df.insert(0, "period", period or frame.get("ccp"))
+    df["cik"] = df["cik"].astype("uint32")
+    for column in ["start", "end"]:
+        df[column] = pd.to_datetime(df[column], format="%Y-%m-%d")
+    df["val"] = pd.to_numeric(df["val"]).astype("float64")
+    for column in CATEGORICAL_FRAME_COLUMNS:
+        df[column] = df[column].astype("category")
+    return df
+
+
+def get_frame(
+    concept: str, period: str, unit: str = "USD", taxonomy: str = "us-gaap"
+) -> pd.DataFrame:
+    """Fetch one frame, a period nobody reported the concept for is empty
+
+    Args:
+        concept (str): e.g. Revenues
+        period (str): see `periods`
+        unit (str, optional): Defaults to "USD".
+        taxonomy (str, optional): Defaults to "us-gaap".
+
+    Raises:
+        requests.RequestException: when the frame cannot be fetched, other than a 404
+        ValueError: when the response is not json
+
+    Returns:
+        pd.DataFrame: see `read_frame`
+    """
+    try:
+        frame = utils.get_json(edgar.frames_url(concept, period, unit, taxonomy))
+    except requests.HTTPError as err:
+        if err.response is None or err.response.status_code != 404:
+            raise
+        frame = {}
+    return read_frame(frame, period)
+
+
+def get_panel(
+    concept: str,
+    periods: Iterable[str],
+    unit: str = "USD",
+    taxonomy: str = "us-gaap",
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Fetch a concept for every filer over many periods
+
+    Args:
+        concept (str): e.g. Revenues
+        periods (Iterable[str]): from `periods`
+        unit (str, optional): Defaults to "USD".
+        taxonomy (str, optional): Defaults to "us-gaap".
+        workers (int, optional): concurrent requests. Defaults to the connection pool size.
+
+    Returns:
+        pd.DataFrame: the frames stacked in period order, see `read_frame`
+    """
+    periods = list(periods)
+    if workers is None:
+        workers = config.get_connection_settings()["pool_maxsize"]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(periods)))) as pool:
+        frames = list(
+            pool.map(lambda period: get_frame(concept, period, unit, taxonomy), periods)
+        )
+    if not frames:
+        return read_frame({})
+    df = pd.concat(frames, ignore_index=True)
+    # concat falls back to object when the categories differ between frames
+    for column in CATEGORICAL_FRAME_COLUMNS:
+        df[column] = df[column].astype("category")
+    df["period"] = df["period"].cat.set_categories(periods, ordered=True)
+    return df
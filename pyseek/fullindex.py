@@ -0,0 +1,332 @@
+"""Discover filings from the EDGAR full and daily indexes
+
+EDGAR publishes one index of every filing per quarter (full-index) and per
+business day (daily-index), in three layouts: master.idx is pipe separated,
+form.idx and company.idx are fixed width. One small download lists the filings
+of every company, where the submissions API needs a request per company.
+
+Indexes are parsed whole columns at a time, by the C csv reader for master.idx
+and by slicing every line at the header's column offsets for the fixed width
+files, and stored as parquet under `index/` in the configuration directory.
+Quarters that have closed and past days never change, so each is downloaded
+and parsed once.
+"""
+
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+import requests
+import typer
+
+from pyseek import cache, config, models, query, setup, utils
+
+app = typer.Typer()
+
+INDEX_DIRECTORY = "index"
+# the header of each layout, in column order, and the names we give the columns
+HEADERS = {
+    models.IndexType.master: [
+        "CIK",
+        "Company Name",
+        "Form Type",
+        "Date Filed",
+        "Filename",
+    ],
+    models.IndexType.form: [
+        "Form Type",
+        "Company Name",
+        "CIK",
+        "Date Filed",
+        "File Name",
+    ],
+    models.IndexType.company: [
+        "Company Name",
+        "Form Type",
+        "CIK",
+        "Date Filed",
+        "File Name",
+    ],
+}
+COLUMN_NAMES = {
+    "CIK": "cik",
+    "Company Name": "companyName",
+    "Form Type": "form",
+    "Date Filed": "filingDate",
+    "Filename": "filename",
+    "File Name": "filename",
+}
+INDEX_COLUMNS = [
+    "cik",
+    "companyName",
+    "form",
+    "filingDate",
+    "accessionNumber",
+    "filename",
+]
+ACCESSION_NUMBER = r"(\d{10}-\d{2}-\d{6})"
+
+
+def full_index_url(
+    year: int, quarter: int, kind: models.IndexType = models.IndexType.master
+) -> str:
+    """Url of the index of every filing in a quarter"""
+    return f"https://www.sec.gov/Archives/edgar/full-index/{year}/QTR{quarter}/{models.IndexType(kind).value}.idx"
+
+
+def daily_index_url(day: date, kind: models.IndexType = models.IndexType.master) -> str:
+    """Url of the index of every filing on a business day"""
+    quarter = (day.month - 1) // 3 + 1
+    return (
+        f"https://www.sec.gov/Archives/edgar/daily-index/{day.year}/QTR{quarter}/"
+        f"{models.IndexType(kind).value}.{day:%Y%m%d}.idx"
+    )
+
+
+def parse_index(
+    text: str, kind: models.IndexType = models.IndexType.master
+) -> pd.DataFrame:
+    """Parse an index file
+
+    Args:
+        text (str): the index file
+        kind (models.IndexType, optional): its layout. Defaults to master.
+
+    Returns:
+        pd.DataFrame: one row per filing with the columns in INDEX_COLUMNS
+    """
+    kind = models.IndexType(kind)
+    names = [COLUMN_NAMES[header] for header in HEADERS[kind]]
+    lines = text.splitlines()
+    # the column headers sit right above a line of dashes
+    dashes = next(
+        (i for i, line in enumerate(lines) if line.startswith("---")), len(lines)
+    )
+    if kind == models.IndexType.master:
+        df = pd.read_csv(
+            io.StringIO(text),
+            sep="|",
+            skiprows=dashes + 1,
+            header=None,
+            names=names,
+            dtype=str,
+            quoting=csv.QUOTE_NONE,
+        )
+    else:
+        header = lines[dashes - 1] if dashes else ""
+        starts = [header.index(column) for column in HEADERS[kind]]
+        ends = starts[1:] + [None]
+        rows = pd.Series(
+            [line for line in lines[dashes + 1 :] if line.strip()], dtype=object
+        )
+        df = pd.DataFrame(
+            {
+                name: rows.str[start:end].str.strip()
+                for name, start, end in zip(names, starts, ends)
+            }
+        )
+    return _typed(df)
+
+
+def _empty() -> pd.DataFrame:
+    return _typed(pd.DataFrame(columns=list(COLUMN_NAMES.values())[:5]))
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.dropna(subset=["cik", "filename"])
+    return pd.DataFrame(
+        {
+            "cik": pd.to_numeric(df["cik"]).astype("uint32"),
+            "companyName": df["companyName"].astype(str),
+            "form": df["form"].astype("category"),
+            # daily indexes write 20230103, full indexes 2023-01-03
+            "filingDate": pd.to_datetime(
+                df["filingDate"].str.replace("-", "", regex=False), format="%Y%m%d"
+            ),
+            "accessionNumber": df["filename"].str.extract(
+                ACCESSION_NUMBER, expand=False
+            ),
+            "filename": df["filename"].astype(str),
+        },
+        columns=INDEX_COLUMNS,
+    ).reset_index(drop=True)
+
+
+def _index_directory(directory: Optional[Path]) -> Path:
+    return Path(directory or Path(setup.CONFIGURATION_DIRECTORY) / INDEX_DIRECTORY)
+
+
+def _load(url: str, path: Path, kind: models.IndexType) -> pd.DataFrame:
+    """Read a stored index, or download, parse and store it
+
+    A missing index (a holiday, or a day not published yet) is empty and not stored.
+    """
+    if path.exists():
+        return pd.read_parquet(path)
+    try:
+        text = utils.get_text(url, encoding="latin-1", requestTimeout=30)
+    except requests.HTTPError as err:
+        if err.response is None or err.response.status_code != 404:
+            raise
+        return _empty()
+    df = parse_index(text, kind)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(path, index=False)
+    except ImportError:
+        # without pyarrow the response cache still saves the download
+        pass
+    return df
+
+
+def quarter_index(
+    year: int,
+    quarter: int,
+    kind: models.IndexType = models.IndexType.master,
+    directory: Optional[Path] = None,
+) -> pd.DataFrame:
+    """Every filing in a closed quarter, see `parse_index`
+
+    Args:
+        year (int): the year
+        quarter (int): 1 to 4
+        kind (models.IndexType, optional): layout to download. Defaults to master.
+        directory (Path, optional): where parsed indexes are kept. Defaults to index/ in the configuration directory.
+
+    Returns:
+        pd.DataFrame: the filings
+    """
+    path = _index_directory(directory) / "full" / f"{year}-QTR{quarter}.parquet"
+    return _load(full_index_url(year, quarter, kind), path, kind)
+
+
+def daily_index(
+    day: date,
+    kind: models.IndexType = models.IndexType.master,
+    directory: Optional[Path] = None,
+) -> pd.DataFrame:
+    """Every filing on a past business day, see `parse_index`
+
+    Args:
+        day (date): the day
+        kind (models.IndexType, optional): layout to download. Defaults to master.
+        directory (Path, optional): where parsed indexes are kept. Defaults to index/ in the configuration directory.
+
+    Returns:
+        pd.DataFrame: the filings, empty when there is no index for the day
+    """
+    path = _index_directory(directory) / "daily" / f"{day:%Y%m%d}.parquet"
+    return _load(daily_index_url(day, kind), path, kind)
+
+
+def _quarter_bounds(year: int, quarter: int) -> Tuple[date, date]:
+    first = date(year, 3 * quarter - 2, 1)
+    last = (
+        date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+    ) - timedelta(days=1)
+    return first, last
+
+
+def index_parts(since: date, until: date, today: Optional[date] = None) -> List[Tuple]:
+    """The indexes covering a date range
+
+    Settled quarters are read from their full index. Days of the current quarter,
+    and of one that only just ended, come from the daily indexes.
+
+    Returns:
+        List[Tuple]: ("full", year, quarter) and ("daily", day) entries
+    """
+    today = today or date.today()
+    settled = today - timedelta(seconds=cache.FULL_INDEX_SETTLED_AFTER)
+    until = min(until, today)
+    parts = []
+    year, quarter = since.year, (since.month - 1) // 3 + 1
+    while date(year, 3 * quarter - 2, 1) <= until:
+        first, last = _quarter_bounds(year, quarter)
+        if last < settled:
+            parts.append(("full", year, quarter))
+        else:
+            day = max(first, since)
+            while day <= min(last, until):
+                # nothing is disseminated at the weekend
+                if day.weekday() < 5:
+                    parts.append(("daily", day))
+                day += timedelta(days=1)
+        year, quarter = (year + 1, 1) if quarter == 4 else (year, quarter + 1)
+    return parts
+
+
+def get_filings(
+    since: date,
+    until: Optional[date] = None,
+    forms: Optional[Iterable[str]] = None,
+    kind: models.IndexType = models.IndexType.master,
+    directory: Optional[Path] = None,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Every filing across the market in a date range
+
+    Args:
+        since (date): first filing date, inclusive
+        until (date, optional): last filing date, inclusive. Defaults to today.
+        forms (Iterable[str], optional): only these form types. Defaults to all of them.
+        kind (models.IndexType, optional): layout to download. Defaults to master.
+        directory (Path, optional): where parsed indexes are kept. Defaults to index/ in the configuration directory.
+        workers (int, optional): concurrent downloads. Defaults to the connection pool size.
+
+    Returns:
+        pd.DataFrame: the filings, see `parse_index`
+    """
+    until = until or date.today()
+    if workers is None:
+        workers = config.get_connection_settings()["pool_maxsize"]
+
+    def load(part):
+        if part[0] == "full":
+            return quarter_index(part[1], part[2], kind, directory)
+        return daily_index(part[1], kind, directory)
+
+    parts = index_parts(since, until)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(parts)))) as pool:
+        frames = list(pool.map(load, parts))
+    df = pd.concat(frames, ignore_index=True) if frames else _empty()
+    df["form"] = df["form"].astype("category")
+    df = query.select(df.set_index("filingDate"), forms=forms, since=since, until=until)
+    return df.reset_index()[INDEX_COLUMNS]
+
+
+@app.command("filings")
+def filings_command(
+    since: datetime = typer.Option(
+        ..., "--since", "-s", formats=["%Y-%m-%d"], help="Earliest filing date"
+    ),
+    until: datetime = typer.Option(
+        None, "--until", "-u", formats=["%Y-%m-%d"], help="Latest filing date"
+    ),
+    forms: List[str] = typer.Option(
+        None, "--form", "-f", help="Only these form types, e.g. 8-K"
+    ),
+    output: Path = typer.Option(
+        None, "--output", "-o", help="Write the filings to a .csv or .parquet file"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of concurrent downloads"
+    ),
+):
+    """List the filings of every company in a date range from the EDGAR indexes"""
+    df = get_filings(
+        since.date(),
+        until.date() if until else None,
+        forms=forms or None,
+        workers=workers,
+    )
+    if output is None:
+        print(df.to_string(index=False))
+    elif output.suffix == ".parquet":
+        df.to_parquet(output, index=False)
+    else:
+        df.to_csv(output, index=False)
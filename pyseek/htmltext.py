@@ -0,0 +1,95 @@
+"""Event based text extraction for filing HTML
+
+The parser is lxml's HTML parser driven with a target object, so it reports
+start tags, end tags and text as it reads and never builds a document tree.
+Text is collected only while inside a block element, and each outermost block
+is handed back as soon as it closes. Memory is bounded by the largest single
+block, and deeply nested markup cannot hit the recursion limit.
+"""
+
+from typing import Iterable, Iterator, List, Union
+
+from lxml import etree
+
+BLOCK_TAGS = frozenset(["p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "td", "th"])
+# text inside these never shows up in the extracted text
+SKIPPED_TAGS = frozenset(["script", "style"])
+FEED_SIZE = 1024 * 1024
+
+
+class _BlockCollector:
+    """lxml parser target that gathers the text of outermost block elements"""
+
+    def __init__(self):
+        self.blocks: List[str] = []
+        self._in_body = False
+        self._depth = 0
+        self._skipped = 0
+        self._parts: List[str] = []
+
+    def start(self, tag, attrib):
+        if tag == "body":
+            self._in_body = True
+        elif tag in SKIPPED_TAGS:
+            self._skipped += 1
+        elif self._in_body and (self._depth or tag in BLOCK_TAGS):
+            self._depth += 1
+
+    def end(self, tag):
+        if tag == "body":
+            self._in_body = False
+        elif tag in SKIPPED_TAGS:
+            self._skipped = max(0, self._skipped - 1)
+        elif self._depth:
+            self._depth -= 1
+            if not self._depth:
+                self.blocks.append("".join(self._parts).strip())
+                self._parts = []
+
+    def data(self, data):
+        if self._depth and not self._skipped:
+            self._parts.append(data)
+
+    def close(self):
+        return None
+
+
+def iter_text_blocks(chunks: Iterable[Union[str, bytes]]) -> Iterator[str]:
+    """Yield the stripped text of every outermost block element in the body
+
+    Blocks are the elements in BLOCK_TAGS. A block nested in another block is part
+    of the outer block's text.
+
+    Args:
+        chunks (Iterable[Union[str, bytes]]): the HTML document, all str or all bytes
+
+    Returns:
+        Iterator[str]: one string per block, possibly empty
+    """
+    collector = _BlockCollector()
+    # huge_tree lifts libxml2's nesting depth limit, which some filings exceed
+    parser = etree.HTMLParser(target=collector, recover=True, huge_tree=True)
+    for chunk in chunks:
+        for start in range(0, len(chunk), FEED_SIZE):
+            parser.feed(chunk[start : start + FEED_SIZE])
+            if collector.blocks:
+                yield from collector.blocks
+                collector.blocks = []
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        # raised for an empty document, there is nothing to extract
+        pass
+    yield from collector.blocks
+
+
+def extract_text(report: Union[str, bytes]) -> str:
+    """Return the text of every block in the report, one block per line
+
+    Args:
+        report (Union[str, bytes]): the HTML document
+
+    Returns:
+        str: the extracted text
+    """
+    return "\n".join(iter_text_blocks([report]))
@@ -0,0 +1,139 @@
+"""A compact, column oriented container of facts
+
+Millions of `models.Measure` objects would spend most of their memory on object
+headers and repeated strings. `Measures` keeps one array per column instead:
+numpy arrays for numbers and dates, and categoricals for the repeated strings,
+so every distinct tag, unit or form is stored once and rows hold small integer
+codes. Columns are shared with the DataFrame they come from or go to, not copied,
+and filters run over whole columns.
+"""
+
+from typing import Dict, Iterable, Iterator, Union
+
+import numpy as np
+import pandas as pd
+
+from pyseek import _read, models, stream
+
+
+def _column_array(series: pd.Series):
+    """The array behind a column, without copying it"""
+    if pd.api.types.is_extension_array_dtype(series.dtype):
+        return series.array
+    return series.to_numpy(copy=False)
+
+
+class Measures:
+    """Facts in the `_read.FACT_COLUMNS` layout, one array per column
+
+    Columns are available as attributes, e.g. `measures.val`. Indexing with an
+    integer gives a `models.Measure`, with a slice, integer array or boolean mask
+    another `Measures`.
+
+    Args:
+        columns (Dict[str, array]): an equally long array for every name in `_read.FACT_COLUMNS`
+    """
+
+    __slots__ = ("_columns",)
+
+    def __init__(
+        self, columns: Dict[str, Union[np.ndarray, pd.api.extensions.ExtensionArray]]
+    ):
+        missing = [name for name in _read.FACT_COLUMNS if name not in columns]
+        if missing:
+            raise ValueError(f"Missing columns {missing}")
+        if len({len(columns[name]) for name in _read.FACT_COLUMNS}) > 1:
+            raise ValueError("Columns must all have the same length")
+        self._columns = {name: columns[name] for name in _read.FACT_COLUMNS}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Measures":
+        """Wrap the columns of a facts table, e.g. from `_read.normalize_facts`
+
+        Args:
+            df (pd.DataFrame): the facts
+
+        Returns:
+            Measures: sharing the dataframe's arrays
+        """
+        return cls({name: _column_array(df[name]) for name in _read.FACT_COLUMNS})
+
+    @classmethod
+    def from_records(cls, records: Iterable[stream.FactRecord], cik: int) -> "Measures":
+        """Collect facts, e.g. from `stream.iter_company_facts`
+
+        Args:
+            records (Iterable[stream.FactRecord]): the facts
+            cik (int): the company the facts belong to
+
+        Returns:
+            Measures: the facts
+        """
+        return cls.from_frame(_read.normalize_facts(records, cik))
+
+    def to_frame(self) -> pd.DataFrame:
+        """A dataframe over the same arrays
+
+        Returns:
+            pd.DataFrame: the facts with the columns in `_read.FACT_COLUMNS`
+        """
+        return pd.DataFrame(self._columns, copy=False)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the columns"""
+        return sum(column.nbytes for column in self._columns.values())
+
+    def __getattr__(self, name: str):
+        # only reached for names that are not slots, methods or properties
+        if name == "_columns":
+            raise AttributeError(name)
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self) -> int:
+        return len(self._columns["val"])
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self._measure(int(key))
+        return Measures({name: column[key] for name, column in self._columns.items()})
+
+    def __iter__(self) -> Iterator[models.Measure]:
+        return (self._measure(i) for i in range(len(self)))
+
+    def _measure(self, i: int) -> models.Measure:
+        value = {name: self._columns[name][i] for name in models.Measure.__slots__}
+        for name in ["filed", "end"]:
+            value[name] = (
+                pd.Timestamp(value[name]).date() if pd.notna(value[name]) else None
+            )
+        return models.Measure(**value)
+
+    def mask(self, **equals) -> np.ndarray:
+        """Rows where every given column equals the given value
+
+        Categorical columns are compared by their codes, so the value is looked
+        up once instead of comparing every string.
+
+        Args:
+            equals: column names and values, e.g. tag="Revenues", unit="USD"
+
+        Returns:
+            np.ndarray: a boolean mask
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in equals.items():
+            column = self._columns[name]
+            if isinstance(column, pd.Categorical):
+                code = column.categories.get_indexer([value])[0]
+                mask &= column.codes == code if code >= 0 else False
+            else:
+                mask &= np.asarray(column == value, dtype=bool)
+        return mask
+
+    def where(self, **equals) -> "Measures":
+        """The rows where every given column equals the given value, see `mask`"""
+        return self[self.mask(**equals)]
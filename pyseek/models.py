@@ -13,20 +13,44 @@ class Form(str, Enum):
     eightk = "8-K"
 
 
+class Compression(str, Enum):
+    none = "none"
+    gzip = "gzip"
+    zstd = "zstd"
+
+
+class TextFormat(str, Enum):
+    text = "text"
+    jsonl = "jsonl"
+
+
+class Dataset(str, Enum):
+    submissions = "submissions"
+    facts = "facts"
+
+
+class IndexType(str, Enum):
+    master = "master"
+    form = "form"
+    company = "company"
+
+
+# __slots__ keeps the per instance dict off records that are created by the
+# million, dataclass(slots=True) needs python 3.10
 @dataclass
 class CIK:
+    __slots__ = ("title", "ticker", "cik_str")
     title: str
     ticker: str
     cik_str: str
 
     def __post_init__(self):
-        self.cik_str = str(self.cik_str)
-        while len(self.cik_str) < 10:
-            self.cik_str = "0" + self.cik_str
+        self.cik_str = str(self.cik_str).zfill(10)
 
 
 @dataclass
 class Measure:
+    __slots__ = ("frame", "filed", "end", "form", "fp", "fy", "val", "accn")
     frame: str
     filed: date
     end: date
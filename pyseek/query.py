@@ -0,0 +1,162 @@
+"""Typed, indexed submissions tables and vectorized filters over them
+
+Submissions records are saved as csv, which has no types, so every read used to
+parse all of it again and compare strings. `load` reads a record once, gives its
+columns proper dtypes (dates, categorical forms, nullable integers and booleans),
+indexes it by filing date and caches that in a parquet file next to the csv.
+Later reads load the parquet file directly, and `select` filters on whole
+columns at once.
+"""
+
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# submissions columns by type, anything else is left as it is
+DATE_COLUMNS = ["filingDate", "reportDate"]
+CATEGORICAL_COLUMNS = ["form", "act", "primaryDocDescription"]
+STRING_COLUMNS = ["accessionNumber", "fileNumber", "filmNumber", "items"]
+BOOLEAN_COLUMNS = ["isXBRL", "isInlineXBRL"]
+INDEX_COLUMN = "filingDate"
+SIDECAR_SUFFIX = ".parquet"
+
+Date = Union[str, datetime, pd.Timestamp]
+
+
+def typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Give a submissions dataframe proper dtypes and index it by filing date
+
+    The row order is kept, so the SEC's most recent first order survives.
+
+    Args:
+        df (pd.DataFrame): from `_read.read_submissions`, `bulk.load_submissions` or a saved csv
+
+    Returns:
+        pd.DataFrame: the same rows, indexed by filingDate
+    """
+    df = df.copy()
+    for column in DATE_COLUMNS:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], format="%Y-%m-%d", errors="coerce")
+    if "acceptanceDateTime" in df:
+        df["acceptanceDateTime"] = pd.to_datetime(
+            df["acceptanceDateTime"], utc=True, errors="coerce"
+        )
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("category")
+    for column in STRING_COLUMNS:
+        if column in df:
+            df[column] = df[column].fillna("").astype(str)
+    for column in BOOLEAN_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column]).astype("boolean")
+    if "size" in df:
+        df["size"] = pd.to_numeric(df["size"]).astype("Int64")
+    if "cik" in df:
+        df["cik"] = df["cik"].astype("uint32")
+    return df.set_index(INDEX_COLUMN)
+
+
+def sidecar_path(record: Path) -> Path:
+    """The cached, typed copy of a csv record"""
+    return Path(record).with_suffix(SIDECAR_SUFFIX)
+
+
+def save(df: pd.DataFrame, path: Path) -> Path:
+    """Write a typed submissions table to parquet
+
+    Args:
+        df (pd.DataFrame): from `typed`
+        path (Path): the file to write
+
+    Returns:
+        Path: the file written
+    """
+    df.to_parquet(path)
+    return Path(path)
+
+
+def load(record: Path) -> pd.DataFrame:
+    """Load a submissions record as a typed table
+
+    The parquet sidecar is used when it is at least as new as the csv, and is
+    (re)built from the csv otherwise. Without pyarrow the csv is parsed each time.
+
+    Args:
+        record (Path): the csv written by `pyseek submissions get`
+
+    Returns:
+        pd.DataFrame: see `typed`
+    """
+    record = Path(record)
+    sidecar = sidecar_path(record)
+    if sidecar.exists() and (
+        not record.exists() or sidecar.stat().st_mtime >= record.stat().st_mtime
+    ):
+        return pd.read_parquet(sidecar)
+    df = typed(pd.read_csv(record, dtype={column: str for column in STRING_COLUMNS}))
+    try:
+        save(df, sidecar)
+    except ImportError:
+        pass
+    return df
+
+
+def select(
+    df: pd.DataFrame,
+    forms: Optional[Iterable[str]] = None,
+    since: Optional[Date] = None,
+    until: Optional[Date] = None,
+    items: Optional[Iterable[str]] = None,
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None,
+) -> pd.DataFrame:
+    """Filter a typed submissions table, every predicate given must hold
+
+    Args:
+        df (pd.DataFrame): from `typed` or `load`
+        forms (Iterable[str], optional): any of these form types
+        since (Date, optional): earliest filing date, inclusive
+        until (Date, optional): latest filing date, inclusive
+        items (Iterable[str], optional): 8-K items, a filing matches when it reports any of them
+        min_size (int, optional): smallest filing size in bytes
+        max_size (int, optional): largest filing size in bytes
+
+    Returns:
+        pd.DataFrame: the matching rows, in their original order
+    """
+    since = pd.Timestamp(since) if since is not None else None
+    until = pd.Timestamp(until) if until is not None else None
+    # a sorted index turns the date range into a slice instead of a scan
+    if df.index.is_monotonic_decreasing:
+        df = df.loc[until:since]
+    elif df.index.is_monotonic_increasing:
+        df = df.loc[since:until]
+    else:
+        mask = np.ones(len(df), dtype=bool)
+        if since is not None:
+            mask &= df.index >= since
+        if until is not None:
+            mask &= df.index <= until
+        df = df[mask]
+
+    mask = np.ones(len(df), dtype=bool)
+    if forms is not None:
+        mask &= df["form"].isin(list(forms)).to_numpy()
+    if items is not None:
+        pattern = "|".join(re.escape(item) for item in items)
+        mask &= (
+            df["items"]
+            .str.contains(f"(?:^|,)(?:{pattern})(?:,|$)", regex=True, na=False)
+            .to_numpy()
+        )
+    if min_size is not None:
+        mask &= (df["size"] >= min_size).fillna(False).to_numpy(dtype=bool)
+    if max_size is not None:
+        mask &= (df["size"] <= max_size).fillna(False).to_numpy(dtype=bool)
+    return df[mask]
@@ -0,0 +1,182 @@
+"""Holds the SEC fair access rate limiter
+
+The SEC allows at most 10 requests per second from a single client. Every
+request made through `utils.get_response` takes a token from a shared bucket
+first. The bucket state lives in a small file in the configuration directory
+and is guarded with an advisory file lock, so threads and worker processes on
+the same host draw from one budget instead of each running at the full rate.
+Coroutines draw from the same bucket with `TokenBucket.acquire_async`.
+"""
+
+import asyncio
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - windows only shares the bucket between threads
+    fcntl = None
+
+from pyseek import config, setup
+
+SEC_REQUESTS_PER_SECOND = 10
+STATE_FILE = "ratelimit.state"
+
+# tokens available, time of last update
+_STATE = struct.Struct("dd")
+
+
+class TokenBucket:
+    """Token bucket shared through a lock/state file
+
+    Tokens refill continuously at `rate` per second up to `capacity`. Callers
+    reserve a token before sleeping, so concurrent callers queue behind each
+    other rather than waking up together.
+
+    Args:
+        rate (float): tokens added per second
+        capacity (float): the largest burst allowed. The default of 1 spaces requests evenly
+        state_file (Path, optional): where the state is shared. Only shared between threads when None
+    """
+
+    def __init__(
+        self,
+        rate: float = SEC_REQUESTS_PER_SECOND,
+        capacity: float = 1,
+        state_file: Optional[Path] = None,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated = time.time()
+
+    def _update(self, change) -> float:
+        """Refill the bucket, apply `change` to it and persist the result
+
+        Args:
+            change (callable): takes (tokens, now) and returns (tokens, result)
+
+        Returns:
+            float: the result of `change`
+        """
+        with self._lock:
+            if self.state_file is None or fcntl is None:
+                self._tokens, result = self._refill_and_apply(
+                    self._tokens, self._updated, change
+                )
+                self._updated = time.time()
+                return result
+            fd = os.open(self.state_file, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.pread(fd, _STATE.size, 0)
+                if len(raw) == _STATE.size:
+                    tokens, updated = _STATE.unpack(raw)
+                else:
+                    tokens, updated = self.capacity, time.time()
+                tokens, result = self._refill_and_apply(tokens, updated, change)
+                os.pwrite(fd, _STATE.pack(tokens, time.time()), 0)
+                return result
+            finally:
+                os.close(fd)
+
+    def _refill_and_apply(self, tokens: float, updated: float, change):
+        now = time.time()
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        return change(tokens, now)
+
+    def reserve(self) -> float:
+        """Take a token, going into debt when the bucket is empty
+
+        Returns:
+            float: seconds the caller has to wait before using the token
+        """
+
+        def take(tokens, now):
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            return tokens - 1, wait
+
+        return self._update(take)
+
+    def acquire(self) -> None:
+        """Block until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait for a token without blocking the event loop
+
+        The bucket is locked against other threads and processes, so the token
+        is reserved in a worker thread. A caller cancelled while waiting hands
+        its token back.
+        """
+        reservation = asyncio.ensure_future(asyncio.to_thread(self.reserve))
+        try:
+            wait = await asyncio.shield(reservation)
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # the reservation still goes through when its caller stops waiting for it
+            reservation.add_done_callback(self._refund_reservation)
+            raise
+
+    def _refund_reservation(self, reservation: asyncio.Future) -> None:
+        if not reservation.cancelled() and reservation.exception() is None:
+            asyncio.get_running_loop().run_in_executor(None, self.refund)
+
+    def refund(self) -> None:
+        """Hand back a token that was reserved but not used"""
+        self._update(lambda tokens, now: (min(self.capacity, tokens + 1), None))
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back for at least `seconds`
+
+        Used when the SEC answers 429/503 so the whole host backs off, not just
+        the thread that saw the error.
+
+        Args:
+            seconds (float): how long no tokens should be handed out
+        """
+
+        def drain(tokens, now):
+            return min(tokens, 1 - seconds * self.rate), None
+
+        self._update(drain)
+
+
+_limiter: Optional[TokenBucket] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> TokenBucket:
+    """Return the process wide limiter shared by all `edgar` calls
+
+    Returns:
+        TokenBucket: limiter backed by the state file in the configuration directory
+    """
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                state_file = Path(setup.CONFIGURATION_DIRECTORY) / STATE_FILE
+                try:
+                    state_file.parent.mkdir(parents=True, exist_ok=True)
+                except OSError:
+                    state_file = None
+                rate = config.get_connection_settings()["requests_per_second"]
+                _limiter = TokenBucket(rate=rate, state_file=state_file)
+    return _limiter
+
+
+def reset_limiter() -> None:
+    """Drop the process wide limiter so the next call rebuilds it from the settings"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
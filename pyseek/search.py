@@ -0,0 +1,599 @@
+"""Full text search over downloaded filings
+
+Filings are tokenized into lowercase words, and every word keeps the positions
+it occurs at, so quoted phrases can be matched exactly. Results are ranked with
+BM25.
+
+The index is a directory of immutable segments plus `catalog.sqlite`, which maps
+each indexed file to its segment and document number. `SearchIndex.add` only
+reads files that are new or changed since they were indexed and writes them as
+a new segment, and a replaced file's old document is marked deleted. Once there
+are more than MAX_SEGMENTS segments they are merged into one.
+
+A segment is a handful of flat numpy arrays, opened memory-mapped, so a query
+only pages in the term dictionary entries it binary searches and the postings
+of its own terms:
+
+- term_bytes.npy, term_offsets.npy: the sorted terms, utf-8, back to back
+- pointers.npy, doc_freqs.npy: where each term's postings start, and its document count
+- postings.npy: per term, its document numbers, then their term frequencies,
+  then the positions in each document
+- lengths.npy, forms.npy: tokens and form type code of every document
+"""
+
+import json
+import os
+import re
+import shutil
+import sqlite3
+from dataclasses import dataclass
+from functools import reduce
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from pyseek import bulk, extract, htmltext, setup
+
+SEARCH_DIRECTORY = "search"
+CATALOG_FILE = "catalog.sqlite"
+# documents per segment written by `SearchIndex.add`
+SEGMENT_SIZE = 1000
+MAX_SEGMENTS = 16
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+TOKEN = re.compile(r"[a-z0-9]+")
+# text files written by `pyseek submissions download`,
+# <ticker>_<form>[_<accn>][_item<item>], forms have no dots and tickers are not accession numbers
+DOWNLOAD_NAME = re.compile(
+    r"^(?!\d{10}-\d{2}-\d{6}_)(?P<ticker>[^_]+)_(?P<form>[^_.]+)"
+    r"(?:_(?P<accn>\d{10}-\d{2}-\d{6}))?(?:_item(?P<item>[0-9A-Za-z]+))?$"
+)
+# filings written by `pyseek submissions batch`, <cik>/<accn>_<primary document>
+BATCH_NAME = re.compile(r"^(?P<accn>\d{10}-\d{2}-\d{6})_.")
+TEXT_SUFFIXES = (".txt", ".txt.gz", ".txt.zst")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    segment TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    form TEXT,
+    ticker TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS documents_segment_doc ON documents (segment, doc);
+
+CREATE TABLE IF NOT EXISTS deleted (
+    segment TEXT NOT NULL,
+    doc INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY,
+    documents INTEGER NOT NULL,
+    tokens INTEGER NOT NULL
+);
+"""
+
+# a term's postings: document numbers, term frequencies and the positions of all of them
+Postings = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+@dataclass
+class Hit:
+    path: str
+    score: float
+    form: str
+    ticker: str
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase words of letters and digits"""
+    return TOKEN.findall(text.lower())
+
+
+def parse_query(query: str) -> List[List[str]]:
+    """Split a query into clauses, a quoted phrase is one clause and every other word is one
+
+    Args:
+        query (str): e.g. '"going concern" doubt'
+
+    Returns:
+        List[List[str]]: the tokens of each clause
+    """
+    clauses = []
+    for i, part in enumerate(query.split('"')):
+        tokens = tokenize(part)
+        if i % 2 and tokens:
+            clauses.append(tokens)
+        else:
+            clauses.extend([token] for token in tokens)
+    return clauses
+
+
+def read_text(path: Path) -> str:
+    """The text of a filing, extracting it from HTML unless it already is text"""
+    chunks = extract.read_filing(path)
+    if Path(path).name.lower().endswith(TEXT_SUFFIXES):
+        return b"".join(chunks).decode("utf-8", errors="replace")
+    return "\n".join(htmltext.iter_text_blocks(chunks))
+
+
+def describe(path: Path) -> Tuple[str, str]:
+    """Form type and ticker of a file named by `pyseek submissions download`, else empty"""
+    name = Path(path).name
+    for suffix in TEXT_SUFFIXES:
+        if name.lower().endswith(suffix):
+            name = name[: -len(suffix)]
+            break
+    match = DOWNLOAD_NAME.match(name)
+    return (match["form"], match["ticker"]) if match else ("", "")
+
+
+def batch_form(path: Path, manifests: Dict[Path, Dict[str, str]]) -> str:
+    """Form type of a filing written by `pyseek submissions batch`, else empty
+
+    Args:
+        path (Path): the filing
+        manifests (Dict[Path, Dict[str, str]]): manifests already read, by directory, see `bulk.read_manifest`
+
+    Returns:
+        str: the form type recorded in the manifest of its download directory
+    """
+    path = Path(path)
+    match = BATCH_NAME.match(path.name)
+    if not match:
+        return ""
+    directory = path.parent.parent
+    if directory not in manifests:
+        manifests[directory] = bulk.read_manifest(directory)
+    return manifests[directory].get(match["accn"], "")
+
+
+def _batch_postings(documents: List[List[str]]) -> Dict[str, List[Postings]]:
+    """Positional postings of a batch of tokenized documents
+
+    Every token is numbered by its term once, then one stable sort by term
+    groups the whole batch, in document and position order within each term.
+    """
+    vocabulary: Dict[str, int] = {}
+    ids = [
+        np.fromiter(
+            (vocabulary.setdefault(token, len(vocabulary)) for token in tokens),
+            dtype=np.uint32,
+            count=len(tokens),
+        )
+        for tokens in documents
+    ]
+    if not vocabulary:
+        return {}
+    lengths = np.array([len(tokens) for tokens in documents], dtype=np.int64)
+    term_ids = np.concatenate(ids)
+    docs = np.repeat(np.arange(len(documents), dtype=np.uint32), lengths)
+    positions = np.arange(len(term_ids), dtype=np.int64) - np.repeat(
+        np.cumsum(lengths) - lengths, lengths
+    )
+    order = np.argsort(term_ids, kind="stable")
+    term_ids, docs, positions = term_ids[order], docs[order], positions[order]
+    # one entry per term and document, and where each term's entries start
+    pair_starts = np.flatnonzero(
+        np.concatenate(
+            [[True], (term_ids[1:] != term_ids[:-1]) | (docs[1:] != docs[:-1])]
+        )
+    )
+    frequencies = np.diff(np.append(pair_starts, len(term_ids))).astype(np.uint32)
+    pair_terms = term_ids[pair_starts]
+    term_starts = np.searchsorted(pair_terms, np.arange(len(vocabulary) + 1))
+    pair_docs = docs[pair_starts]
+    positions = positions.astype(np.uint32)
+    bounds = np.append(pair_starts, len(term_ids))
+    postings = {}
+    for term, i in vocabulary.items():
+        first, last = term_starts[i], term_starts[i + 1]
+        postings[term] = [
+            (
+                pair_docs[first:last],
+                frequencies[first:last],
+                positions[bounds[first] : bounds[last]],
+            )
+        ]
+    return postings
+
+
+def _write_segment(
+    path: Path,
+    postings: Dict[str, List[Postings]],
+    lengths: np.ndarray,
+    forms: List[str],
+) -> None:
+    """Write a segment, the parts of each term's postings are in document order
+
+    Args:
+        path (Path): the segment directory, which must not exist
+        postings (Dict[str, List[Postings]]): per term, postings to concatenate
+        lengths (np.ndarray): tokens per document
+        forms (List[str]): form type per document
+    """
+    terms = sorted(postings)
+    encoded = [term.encode("utf-8") for term in terms]
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+    term_offsets[1:] = np.cumsum([len(term) for term in encoded])
+    pointers = np.zeros(len(terms) + 1, dtype=np.uint64)
+    doc_freqs = np.zeros(len(terms), dtype=np.uint32)
+    arrays = []
+    for i, term in enumerate(terms):
+        parts = postings[term]
+        docs = np.concatenate([part[0] for part in parts])
+        doc_freqs[i] = len(docs)
+        arrays.extend(
+            [docs] + [part[1] for part in parts] + [part[2] for part in parts]
+        )
+        pointers[i + 1] = pointers[i] + 2 * len(docs) + sum(len(p[2]) for p in parts)
+    categories = sorted(set(forms))
+    codes = {form: code for code, form in enumerate(categories)}
+
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    np.save(tmp / "term_bytes.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(tmp / "term_offsets.npy", term_offsets)
+    np.save(tmp / "pointers.npy", pointers)
+    np.save(tmp / "doc_freqs.npy", doc_freqs)
+    np.save(
+        tmp / "postings.npy",
+        (
+            np.concatenate(arrays).astype(np.uint32)
+            if arrays
+            else np.zeros(0, dtype=np.uint32)
+        ),
+    )
+    np.save(tmp / "lengths.npy", np.asarray(lengths, dtype=np.uint32))
+    np.save(tmp / "forms.npy", np.array([codes[f] for f in forms], dtype=np.uint16))
+    with open(tmp / "segment.json", "w") as fp:
+        json.dump({"forms": categories}, fp)
+    os.replace(tmp, path)
+
+
+class Segment:
+    """Read access to one memory-mapped segment
+
+    Args:
+        path (Path): the segment directory
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._term_bytes = self._load("term_bytes.npy")
+        self._term_offsets = self._load("term_offsets.npy")
+        self._pointers = self._load("pointers.npy")
+        self._doc_freqs = self._load("doc_freqs.npy")
+        self._postings = self._load("postings.npy")
+        self.lengths = self._load("lengths.npy")
+        self.forms = self._load("forms.npy")
+        with open(self.path / "segment.json") as fp:
+            self.form_categories: List[str] = json.load(fp)["forms"]
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(self.path / name, mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def terms(self) -> int:
+        return len(self._doc_freqs)
+
+    def term(self, i: int) -> str:
+        start, end = self._term_offsets[i], self._term_offsets[i + 1]
+        return self._term_bytes[start:end].tobytes().decode("utf-8")
+
+    def find(self, term: str) -> int:
+        """Binary search the term dictionary, -1 when the term is not in the segment"""
+        lo, hi = 0, self.terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.terms and self.term(lo) == term else -1
+
+    def postings_at(self, i: int) -> Postings:
+        start, end = int(self._pointers[i]), int(self._pointers[i + 1])
+        n = int(self._doc_freqs[i])
+        block = self._postings[start:end]
+        return block[:n], block[n : 2 * n], block[2 * n :]
+
+    def postings(self, term: str) -> Optional[Postings]:
+        i = self.find(term)
+        return self.postings_at(i) if i >= 0 else None
+
+    def doc_freq(self, term: str) -> int:
+        i = self.find(term)
+        return int(self._doc_freqs[i]) if i >= 0 else 0
+
+    def form_codes(self, forms: Iterable[str]) -> List[int]:
+        return [i for i, form in enumerate(self.form_categories) if form in forms]
+
+    def phrase(self, terms: List[str]) -> np.ndarray:
+        """Mask of the documents holding the terms next to each other, in order"""
+        found = np.zeros(len(self), dtype=bool)
+        postings = [self.postings(term) for term in terms]
+        if any(p is None for p in postings):
+            return found
+        starts = [
+            np.concatenate([[0], np.cumsum(p[1], dtype=np.int64)]) for p in postings
+        ]
+        for doc in reduce(np.intersect1d, [p[0] for p in postings]):
+            candidates = None
+            for offset, ((docs, _, positions), start) in enumerate(
+                zip(postings, starts)
+            ):
+                j = np.searchsorted(docs, doc)
+                shifted = positions[start[j] : start[j + 1]].astype(np.int64) - offset
+                candidates = (
+                    shifted
+                    if candidates is None
+                    else np.intersect1d(candidates, shifted, assume_unique=True)
+                )
+                if not len(candidates):
+                    break
+            found[doc] = bool(len(candidates))
+        return found
+
+
+class SearchIndex:
+    """A search index in a directory
+
+    Args:
+        directory (Path, optional): Defaults to search/ in the configuration directory.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(
+            directory or Path(setup.CONFIGURATION_DIRECTORY) / SEARCH_DIRECTORY
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.directory / CATALOG_FILE, timeout=30)
+        self._db.executescript(_SCHEMA)
+        self._segments: Dict[str, Segment] = {}
+
+    def close(self) -> None:
+        self._segments = {}
+        self._db.close()
+
+    def segments(self) -> Dict[str, Segment]:
+        """The open segments by name"""
+        names = [row[0] for row in self._db.execute("SELECT name FROM segments")]
+        self._segments = {
+            name: self._segments.get(name) or Segment(self.directory / name)
+            for name in sorted(names)
+        }
+        return self._segments
+
+    def _next_segment_name(self) -> str:
+        last = self._db.execute("SELECT MAX(name) FROM segments").fetchone()[0]
+        return f"seg-{int(last[4:]) + 1 if last else 1:06d}"
+
+    def add(
+        self,
+        paths: Iterable[Path],
+        form: Optional[str] = None,
+        segment_size: int = SEGMENT_SIZE,
+        callback: Optional[Callable[[Path], None]] = None,
+    ) -> int:
+        """Index the files that are new or changed since they were last indexed
+
+        Args:
+            paths (Iterable[Path]): text files, or HTML filings which are extracted first
+            form (str, optional): form type of every file. Defaults to the one in the
+                file name, see `describe`, or in the manifest of a batch download, see `batch_form`.
+            segment_size (int, optional): documents per segment. Defaults to SEGMENT_SIZE.
+            callback (Callable, optional): called with the path after every file
+
+        Returns:
+            int: the number of files indexed
+        """
+        batch = []
+        added = 0
+        manifests = {}
+        for path in paths:
+            path = Path(path).resolve()
+            mtime = path.stat().st_mtime
+            row = self._db.execute(
+                "SELECT segment, doc, mtime FROM documents WHERE path = ?", (str(path),)
+            ).fetchone()
+            if row is None or row[2] != mtime:
+                file_form, ticker = describe(path)
+                if not (form or file_form):
+                    file_form = batch_form(path, manifests)
+                tokens = tokenize(read_text(path))
+                batch.append((str(path), mtime, form or file_form, ticker, tokens, row))
+                if len(batch) >= segment_size:
+                    added += self._flush(batch)
+                    batch = []
+            if callback:
+                callback(path)
+        if batch:
+            added += self._flush(batch)
+        if len(self.segments()) > MAX_SEGMENTS:
+            self.merge()
+        return added
+
+    def _flush(self, batch: list) -> int:
+        """Write a batch of tokenized files as a new segment and catalog them"""
+        name = self._next_segment_name()
+        postings = _batch_postings([item[4] for item in batch])
+        lengths = np.array([len(item[4]) for item in batch], dtype=np.uint32)
+        _write_segment(
+            self.directory / name, postings, lengths, [item[2] for item in batch]
+        )
+        with self._db:
+            for doc, (path, mtime, form, ticker, _, previous) in enumerate(batch):
+                if previous is not None:
+                    self._db.execute("INSERT INTO deleted VALUES (?, ?)", previous[:2])
+                self._db.execute(
+                    "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, name, doc, mtime, form, ticker),
+                )
+            self._db.execute(
+                "INSERT INTO segments VALUES (?, ?, ?)",
+                (name, len(batch), int(lengths.sum())),
+            )
+        return len(batch)
+
+    def _deleted(self) -> Dict[str, np.ndarray]:
+        deleted: Dict[str, List[int]] = {}
+        for segment, doc in self._db.execute("SELECT segment, doc FROM deleted"):
+            deleted.setdefault(segment, []).append(doc)
+        return {name: np.array(docs, dtype=np.int64) for name, docs in deleted.items()}
+
+    def _live(self, name: str, segment: Segment, deleted: Dict[str, np.ndarray]):
+        live = np.ones(len(segment), dtype=bool)
+        live[deleted.get(name, [])] = False
+        return live
+
+    def merge(self) -> None:
+        """Rewrite all segments as one, dropping deleted documents"""
+        segments = self.segments()
+        if len(segments) < 2:
+            return
+        deleted = self._deleted()
+        name = self._next_segment_name()
+        postings: Dict[str, List[Postings]] = {}
+        lengths, forms, moves = [], [], []
+        base = 0
+        for old, segment in segments.items():
+            live = self._live(old, segment, deleted)
+            new_ids = np.cumsum(live, dtype=np.int64) - 1 + base
+            for i in range(segment.terms):
+                docs, tfs, positions = segment.postings_at(i)
+                keep = live[docs]
+                if not keep.any():
+                    continue
+                if not keep.all():
+                    starts = np.concatenate([[0], np.cumsum(tfs, dtype=np.int64)])
+                    positions = np.concatenate(
+                        [
+                            positions[starts[j] : starts[j + 1]]
+                            for j in np.flatnonzero(keep)
+                        ]
+                    )
+                    docs, tfs = docs[keep], tfs[keep]
+                postings.setdefault(segment.term(i), []).append(
+                    (
+                        new_ids[docs].astype(np.uint32),
+                        np.array(tfs),
+                        np.array(positions),
+                    )
+                )
+            lengths.append(np.asarray(segment.lengths)[live])
+            forms.extend(
+                segment.form_categories[code]
+                for code in np.asarray(segment.forms)[live]
+            )
+            moves.extend(
+                (name, int(new_ids[doc]), old, int(doc)) for doc in np.flatnonzero(live)
+            )
+            base += int(live.sum())
+        lengths = np.concatenate(lengths)
+        _write_segment(self.directory / name, postings, lengths, forms)
+        with self._db:
+            self._db.executemany(
+                "UPDATE documents SET segment = ?, doc = ? WHERE segment = ? AND doc = ?",
+                moves,
+            )
+            self._db.execute("DELETE FROM deleted")
+            self._db.execute("DELETE FROM segments")
+            self._db.execute(
+                "INSERT INTO segments VALUES (?, ?, ?)",
+                (name, len(lengths), int(lengths.sum())),
+            )
+        for old in segments:
+            shutil.rmtree(self.directory / old, ignore_errors=True)
+        self._segments = {}
+
+    def search(
+        self, query: str, forms: Optional[Iterable[str]] = None, limit: int = 10
+    ) -> List[Hit]:
+        """Find the documents matching every clause of the query, best BM25 score first
+
+        Args:
+            query (str): words and quoted phrases, see `parse_query`
+            forms (Iterable[str], optional): only documents of these form types
+            limit (int, optional): number of hits. Defaults to 10.
+
+        Returns:
+            List[Hit]: the best matches
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        terms = sorted({term for clause in clauses for term in clause})
+        forms = set(forms) if forms else None
+        segments = self.segments()
+        deleted = self._deleted()
+        documents, tokens = self._db.execute(
+            "SELECT COALESCE(SUM(documents), 0), COALESCE(SUM(tokens), 0) FROM segments"
+        ).fetchone()
+        documents -= sum(len(docs) for docs in deleted.values())
+        if documents <= 0:
+            return []
+        average_length = tokens / max(documents, 1)
+        # document frequencies over the whole index, deleted documents are a small error
+        idf = {}
+        for term in terms:
+            df = sum(segment.doc_freq(term) for segment in segments.values())
+            idf[term] = np.log(1 + (documents - df + 0.5) / (df + 0.5))
+
+        candidates = []
+        for name, segment in segments.items():
+            matched = self._live(name, segment, deleted)
+            if forms is not None:
+                matched &= np.isin(segment.forms, segment.form_codes(forms))
+            scores = np.zeros(len(segment))
+            lengths = np.asarray(segment.lengths, dtype=np.float64)
+            for clause in clauses:
+                if len(clause) > 1:
+                    matched &= segment.phrase(clause)
+                    continue
+                postings = segment.postings(clause[0])
+                present = np.zeros(len(segment), dtype=bool)
+                if postings is not None:
+                    present[postings[0]] = True
+                matched &= present
+            docs = np.flatnonzero(matched)
+            if not len(docs):
+                continue
+            for term in terms:
+                postings = segment.postings(term)
+                if postings is None:
+                    continue
+                term_docs, tfs = postings[0], postings[1].astype(np.float64)
+                norm = K1 * (1 - B + B * lengths[term_docs] / average_length)
+                scores[term_docs] += idf[term] * tfs * (K1 + 1) / (tfs + norm)
+            if len(docs) > limit:
+                docs = docs[np.argpartition(-scores[docs], limit)[:limit]]
+            candidates.extend((float(scores[doc]), name, int(doc)) for doc in docs)
+
+        candidates.sort(key=lambda candidate: -candidate[0])
+        hits = []
+        for score, name, doc in candidates[:limit]:
+            row = self._db.execute(
+                "SELECT path, form, ticker FROM documents WHERE segment = ? AND doc = ?",
+                (name, doc),
+            ).fetchone()
+            if row is not None:
+                hits.append(Hit(path=row[0], score=score, form=row[1], ticker=row[2]))
+        return hits
+
+    def stats(self) -> dict:
+        """Number of segments, indexed documents and tokens"""
+        segments, tokens = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM segments"
+        ).fetchone()
+        documents = self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {"segments": segments, "documents": documents, "tokens": tokens}
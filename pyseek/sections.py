@@ -0,0 +1,277 @@
+"""Split 10-K and 10-Q filings into their items
+
+Annual and quarterly reports are organised in numbered items, e.g. Item 1A Risk
+Factors or Item 7 Management's Discussion and Analysis. A filing's text is
+written once to `sections/<accession>.txt` in the configuration directory, one
+block per line, and a single pass over the lines finds every item heading with
+its byte offset. The offsets are kept next to the text in a .json file, so a
+section is read later by seeking to its start, without parsing the HTML again
+or reading the rest of the document.
+
+A heading is a short line starting with "Item" and an item number. The table of
+contents lists every heading too, so when an item appears more than once the
+occurrence followed by the most text is taken as the real one.
+"""
+
+import bisect
+import json
+import os
+import re
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import typer
+
+from pyseek import edgar, htmltext, setup
+
+app = typer.Typer()
+
+SECTIONS_DIRECTORY = "sections"
+# longer lines are paragraphs that happen to start with "Item"
+MAX_HEADING_BYTES = 200
+PART = re.compile(r"^part\s+(iv|i{1,3})\b", re.IGNORECASE)
+ITEM = re.compile(
+    r"^(?:part\s+(?P<part>iv|i{1,3})\W+)?item\s*(?P<item>\d{1,2}[a-c]?)\b[\s.:\-–—]*(?P<title>.*)$",
+    re.IGNORECASE,
+)
+
+
+class Section(NamedTuple):
+    part: Optional[str]
+    item: str
+    title: str
+    start: int
+    end: int
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+
+def _text_lines(blocks: Iterable[str]) -> Iterator[bytes]:
+    """Encode non empty blocks as lines, whitespace inside a block collapsed"""
+    for block in blocks:
+        line = " ".join(block.split())
+        if line:
+            yield (line + "\n").encode("utf-8")
+
+
+def locate_sections(lines: Iterable[bytes]) -> List[Section]:
+    """Find the items of a filing in one pass over its lines
+
+    Args:
+        lines (Iterable[bytes]): the text, e.g. a file opened in binary mode
+
+    Returns:
+        List[Section]: one section per item, in document order, with byte offsets into the text
+    """
+    headings: List[Tuple[Optional[str], str, str, int]] = []
+    parts: List[int] = []
+    part = None
+    untitled = False
+    offset = 0
+    for line in lines:
+        if len(line) <= MAX_HEADING_BYTES:
+            text = line.decode("utf-8", errors="replace").strip()
+            match = PART.match(text)
+            if match:
+                part = match.group(1).upper()
+                parts.append(offset)
+            match = ITEM.match(text)
+            if match:
+                if match.group("part"):
+                    part = match.group("part").upper()
+                title = match.group("title").strip(" .:-–—")
+                headings.append((part, match.group("item").upper(), title, offset))
+                untitled = not title
+            elif untitled and text:
+                # the title is often in a block of its own after the number
+                headings[-1] = headings[-1][:2] + (text,) + headings[-1][3:]
+                untitled = False
+        else:
+            untitled = False
+        offset += len(line)
+
+    # keep, per item, the heading followed by the most text before the next one
+    best = {}
+    for i, (part, item, title, start) in enumerate(headings):
+        following = headings[i + 1][3] if i + 1 < len(headings) else offset
+        if (part, item) not in best or following - start > best[(part, item)][0]:
+            best[(part, item)] = (following - start, title, start)
+    starts = sorted(
+        (start, part, item, title) for (part, item), (_, title, start) in best.items()
+    )
+
+    sections = []
+    for i, (start, part, item, title) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else offset
+        # a part heading between two items belongs to neither
+        following_part = bisect.bisect_right(parts, start)
+        if following_part < len(parts):
+            end = min(end, parts[following_part])
+        sections.append(Section(part, item, title, start, end))
+    return sections
+
+
+def find_section(
+    sections: Iterable[Section], item: str, part: Optional[str] = None
+) -> Optional[Section]:
+    """The section of an item
+
+    Args:
+        sections (Iterable[Section]): from `locate_sections`
+        item (str): e.g. 1A or 7
+        part (str, optional): I, II, III or IV. 10-Q filings number the items of
+            each part from 1. Defaults to the largest matching item.
+
+    Returns:
+        Optional[Section]: None when the filing has no such item
+    """
+    item, part = item.upper(), part.upper() if part else None
+    matches = [
+        section
+        for section in sections
+        if section.item == item and (part is None or section.part == part)
+    ]
+    return max(matches, key=lambda section: section.size, default=None)
+
+
+def read_section(path: Path, section: Section) -> str:
+    """Read one section of a text file without reading the rest
+
+    Args:
+        path (Path): the text the section was located in
+        section (Section): the section
+
+    Returns:
+        str: its text
+    """
+    with open(path, "rb") as fp:
+        fp.seek(section.start)
+        return fp.read(section.size).decode("utf-8")
+
+
+def _write_text(blocks: Iterable[str], fp: BinaryIO) -> Iterator[bytes]:
+    for line in _text_lines(blocks):
+        fp.write(line)
+        yield line
+
+
+def split_filing(report, path: Path) -> List[Section]:
+    """Write the text of a filing and locate its sections while doing so
+
+    Args:
+        report (Union[str, bytes]): the HTML document
+        path (Path): the text file to write, with the sections in a .json file next to it
+
+    Returns:
+        List[Section]: the sections
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fp:
+        sections = locate_sections(_write_text(htmltext.iter_text_blocks([report]), fp))
+    with open(tmp.with_suffix(".json"), "w") as fp:
+        json.dump([section._asdict() for section in sections], fp)
+    # the offsets are only valid with their text, so the text is replaced first
+    os.replace(tmp, path)
+    os.replace(tmp.with_suffix(".json"), path.with_suffix(".json"))
+    return sections
+
+
+def load_sections(path: Path) -> List[Section]:
+    """The sections of a text file, from its .json file or by locating them
+
+    Args:
+        path (Path): a text file, e.g. written by `split_filing` or `submissions download`
+
+    Returns:
+        List[Section]: the sections
+    """
+    path = Path(path)
+    offsets = path.with_suffix(".json")
+    if offsets.exists() and offsets.stat().st_mtime >= path.stat().st_mtime:
+        with open(offsets, "r") as fp:
+            return [Section(**section) for section in json.load(fp)]
+    with open(path, "rb") as fp:
+        return locate_sections(fp)
+
+
+def section_path(accession_number: str, directory: Optional[Path] = None) -> Path:
+    """Where the text of a filing is kept"""
+    directory = directory or Path(setup.CONFIGURATION_DIRECTORY) / SECTIONS_DIRECTORY
+    return Path(directory) / f"{accession_number}.txt"
+
+
+def get_sections(
+    cik: edgar.central_index_key,
+    accession_number: str,
+    primary_document: str,
+    directory: Optional[Path] = None,
+) -> Tuple[Path, List[Section]]:
+    """The sections of a filing, downloading and splitting it the first time
+
+    Args:
+        cik (central_index_key): CIK, str, int
+        accession_number (str): Accession number of the filing
+        primary_document (str): Name of its primary document
+        directory (Path, optional): where split filings are kept. Defaults to sections/ in the configuration directory.
+
+    Raises:
+        requests.HTTPError: when the filing cannot be downloaded
+
+    Returns:
+        Tuple[Path, List[Section]]: the text file and its sections, see `read_section`
+    """
+    path = section_path(accession_number, directory)
+    if path.exists():
+        return path, load_sections(path)
+    report = edgar.download_company_submission(cik, accession_number, primary_document)
+    return path, split_filing(report, path)
+
+
+def get_section(
+    cik: edgar.central_index_key,
+    accession_number: str,
+    primary_document: str,
+    item: str,
+    part: Optional[str] = None,
+    directory: Optional[Path] = None,
+) -> Optional[str]:
+    """The text of one item of a filing, see `get_sections` and `find_section`
+
+    Returns:
+        Optional[str]: None when the filing has no such item
+    """
+    path, sections = get_sections(cik, accession_number, primary_document, directory)
+    section = find_section(sections, item, part)
+    return read_section(path, section) if section else None
+
+
+@app.command("list")
+def list_sections(
+    path: Path = typer.Argument(
+        ..., help="Text of a filing, e.g. from submissions download"
+    ),
+):
+    """List the items of a filing with their byte offsets"""
+    for section in load_sections(path):
+        print(
+            f"{section.part or '-':4} {section.item:4} {section.start:>10} {section.size:>10}  {section.title}"
+        )
+
+
+@app.command("show")
+def show_section(
+    path: Path = typer.Argument(
+        ..., help="Text of a filing, e.g. from submissions download"
+    ),
+    item: str = typer.Option(..., "--item", "-t", help="Item number, e.g. 1A or 7"),
+    part: str = typer.Option(None, "--part", "-p", help="Part number, e.g. II"),
+):
+    """Print one item of a filing"""
+    section = find_section(load_sections(path), item, part)
+    if section is None:
+        raise typer.BadParameter(f"{path} has no item {item}")
+    print(read_section(path, section), end="")
@@ -0,0 +1,68 @@
+"""Holds the shared HTTP session used for every request to the SEC
+
+Creating a `requests.Session` once per process lets urllib3 keep the TCP/TLS
+connections to www.sec.gov and data.sec.gov alive between calls, and the
+User-Agent header only has to be read from config.ini a single time.
+"""
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pyseek import config
+
+_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    """Create a session with a connection pool sized from config.ini
+
+    Returns:
+        requests.Session: session with the SEC headers already applied
+    """
+    pool = config.get_connection_settings()
+    adapter = HTTPAdapter(
+        pool_connections=pool["pool_connections"],
+        pool_maxsize=pool["pool_maxsize"],
+        pool_block=True,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(
+        {
+            "User-Agent": config.get_api_settings()["User-Agent"],
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        }
+    )
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process wide session, creating it on first use
+
+    Returns:
+        requests.Session: the shared session
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def close_session() -> None:
+    """Close the shared session so the next call rebuilds it
+
+    Useful after the configuration has changed, e.g. after `pyseek init`.
+    """
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
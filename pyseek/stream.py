@@ -0,0 +1,170 @@
+"""Incremental parsing of companyfacts documents
+
+The companyfacts document of a large filer is tens of megabytes. Instead of
+materializing all of it, the functions here walk the outer objects (document,
+facts, taxonomy) key by key as the bytes arrive and only decode one concept at a
+time, so memory stays bounded by the largest single concept and callers can stop
+reading as soon as they have what they need.
+"""
+
+import codecs
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class FactRecord(NamedTuple):
+    taxonomy: str
+    concept: str
+    unit: str
+    fact: dict
+
+
+class _Reader:
+    """Pull parser over an iterable of utf-8 byte chunks
+
+    Args:
+        chunks (Iterable[bytes]): the document, in any chunk size
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, need: int = 1) -> bool:
+        """Read chunks until at least `need` characters are buffered past pos
+
+        Returns:
+            bool: False once the input is exhausted
+        """
+        parts = [self.buf[self.pos :]]
+        available = len(parts[0])
+        while available < need and not self.eof:
+            try:
+                text = self._utf8.decode(next(self._chunks))
+            except StopIteration:
+                text = self._utf8.decode(b"", final=True)
+                self.eof = True
+            parts.append(text)
+            available += len(text)
+        self.buf = "".join(parts)
+        self.pos = 0
+        return available >= need
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, "" at the end"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r} at {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete json value"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            # grow geometrically so large values are decoded a bounded number of times
+            self._fill(2 * (len(self.buf) - self.pos) + 1)
+
+    def object_keys(self) -> Iterator[str]:
+        """Iterate over the keys of the next object
+
+        The caller must consume the value of each key before asking for the next one.
+        """
+        self.expect("{")
+        first = True
+        while True:
+            char = self.peek()
+            if char == "}":
+                self.pos += 1
+                return
+            if not first:
+                self.expect(",")
+            first = False
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected an object key, found {key!r}")
+            self.expect(":")
+            yield key
+
+
+def read_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Read a file in chunks
+
+    Args:
+        path (Path): the file to read
+        chunk_size (int, optional): bytes per chunk. Defaults to CHUNK_SIZE.
+
+    Returns:
+        Iterator[bytes]: the file contents
+    """
+    with open(path, "rb") as fp:
+        yield from iter(lambda: fp.read(chunk_size), b"")
+
+
+def iter_concepts(
+    chunks: Iterable[bytes], metadata: Optional[dict] = None
+) -> Iterator[Tuple[str, str, dict]]:
+    """Yield every concept of a companyfacts document as it is parsed
+
+    Args:
+        chunks (Iterable[bytes]): the companyfacts json
+        metadata (dict, optional): filled with the top level values other than facts, e.g. cik and entityName
+
+    Returns:
+        Iterator[Tuple[str, str, dict]]: taxonomy, concept and the concept's label, description and units
+    """
+    reader = _Reader(chunks)
+    for key in reader.object_keys():
+        if key != "facts":
+            value = reader.value()
+            if metadata is not None:
+                metadata[key] = value
+            continue
+        for taxonomy in reader.object_keys():
+            for concept in reader.object_keys():
+                yield taxonomy, concept, reader.value()
+
+
+def iter_company_facts(
+    chunks: Iterable[bytes], metadata: Optional[dict] = None
+) -> Iterator[FactRecord]:
+    """Yield every fact of a companyfacts document as it is parsed
+
+    Args:
+        chunks (Iterable[bytes]): the companyfacts json
+        metadata (dict, optional): filled with the top level values other than facts
+
+    Returns:
+        Iterator[FactRecord]: taxonomy, concept, unit and the fact itself
+    """
+    for taxonomy, concept, body in iter_concepts(chunks, metadata):
+        for unit, facts in body.get("units", {}).items():
+            for fact in facts:
+                yield FactRecord(taxonomy, concept, unit, fact)
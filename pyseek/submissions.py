@@ -1,49 +1,51 @@
+import requests
 import typer
-import pandas as pd
-from bs4 import BeautifulSoup
-from bs4.element import Tag
-from pyseek import edgar, _read, utils, models
+from datetime import datetime
+from pathlib import Path
+from typing import List
+from pyseek import (
+    bulk,
+    edgar,
+    _read,
+    htmltext,
+    query,
+    search,
+    sections,
+    utils,
+    models,
+)
 
 app = typer.Typer()
 
 
 def extractText(report: str) -> str:
-    blocks = ["p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "td", "th"]
+    """Extract the text of a filing, one block (paragraph, heading, list item, cell) per line
 
-    def to_plaintext(html_text: str) -> str:
-        soup = BeautifulSoup(html_text, features="lxml")
-        extracted_blocks = _extract_blocks(soup.body)
-        extracted_blocks_texts = [
-            block.get_text().strip() for block in extracted_blocks
-        ]
-        return "\n".join(extracted_blocks_texts)
+    Args:
+        report (str): the filing HTML
 
-    def _extract_blocks(parent_tag) -> list:
-        extracted_blocks = []
-        for tag in parent_tag:
-            if tag.name in blocks:
-                extracted_blocks.append(tag)
-                continue
-            if isinstance(tag, Tag):
-                if len(tag.contents) > 0:
-                    inner_blocks = _extract_blocks(tag)
-                    if len(inner_blocks) > 0:
-                        extracted_blocks.extend(inner_blocks)
-
-        return extracted_blocks
-
-    return to_plaintext(report)
+    Returns:
+        str: the extracted text
+    """
+    return htmltext.extract_text(report)
 
 
 @app.command()
 def get(
     company: str = typer.Argument(..., help="CIK number or ticker of the company"),
     record: str = typer.Option(None, "--record", "-f", help="record to save the data"),
+    recent_only: bool = typer.Option(
+        False, "--recent-only", help="Only the most recent filings, skip older pages"
+    ),
 ) -> dict:
     """Get all the company submissions for a given CIK, returns a csv"""
     company = utils.validate_ticker_or_cik(company)
-    results = edgar.get_all_company_submissions(company.cik_str)
-    df = _read.read_submissions(results)
+    if recent_only:
+        df = _read.read_submissions(edgar.get_all_company_submissions(company.cik_str))
+    else:
+        df = _read.read_submissions(
+            *edgar.get_company_submissions_history(company.cik_str)
+        )
 
     record = utils.validate_submission_record(company=company, record=record)
 
@@ -58,16 +60,36 @@ def filter(
     record: str = typer.Option(
         None, "--record", "-r", help="Filename to save the data"
     ),
-    form: models.Form = typer.Option(
-        models.Form.tenk, "--form", "-f", help="Filing type to filter by"
+    forms: List[models.Form] = typer.Option(
+        [models.Form.tenk], "--form", "-f", help="Filing types to filter by"
+    ),
+    since: datetime = typer.Option(
+        None, "--since", "-s", formats=["%Y-%m-%d"], help="Earliest filing date"
     ),
+    until: datetime = typer.Option(
+        None, "--until", "-u", formats=["%Y-%m-%d"], help="Latest filing date"
+    ),
+    items: List[str] = typer.Option(
+        None, "--item", "-i", help="8-K items, e.g. 2.02, matching any of them"
+    ),
+    min_size: int = typer.Option(None, "--min-size", help="Smallest size in bytes"),
+    max_size: int = typer.Option(None, "--max-size", help="Largest size in bytes"),
 ):
-    """Given a submissions file, filter by form type"""
+    """Given a submissions file, filter by form type, filing date, items and size"""
     if not company and not record:
         raise typer.BadParameter("You must provide either a company or a record")
     record = utils.validate_submission_record(company=company, record=record)
-    df = pd.read_csv(record)
-    print(df[df["form"] == form.value])
+    print(
+        query.select(
+            query.load(record),
+            forms=[form.value for form in forms],
+            since=since,
+            until=until,
+            items=items or None,
+            min_size=min_size,
+            max_size=max_size,
+        )
+    )
 
 
 @app.command()
@@ -85,20 +107,116 @@ def download(
         True, " /--latest", " /-l", help="Download the latest flag"
     ),
     number: int = typer.Option(1, "--number", "-n", help="The number to download"),
+    index: bool = typer.Option(
+        False, "--index", "-i", help="Add the downloaded text to the search index"
+    ),
+    items: List[str] = typer.Option(
+        None, "--item", "-t", help="Only save these items, e.g. 1A or 7"
+    ),
 ):
     """Download a sec company submission"""
     record = utils.validate_submission_record(company=company, record=record)
-    df = pd.read_csv(record)
+    df = query.load(record)
     company = utils.validate_ticker_or_cik(company)
     # items are sorted by filingDate, with most recent on top
-    forms = df[df["form"] == form.value]
-
-    if latest:
-        most_recent_form = forms.iloc[0]
-        accn = most_recent_form["accessionNumber"]
-        primaryDoc = most_recent_form["primaryDocument"]
-    report = edgar.download_company_submission(company.cik_str, accn, primaryDoc)
-    soup = BeautifulSoup(report, "html.parser")
-    # report = soup.get_text()
-    with open(f"{company.ticker}_{form.value}.txt", "w") as f:
-        f.write(soup.get_text(separator="\n", strip=True))
+    forms = query.select(df, forms=[form.value])
+    forms = forms.head(number) if latest else forms.tail(number)
+    written = []
+
+    for accn, primaryDoc in forms[["accessionNumber", "primaryDocument"]].itertuples(
+        index=False, name=None
+    ):
+        filename = f"{company.ticker}_{form.value}.txt"
+        if number > 1:
+            filename = f"{company.ticker}_{form.value}_{accn}.txt"
+        try:
+            if items:
+                # split filings are kept by accession number, so items are extracted once
+                path, found = sections.get_sections(company.cik_str, accn, primaryDoc)
+            else:
+                report = edgar.download_company_submission(
+                    company.cik_str, accn, primaryDoc
+                )
+        except requests.RequestException as err:
+            typer.echo(f"{accn}: {err}", err=True)
+            continue
+        if items:
+            for item in items:
+                section = sections.find_section(found, item)
+                if section is None:
+                    typer.echo(f"{accn} has no item {item}", err=True)
+                    continue
+                item_filename = filename.replace(".txt", f"_item{item.upper()}.txt")
+                with open(item_filename, "w") as f:
+                    f.write(sections.read_section(path, section))
+                written.append(item_filename)
+            continue
+        with open(filename, "w") as f:
+            for block in htmltext.iter_text_blocks([report]):
+                if block:
+                    f.write(block + "\n")
+        written.append(filename)
+
+    if index:
+        search_index = search.SearchIndex()
+        search_index.add(written, form=form.value)
+        search_index.close()
+
+
+@app.command()
+def batch(
+    companies: List[str] = typer.Argument(
+        ..., help="CIK numbers or tickers of the companies, or 'all'"
+    ),
+    forms: List[models.Form] = typer.Option(
+        [models.Form.tenk], "--form", "-f", help="Filing types to download"
+    ),
+    since: datetime = typer.Option(
+        None, "--since", "-s", formats=["%Y-%m-%d"], help="Earliest filing date"
+    ),
+    until: datetime = typer.Option(
+        None, "--until", "-u", formats=["%Y-%m-%d"], help="Latest filing date"
+    ),
+    directory: Path = typer.Option(
+        Path("filings"), "--directory", "-o", help="Directory to download to"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of concurrent downloads"
+    ),
+    compression: models.Compression = typer.Option(
+        models.Compression.none, "--compress", "-c", help="Compress the files"
+    ),
+):
+    """Download every filing of the given forms for many companies
+
+    Filings already in the directory are skipped, so an interrupted run can be restarted.
+    """
+    companies = bulk.resolve_companies(companies)
+    typer.echo(f"Reading the submissions of {len(companies)} companies")
+    unread = []
+    submissions = bulk.load_submissions(companies, workers=workers, failed=unread)
+    for failure in unread:
+        typer.echo(failure, err=True)
+    if unread and submissions.empty:
+        raise typer.Exit(code=1)
+    filings = query.select(
+        query.typed(submissions),
+        forms=[form.value for form in forms],
+        since=since,
+        until=until,
+    )
+
+    with typer.progressbar(length=len(filings), label="Downloading") as progress:
+        result = bulk.download_filings(
+            filings,
+            directory=directory,
+            workers=workers,
+            compression=compression,
+            callback=lambda path: progress.update(1),
+        )
+    typer.echo(
+        f"downloaded {result.fetched}, skipped {result.skipped}, failed {len(result.failed)} "
+        f"in {result.seconds:.1f}s ({result.rate:.1f} files/s, {result.megabytes_per_second:.1f} MB/s)"
+    )
+    for failure in result.failed:
+        typer.echo(failure, err=True)
@@ -0,0 +1,125 @@
+"""Holds what was last fetched for each company, to skip refetching unchanged data
+
+A company's submissions document is small and its latest accession number
+changes exactly when it files something. `SyncState` records, per CIK and
+dataset, the latest accession number seen when the data was last fetched, so the
+heavy companyfacts document is only requested again for companies that filed
+since. The default store is `sync_state.sqlite` in the configuration directory,
+bulk runs keep their own next to the documents they write.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from pyseek import setup
+
+STATE_FILE = "sync_state.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    cik INTEGER NOT NULL,
+    dataset TEXT NOT NULL,
+    last_accession TEXT,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (cik, dataset)
+);
+"""
+
+
+class Synced(NamedTuple):
+    last_accession: Optional[str]
+    synced_at: float
+
+
+def latest_accession(submissions: dict) -> Optional[str]:
+    """The accession number of the most recent filing in a submissions document
+
+    Args:
+        submissions (dict): from `edgar.get_all_company_submissions`
+
+    Returns:
+        Optional[str]: None for a company without filings
+    """
+    accessions = submissions["filings"]["recent"]["accessionNumber"]
+    return accessions[0] if accessions else None
+
+
+class SyncState:
+    """Per company record of the last fetch, safe to share between threads
+
+    Args:
+        path (Path): the sqlite file
+    """
+
+    def __init__(self, path: Path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def get(self, cik, dataset: str) -> Optional[Synced]:
+        """The last fetch of a company's dataset, None when it was never fetched"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_accession, synced_at FROM sync_state"
+                " WHERE cik = ? AND dataset = ?",
+                (int(cik), dataset),
+            ).fetchone()
+        return Synced(*row) if row else None
+
+    def record(
+        self,
+        cik,
+        dataset: str,
+        last_accession: Optional[str],
+        synced_at: Optional[float] = None,
+    ) -> None:
+        """Remember that a company's dataset was fetched when its latest filing was last_accession"""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                (int(cik), dataset, last_accession, synced_at or time.time()),
+            )
+
+    def changed(self, cik, dataset: str, last_accession: Optional[str]) -> bool:
+        """Whether the company filed something since its dataset was last fetched
+
+        Args:
+            cik (int, str): the company
+            dataset (str): e.g. facts
+            last_accession (str): the company's latest accession number now
+
+        Returns:
+            bool: True when the data must be fetched again
+        """
+        synced = self.get(cik, dataset)
+        return synced is None or synced.last_accession != last_accession
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_state: Optional[SyncState] = None
+_lock = threading.Lock()
+
+
+def get_state() -> SyncState:
+    """Return the store in the configuration directory, opening it on first use"""
+    global _state
+    if _state is None:
+        with _lock:
+            if _state is None:
+                _state = SyncState(Path(setup.CONFIGURATION_DIRECTORY) / STATE_FILE)
+    return _state
+
+
+def reset_state() -> None:
+    """Close the store, the next use opens it again"""
+    global _state
+    with _lock:
+        if _state is not None:
+            _state.close()
+        _state = None
@@ -0,0 +1,534 @@
+"""Extract the tables of filing HTML into typed dataframes
+
+Tables are read in the same streaming way as `htmltext`: an lxml parser target
+collects the cells of each table as the parser reports them and hands a table
+back once it closes, so the document tree is never built. Spanning cells are
+repeated over every row and column they cover.
+
+Filings lay financial statements out with the currency sign, the number and
+the closing parenthesis in cells of their own, and with empty spacer columns.
+Those pieces are joined back together, empty columns dropped, and columns
+whose cells are all numbers parsed: "(1,234)" is -1234, "—" is 0, and amounts
+are multiplied out when the table or the text just before it says
+"in thousands" or "in millions". Percentages and per share amounts are left as
+they are.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import pandas as pd
+import typer
+from lxml import etree
+
+from pyseek import extract, htmltext
+
+app = typer.Typer()
+
+CELL_TAGS = frozenset(["td", "th"])
+# cells spanning more than this are treated as spanning one, they are malformed
+MAX_SPAN = 1000
+# characters of text before a table searched for its scale
+CONTEXT_CHARS = 500
+DASHES = frozenset(["-", "—", "–", "−", "$-", "$—", "$–"])
+NUMBER = re.compile(r"^\d*\.?\d+$")
+SCALE = re.compile(r"in\s+(thousands|millions|billions)", re.IGNORECASE)
+SCALES = {"thousands": 1e3, "millions": 1e6, "billions": 1e9}
+EXCEPT_PER_SHARE = re.compile(r"except\s+(?:for\s+)?per[\s-]share", re.IGNORECASE)
+PER_SHARE = re.compile(r"per[\s-]share", re.IGNORECASE)
+LONG_COLUMNS = ["table", "row", "label", "column", "value", "text"]
+
+
+class Table(NamedTuple):
+    rows: List[List[str]]
+    context: str
+
+
+@dataclass
+class TablesResult:
+    extracted: int = 0
+    tables: int = 0
+    bytes: int = 0
+    failed: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+class _OpenTable:
+    __slots__ = ("rows", "row", "cell", "span", "context")
+
+    def __init__(self, context: str):
+        self.rows: List[List[Tuple[str, int, int]]] = []
+        self.row: Optional[List[Tuple[str, int, int]]] = None
+        self.cell: Optional[List[str]] = None
+        self.span = (1, 1)
+        self.context = context
+
+    def close_cell(self):
+        if self.cell is not None:
+            if self.row is None:
+                self.row = []
+            self.row.append((" ".join("".join(self.cell).split()), *self.span))
+            self.cell = None
+
+    def close_row(self):
+        self.close_cell()
+        if self.row is not None:
+            self.rows.append(self.row)
+            self.row = None
+
+
+def _span(attrib, name: str) -> int:
+    try:
+        span = int(attrib.get(name, 1))
+    except ValueError:
+        return 1
+    return span if 1 <= span <= MAX_SPAN else 1
+
+
+class _TableCollector:
+    """lxml parser target that gathers the cells of every table"""
+
+    def __init__(self):
+        self.tables: List[Table] = []
+        self._open: List[_OpenTable] = []
+        self._skipped = 0
+        self._context = ""
+
+    def start(self, tag, attrib):
+        if tag in htmltext.SKIPPED_TAGS:
+            self._skipped += 1
+        elif tag == "table":
+            self._open.append(_OpenTable(self._context))
+        elif not self._open:
+            return
+        elif tag == "tr":
+            self._open[-1].close_row()
+            self._open[-1].row = []
+        elif tag in CELL_TAGS:
+            table = self._open[-1]
+            table.close_cell()
+            table.cell = []
+            # lxml hands over a plain dict only when the tag has attributes
+            table.span = (
+                (_span(attrib, "rowspan"), _span(attrib, "colspan"))
+                if attrib
+                else (1, 1)
+            )
+        elif tag == "br" or tag in htmltext.BLOCK_TAGS:
+            self.data(" ")
+
+    def end(self, tag):
+        if tag in htmltext.SKIPPED_TAGS:
+            self._skipped = max(0, self._skipped - 1)
+        elif not self._open:
+            return
+        elif tag == "table":
+            table = self._open.pop()
+            table.close_row()
+            self.tables.append(Table(_grid(table.rows), table.context))
+        elif tag == "tr":
+            self._open[-1].close_row()
+        elif tag in CELL_TAGS:
+            self._open[-1].close_cell()
+
+    def data(self, data):
+        if self._skipped:
+            return
+        if not self._open:
+            self._context = (self._context + data)[-CONTEXT_CHARS:]
+        elif self._open[-1].cell is not None:
+            self._open[-1].cell.append(data)
+
+    def close(self):
+        return None
+
+
+def _grid(rows: List[List[Tuple[str, int, int]]]) -> List[List[str]]:
+    """Lay cells out on a grid, repeating spanning cells in every position they cover"""
+    grid: List[List[str]] = []
+    # column -> text of a cell spanning into the next rows, and how many rows
+    carried: Dict[int, List] = {}
+
+    def take(column: int) -> str:
+        text = carried[column][0]
+        carried[column][1] -= 1
+        if not carried[column][1]:
+            del carried[column]
+        return text
+
+    for cells in rows:
+        line: List[str] = []
+        for text, rowspan, colspan in cells:
+            while len(line) in carried:
+                line.append(take(len(line)))
+            for _ in range(colspan):
+                if rowspan > 1:
+                    carried[len(line)] = [text, rowspan - 1]
+                line.append(text)
+        while carried and max(carried) >= len(line):
+            line.append(take(len(line)) if len(line) in carried else "")
+        grid.append(line)
+    width = max((len(line) for line in grid), default=0)
+    return [line + [""] * (width - len(line)) for line in grid]
+
+
+def iter_tables(chunks: Iterable[Union[str, bytes]]) -> Iterator[Table]:
+    """Yield every table of an HTML document as a grid of cell texts
+
+    A table nested in a cell is yielded on its own, before the table around it.
+
+    Args:
+        chunks (Iterable[Union[str, bytes]]): the HTML document, all str or all bytes
+
+    Returns:
+        Iterator[Table]: the cells row by row, and the text just before the table
+    """
+    collector = _TableCollector()
+    parser = etree.HTMLParser(target=collector, recover=True, huge_tree=True)
+    for chunk in chunks:
+        for start in range(0, len(chunk), htmltext.FEED_SIZE):
+            parser.feed(chunk[start : start + htmltext.FEED_SIZE])
+            if collector.tables:
+                yield from collector.tables
+                collector.tables = []
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        # raised for an empty document
+        pass
+    yield from collector.tables
+
+
+def parse_number(text: str) -> Optional[float]:
+    """Parse a number as filings print it
+
+    Args:
+        text (str): e.g. $ 1,234.5 or (12) or 4.5% or —
+
+    Returns:
+        Optional[float]: the number, None when text is not one
+    """
+    text = text.strip()
+    if text in DASHES:
+        return 0.0
+    negative = text.startswith("-") or text.startswith("−") or "(" in text
+    digits = text.strip("$%()-−– ").replace(",", "").replace("$", "").strip()
+    if not NUMBER.match(digits):
+        return None
+    value = float(digits)
+    return -value if negative else value
+
+
+def _join_pieces(line: List[str]) -> List[str]:
+    """Join currency signs, parentheses and percent signs to the number in the next or previous cell"""
+    line = list(line)
+    opening = ""
+    last = None
+    for i, text in enumerate(line):
+        if text in ("$", "(", "$(", "($"):
+            opening += "(" if "(" in text else ""
+            line[i] = ""
+        elif text in (")", "%", ")%", "%)") and last is not None:
+            line[last] += text
+            line[i] = ""
+        elif text:
+            line[i] = opening + text
+            opening = ""
+            last = i
+    return line
+
+
+def _header_rows(rows: List[List[str]]) -> int:
+    """Leading rows without a label and a number, column headings and units"""
+    for i, row in enumerate(rows):
+        if row[0] and any(parse_number(text) is not None for text in row[1:] if text):
+            return i
+    return 0
+
+
+def to_frame(table: Table) -> pd.DataFrame:
+    """Type a table, see the module documentation
+
+    Args:
+        table (Table): from `iter_tables`
+
+    Returns:
+        pd.DataFrame: a string column per label or text column and a Float64 column
+            per numeric one, named by the header rows. attrs holds the scale applied.
+    """
+    rows = [_join_pieces(row) for row in table.rows]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return pd.DataFrame()
+    headers = _header_rows(rows)
+    body = rows[headers:]
+    width = len(rows[0])
+    columns = [
+        column for column in range(width) if any(row[column] for row in (body or rows))
+    ]
+    # a cell spanning several columns fills each of them
+    columns = [
+        column
+        for i, column in enumerate(columns)
+        if not i or any(row[column] != row[columns[i - 1]] for row in rows)
+    ]
+
+    names: List[str] = []
+    for i, column in enumerate(columns):
+        parts = []
+        for row in rows[:headers]:
+            if row[column] and row[column] not in parts:
+                parts.append(row[column])
+        name = " ".join(parts) or ("label" if i == 0 else f"column{i}")
+        while name in names:
+            name += "_"
+        names.append(name)
+
+    hint = table.context + " " + " ".join(" ".join(row) for row in rows[:headers])
+    scales = SCALE.findall(hint)
+    scale = SCALES[scales[-1].lower()] if scales else 1.0
+    per_share_unscaled = bool(EXCEPT_PER_SHARE.search(hint))
+
+    data = {}
+    for i, (name, column) in enumerate(zip(names, columns)):
+        texts = [row[column] for row in body]
+        values = [parse_number(text) if text else None for text in texts]
+        numeric = (
+            i > 0
+            and any(texts)
+            and all(value is not None for value, text in zip(values, texts) if text)
+        )
+        if not numeric:
+            data[name] = pd.array(texts, dtype="string")
+            continue
+        for j, (value, text, row) in enumerate(zip(values, texts, body)):
+            unscaled = "%" in text or (
+                per_share_unscaled and PER_SHARE.search(row[columns[0]])
+            )
+            if value is not None and not unscaled:
+                values[j] = value * scale
+        data[name] = pd.array(values, dtype="Float64")
+    df = pd.DataFrame(data, columns=names)
+    df.attrs["scale"] = scale
+    return df
+
+
+def extract_tables(
+    report: Union[str, bytes, Iterable[Union[str, bytes]]], numeric_only: bool = True
+) -> List[pd.DataFrame]:
+    """Every table of a filing as a typed dataframe, see `to_frame`
+
+    Args:
+        report (Union[str, bytes, Iterable]): the HTML document, or chunks of it
+        numeric_only (bool, optional): skip tables without a numeric column, which
+            filings use for layout. Defaults to True.
+
+    Returns:
+        List[pd.DataFrame]: the tables in document order
+    """
+    chunks = [report] if isinstance(report, (str, bytes)) else report
+    frames = []
+    for table in iter_tables(chunks):
+        df = to_frame(table)
+        if numeric_only and not any(
+            isinstance(dtype, pd.Float64Dtype) for dtype in df.dtypes
+        ):
+            continue
+        frames.append(df)
+    return frames
+
+
+def long_format(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """One row per cell of many tables, for mining a corpus
+
+    Args:
+        frames (List[pd.DataFrame]): from `extract_tables`
+
+    Returns:
+        pd.DataFrame: the columns in LONG_COLUMNS, value holds numbers and text everything else
+    """
+    parts = []
+    for number, df in enumerate(frames):
+        if df.empty:
+            continue
+        label = df.iloc[:, 0].astype("string")
+        for name in df.columns[1:]:
+            column = df[name]
+            numeric = isinstance(column.dtype, pd.Float64Dtype)
+            parts.append(
+                pd.DataFrame(
+                    {
+                        "table": number,
+                        "row": range(len(df)),
+                        "label": label,
+                        "column": name,
+                        "value": column if numeric else pd.NA,
+                        "text": pd.NA if numeric else column,
+                    }
+                )
+            )
+    if not parts:
+        parts = [pd.DataFrame(columns=LONG_COLUMNS)]
+    df = pd.concat(parts, ignore_index=True)
+    return df.astype(
+        {
+            "table": "uint32",
+            "row": "uint32",
+            "label": "string",
+            "column": "string",
+            "value": "Float64",
+            "text": "string",
+        }
+    )
+
+
+def _write_tables(chunks: Iterator[str], output: Path) -> int:
+    """Write the tables of a filing to output in `long_format`
+
+    Returns:
+        int: number of tables written
+    """
+    frames = extract_tables(chunks)
+    df = long_format(frames)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        tmp = output.with_name(output.name + ".part")
+        df.to_parquet(tmp, index=False)
+    except ImportError:
+        # without pyarrow the tables are written as csv
+        output = output.with_suffix(".csv")
+        tmp = output.with_name(output.name + ".part")
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, output)
+    return len(frames)
+
+
+def extract_filings(
+    filings: Iterable[Path],
+    output: Path,
+    root: Optional[Path] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    max_memory: Optional[int] = None,
+    max_tasks_per_worker: Optional[int] = 64,
+    callback: Optional[Callable[[str], None]] = None,
+) -> TablesResult:
+    """Extract the tables of every filing over a pool of processes
+
+    Each filing's tables are written to one .parquet file in `long_format`.
+
+    Args:
+        filings (Iterable[Path]): the filings, see `extract.find_filings`
+        output (Path): the directory to write to
+        root (Path, optional): output files mirror the filing paths relative to root. Defaults to flat names.
+        workers (int, optional): number of processes. Defaults to the number of cpus.
+        chunksize (int, optional): filings handed to a worker at a time. Defaults to 16.
+        max_memory (int, optional): address space limit per worker in bytes. Defaults to no limit.
+        max_tasks_per_worker (int, optional): chunks a worker handles before it is replaced. Defaults to 64.
+        callback (Callable, optional): called with the filing path after each filing
+
+    Returns:
+        TablesResult: number of filings and tables extracted, bytes read and failures
+    """
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    def jobs():
+        for path in filings:
+            path = Path(path)
+            name = path.relative_to(root) if root else Path(path.name)
+            table_name = Path(extract._filing_name(name)).stem + ".parquet"
+            yield path, output / name.with_name(table_name)
+
+    result = TablesResult()
+    start = time.monotonic()
+    for path, size, tables, error in extract.run_pool(
+        _write_tables,
+        jobs(),
+        workers=workers,
+        chunksize=chunksize,
+        max_memory=max_memory,
+        max_tasks_per_worker=max_tasks_per_worker,
+    ):
+        if error:
+            result.failed.append(f"{path}: {error}")
+        else:
+            result.extracted += 1
+            result.tables += tables
+            result.bytes += size
+        if callback:
+            callback(path)
+    result.seconds = time.monotonic() - start
+    return result
+
+
+@app.command("show")
+def show_tables(
+    path: Path = typer.Argument(..., help="A downloaded filing"),
+    number: int = typer.Option(
+        None, "--table", "-t", help="Only the table with this number"
+    ),
+    everything: bool = typer.Option(
+        False, "--all", "-a", help="Include tables without numbers"
+    ),
+):
+    """Print the tables of a filing"""
+    frames = extract_tables(extract.read_filing(path), numeric_only=not everything)
+    for i, df in enumerate(frames):
+        if number is None or number == i:
+            typer.echo(f"table {i} (scale {df.attrs.get('scale', 1.0):g})")
+            typer.echo(df.to_string(index=False))
+            typer.echo("")
+
+
+@app.command("extract")
+def extract_command(
+    source: Path = typer.Argument(
+        ...,
+        help="Directory of downloaded filings, or a file listing one filing per line",
+    ),
+    output: Path = typer.Option(
+        Path("tables"), "--output", "-o", help="Output directory"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of processes, defaults to the cpu count"
+    ),
+    chunksize: int = typer.Option(
+        16, "--chunksize", help="Filings handed to a worker at a time"
+    ),
+    max_memory: int = typer.Option(
+        None, "--max-memory", help="Memory limit per worker in MB"
+    ),
+):
+    """Extract the tables of downloaded filings using all cpus"""
+    filings = extract.find_filings(source)
+    with typer.progressbar(length=len(filings), label="Extracting") as progress:
+        result = extract_filings(
+            filings,
+            output,
+            root=source if source.is_dir() else None,
+            workers=workers,
+            chunksize=chunksize,
+            max_memory=max_memory * 1024**2 if max_memory else None,
+            callback=lambda path: progress.update(1),
+        )
+    typer.echo(
+        f"extracted {result.tables} tables from {result.extracted} filings, "
+        f"failed {len(result.failed)} in {result.seconds:.1f}s"
+    )
+    for failure in result.failed:
+        typer.echo(failure, err=True)
@@ -0,0 +1,158 @@
+"""Holds the index over company_tickers.json used for ticker and CIK lookups
+
+`pyseek init` writes the SEC ticker list to the configuration directory and
+builds `company_index.sqlite` from it. The first lookup in a process loads the
+index into hash maps keyed by ticker and CIK, plus a sorted title list for
+prefix search, and later lookups never touch the disk again.
+"""
+
+import bisect
+import difflib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pyseek import setup
+
+TICKERS_FILE = "company_tickers.json"
+INDEX_FILE = "company_index.sqlite"
+
+
+def build_index(tickers: dict, directory: str = None) -> Path:
+    """Write the sqlite index for the SEC ticker list
+
+    Args:
+        tickers (dict): the company_tickers.json document
+        directory (str, optional): where to write the index. Defaults to the configuration directory.
+
+    Returns:
+        Path: the index file
+    """
+    path = Path(directory or setup.CONFIGURATION_DIRECTORY) / INDEX_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+    with sqlite3.connect(tmp) as db:
+        db.execute(
+            "CREATE TABLE companies (rank INTEGER PRIMARY KEY, cik INTEGER, ticker TEXT, title TEXT)"
+        )
+        db.executemany(
+            "INSERT INTO companies VALUES (?, ?, ?, ?)",
+            (
+                (int(rank), int(c["cik_str"]), c["ticker"].upper(), c["title"])
+                for rank, c in tickers.items()
+            ),
+        )
+        db.execute("CREATE INDEX companies_ticker ON companies (ticker)")
+        db.execute("CREATE INDEX companies_cik ON companies (cik)")
+    db.close()
+    tmp.replace(path)
+    global _index
+    _index = None
+    return path
+
+
+class CompanyIndex:
+    """In-memory lookup tables over the SEC ticker list
+
+    Args:
+        companies (List[dict]): rows with title, ticker and cik_str, in SEC order
+    """
+
+    def __init__(self, companies: List[dict]):
+        self.companies = companies
+        self._by_ticker: Dict[str, List[dict]] = {}
+        self._by_cik: Dict[int, List[dict]] = {}
+        for company in companies:
+            self._by_ticker.setdefault(company["ticker"], []).append(company)
+            self._by_cik.setdefault(company["cik_str"], []).append(company)
+        self._titles = sorted(
+            (company["title"].upper(), i) for i, company in enumerate(companies)
+        )
+        self._title_keys = [title for title, _ in self._titles]
+
+    @classmethod
+    def load(cls, path: Path) -> "CompanyIndex":
+        """Read the index written by `build_index`"""
+        with sqlite3.connect(path) as db:
+            rows = db.execute(
+                "SELECT cik, ticker, title FROM companies ORDER BY rank"
+            ).fetchall()
+        db.close()
+        return cls(
+            [
+                {"cik_str": cik, "ticker": ticker, "title": title}
+                for cik, ticker, title in rows
+            ]
+        )
+
+    def by_ticker(self, ticker: str) -> List[dict]:
+        """Companies listed under ticker"""
+        return self._by_ticker.get(ticker.upper(), [])
+
+    def by_cik(self, cik: int) -> List[dict]:
+        """Tickers listed for the cik number"""
+        return self._by_cik.get(int(cik), [])
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Find companies by ticker, title prefix, or approximate title
+
+        Args:
+            query (str): ticker or (part of) the company name
+            limit (int, optional): maximum number of results. Defaults to 10.
+
+        Returns:
+            List[dict]: matching companies, exact ticker matches first
+        """
+        query = query.upper().strip()
+        results = list(self.by_ticker(query))
+        start = bisect.bisect_left(self._title_keys, query)
+        for title, i in self._titles[start:]:
+            if len(results) >= limit or not title.startswith(query):
+                break
+            results.append(self.companies[i])
+        if len(results) < limit:
+            for title in difflib.get_close_matches(
+                query, self._title_keys, n=limit, cutoff=0.6
+            ):
+                i = self._titles[bisect.bisect_left(self._title_keys, title)][1]
+                results.append(self.companies[i])
+        unique = []
+        for company in results:
+            if company not in unique:
+                unique.append(company)
+        return unique[:limit]
+
+
+_index: Optional[CompanyIndex] = None
+_lock = threading.Lock()
+
+
+def get_index() -> CompanyIndex:
+    """Return the company index, loading it on first use
+
+    Falls back to building the index from company_tickers.json when it is missing,
+    e.g. for configurations created before the index existed.
+
+    Returns:
+        CompanyIndex: the loaded index
+    """
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                directory = Path(setup.CONFIGURATION_DIRECTORY)
+                path = directory / INDEX_FILE
+                if not path.exists():
+                    with open(directory / TICKERS_FILE, "r") as fp:
+                        build_index(json.load(fp), directory)
+                _index = CompanyIndex.load(path)
+    return _index
+
+
+def reset_index() -> None:
+    """Forget the loaded index so the next lookup reads it again"""
+    global _index
+    with _lock:
+        _index = None
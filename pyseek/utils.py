@@ -1,17 +1,38 @@
 """Holds the utilities for the package"""
 
-
+import gzip
 import json
+import os
+import random
+import re
+import shutil
+import time
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import TypeVar
+from typing import Iterator, Optional, TypeVar
 
 import requests
 from typer import BadParameter
 
-from pyseek import config, models, setup
+from pyseek import (
+    cache,
+    coalesce,
+    config,
+    models,
+    ratelimit,
+    session,
+    stream,
+    tickers,
+)
 
 centralIndexKey = TypeVar("centralIndexKey", str, int, models.CIK)
 
+# status codes the SEC uses when a client is going too fast
+RETRY_STATUS_CODES = (429, 503)
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
 
 def set_headers() -> dict:
     """Set the headers for the requests call"""
@@ -19,9 +40,190 @@ def set_headers() -> dict:
     return {"User-Agent": settings["User-Agent"]}
 
 
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Read the Retry-After header, which is either seconds or an HTTP date
+
+    Args:
+        response (requests.Response): the throttled response
+
+    Returns:
+        Optional[float]: seconds to wait, None when the header is missing or unreadable
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter
+
+    Args:
+        attempt (int): zero based retry number
+
+    Returns:
+        float: seconds to wait
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def get_response(url: str, requestTimeout: int = 5, **kwargs) -> requests.Response:
+    """Send a GET through the shared session under the SEC rate limit
+
+    Throttled responses (429/503) are retried up to `MAX_RETRIES` times, waiting for
+    Retry-After when the SEC sends it and exponential backoff with jitter otherwise.
+    The wait is applied to the shared limiter so every thread and process backs off.
+
+    Args:
+        url (str): url to request
+        requestTimeout (int, optional): seconds to wait for the server. Defaults to 5.
+
+    Raises:
+        requests.HTTPError: when the response is an error, or still throttled after the retries
+
+    Returns:
+        requests.Response: the successful response
+    """
+    limiter = ratelimit.get_limiter()
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire()
+        r = session.get_session().get(url, timeout=requestTimeout, **kwargs)
+        if r.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+            break
+        delay = _retry_after(r)
+        limiter.pause(_backoff(attempt) if delay is None else delay)
+        r.close()
+    r.raise_for_status()
+    return r
+
+
+def get_content(url: str, requestTimeout: int = 5) -> bytes:
+    """Return the body for url, from the response cache when possible
+
+    Fresh cache entries are returned without touching the network. Stale ones are
+    revalidated with a conditional GET, and a 304 answer serves the cached body.
+
+    Args:
+        url (str): url to request
+        requestTimeout (int, optional): seconds to wait for the server. Defaults to 5.
+
+    Returns:
+        bytes: the response body
+    """
+    responses = cache.get_cache()
+    entry = responses.lookup(url) if responses else None
+    if entry and entry.fresh:
+        return responses.read(entry)
+    headers = entry.conditional_headers() if entry else {}
+    r = get_response(url, requestTimeout=requestTimeout, headers=headers)
+    if entry and r.status_code == 304:
+        responses.revalidated(entry, r.headers)
+        return responses.read(entry)
+    if responses:
+        responses.store(url, r.content, r.headers)
+    return r.content
+
+
+def get_text(url: str, encoding: str = "utf-8", requestTimeout: int = 5) -> str:
+    """Return the body for url as text, from the response cache when possible
+
+    Args:
+        url (str): url to request
+        encoding (str, optional): the body's encoding. Defaults to "utf-8".
+        requestTimeout (int, optional): seconds to wait for the server. Defaults to 5.
+
+    Returns:
+        str: the decoded response body
+    """
+    return get_content(url, requestTimeout=requestTimeout).decode(encoding)
+
+
+def stream_content(
+    url: str, requestTimeout: int = 5, chunk_size: int = stream.CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield the body for url in chunks, from the response cache when possible
+
+    A body read from the network is written to the cache as it streams past, and is
+    only kept once the caller has read it to the end.
+
+    Args:
+        url (str): url to request
+        requestTimeout (int, optional): seconds to wait for the server. Defaults to 5.
+        chunk_size (int, optional): bytes per chunk. Defaults to stream.CHUNK_SIZE.
+
+    Returns:
+        Iterator[bytes]: the response body
+    """
+    responses = cache.get_cache()
+    entry = responses.lookup(url) if responses else None
+    if entry and entry.fresh:
+        yield from stream.read_chunks(responses.path(entry), chunk_size)
+        return
+    headers = entry.conditional_headers() if entry else {}
+    r = get_response(url, requestTimeout=requestTimeout, headers=headers, stream=True)
+    with r:
+        if entry and r.status_code == 304:
+            responses.revalidated(entry, r.headers)
+            yield from stream.read_chunks(responses.path(entry), chunk_size)
+            return
+        if not responses:
+            yield from r.iter_content(chunk_size)
+            return
+        tmp = responses.temporary_path()
+        complete = False
+        try:
+            with open(tmp, "wb") as fp:
+                for chunk in r.iter_content(chunk_size):
+                    fp.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                responses.store_file(url, tmp, r.headers)
+            else:
+                tmp.unlink(missing_ok=True)
+
+
+def _fetch_json(url: str, requestTimeout: int) -> tuple:
+    body = get_content(url, requestTimeout=requestTimeout)
+    return json.loads(body), len(body)
+
+
+def get_json(url: str, requestTimeout: int = 5) -> dict:
+    """Return the json for url, raising when it cannot be had
+
+    Concurrent calls for the same url share one download and one parsed document,
+    and recently parsed documents are reused, see `coalesce`. The document is
+    shared, so it must not be modified. Functions working through many companies
+    use it to record a company as failed and carry on with the others.
+
+    Args:
+        url (str): url to request
+        requestTimeout (int, optional): seconds to wait for the server. Defaults to 5.
+
+    Raises:
+        requests.RequestException: when the request fails
+        ValueError: when the response is not json
+
+    Returns:
+        dict: the json returned
+    """
+    return coalesce.load(url, lambda: _fetch_json(url, requestTimeout))
+
+
 def make_request(url: str, requestTimeout: int = 5) -> dict:
     """Handles all the requests calls for the package
 
+    Like `get_json`, but connection errors, timeouts and responses that are not
+    json are printed and None is returned.
+
     Args:
         url (str): url to request
 
@@ -29,12 +231,10 @@ def make_request(url: str, requestTimeout: int = 5) -> dict:
         dict: the json returned
     """
     try:
-        r = requests.get(url, headers=set_headers(), timeout=requestTimeout)
-        r.raise_for_status()
-        return r.json()
+        return get_json(url, requestTimeout)
     except requests.ConnectionError:
         print("there was a connection error")
-    except requests.JSONDecodeError:
+    except json.JSONDecodeError:
         print(f"There was no JSON response for url: {url}")
         print(f"Check the url for errors. If the url is correct, try again later.")
     except requests.ReadTimeout:
@@ -50,10 +250,7 @@ def company_from_ticker(ticker: str) -> int:
     Returns:
         int: company information for a given ticker
     """
-    ticker = ticker.upper()
-    with open(Path(setup.CONFIGURATION_DIRECTORY) / "company_tickers.json", "r") as fp:
-        data = json.load(fp)
-    return [company for company in data.values() if company["ticker"] == ticker]
+    return tickers.get_index().by_ticker(ticker)
 
 
 def company_from_cik(cik: int) -> str:
@@ -65,9 +262,23 @@ def company_from_cik(cik: int) -> str:
     Returns:
         str: company information for given cik number
     """
-    with open(Path(setup.CONFIGURATION_DIRECTORY) / "company_tickers.json", "r") as fp:
-        data = json.load(fp)
-    return [company for company in data.values() if company["cik_str"] == cik]
+    return tickers.get_index().by_cik(cik)
+
+
+def all_companies() -> list:
+    """Every company in the company_tickers.json file downloaded in `pyseek init`
+
+    Returns:
+        list: company information for every ticker
+    """
+    return tickers.get_index().companies
+
+
+def document_url(
+    cik: centralIndexKey, accession_number: str, primaryDocument: str
+) -> str:
+    """Url of a document in a submission under the EDGAR archives"""
+    return f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_number.replace('-', '')}/{primaryDocument}"
 
 
 def download_document(
@@ -80,22 +291,143 @@ def download_document(
         accession_number (str): Accession number of the submission
         primaryDocument (str): Name of the primary document
 
+    Raises:
+        requests.HTTPError: when the document is missing or the server fails
+
     Returns:
         str: The submission as a string
     """
+    response = get_response(
+        document_url(cik, accession_number, primaryDocument), requestTimeout=None
+    )
+    return response.text
+
+
+COMPRESSION_SUFFIXES = {
+    models.Compression.none: "",
+    models.Compression.gzip: ".gz",
+    models.Compression.zstd: ".zst",
+}
+
+
+def _compress(source: Path, destination: Path, compression: models.Compression):
+    """Compress source into destination in chunks"""
+    if compression == models.Compression.gzip:
+        with open(source, "rb") as src, gzip.open(destination, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    else:
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                "zstd compression needs the zstandard package: pip install zstandard"
+            )
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+
+
+def _validator(headers) -> Optional[str]:
+    """The strong ETag, or else the Last-Modified date, an If-Range header can send"""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def download_to_file(
+    url: str,
+    filename: str,
+    compression: models.Compression = models.Compression.none,
+    chunk_size: int = stream.CHUNK_SIZE,
+) -> Path:
+    """Stream url to disk, resuming an interrupted download with a Range request
+
+    The body is written to `<filename>.part` as it arrives and never held in memory.
+    If the part file is left over from an earlier attempt only the missing bytes are
+    requested, with an If-Range header carrying the ETag or Last-Modified date
+    saved next to it, so a document that changed since is sent whole and the
+    download starts over. The size is checked against Content-Length before the
+    file is moved into place (and compressed, if asked).
+
+    Args:
+        url (str): url to download
+        filename (str): the file to create, the compression suffix is added to it
+        compression (models.Compression, optional): compress the finished file. Defaults to none.
+        chunk_size (int, optional): bytes per write. Defaults to stream.CHUNK_SIZE.
+
+    Raises:
+        IOError: when fewer bytes arrived than the server announced
+
+    Returns:
+        Path: the file written
+    """
+    compression = models.Compression(compression)
+    path = Path(str(filename) + COMPRESSION_SUFFIXES[compression])
+    part = Path(str(filename) + ".part")
+    # the version of the document the part file holds
+    validator = Path(str(filename) + ".part.validator")
+    offset = part.stat().st_size if part.exists() else 0
+    # ranges refer to the bytes on the wire, so ask for them unencoded
+    headers = {"Accept-Encoding": "identity"}
+    if offset and validator.exists():
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator.read_text()
     try:
-        response = requests.get(
-            f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_number.replace('-', '')}/{primaryDocument}",
-            headers=set_headers(),
+        r = get_response(url, requestTimeout=30, headers=headers, stream=True)
+    except requests.HTTPError as err:
+        if offset and err.response is not None and err.response.status_code == 416:
+            # the part file does not match the document anymore, start over
+            part.unlink()
+            validator.unlink(missing_ok=True)
+            return download_to_file(url, filename, compression, chunk_size)
+        raise
+    with r:
+        if r.status_code != 206:
+            # the whole document, because it changed or nothing was left to resume
+            offset = 0
+            version = _validator(r.headers)
+            if version:
+                validator.write_text(version)
+            else:
+                validator.unlink(missing_ok=True)
+        expected = None
+        content_range = re.match(
+            r"bytes \d+-\d+/(\d+)", r.headers.get("Content-Range", "")
         )
-        response.raise_for_status()
-    except requests.HTTPError as http_err:
-        print(f"HTTP error occurred: {http_err}")
-    except Exception as err:
-        print(f"Other error occurred: {err}")
+        if content_range:
+            expected = int(content_range.group(1))
+        elif r.headers.get("Content-Length"):
+            expected = offset + int(r.headers["Content-Length"])
+        with open(part, "ab" if offset else "wb") as fp:
+            for chunk in r.iter_content(chunk_size):
+                fp.write(chunk)
+    size = part.stat().st_size
+    if expected is not None and size != expected:
+        raise IOError(
+            f"Downloaded {size} of {expected} bytes from {url}, run again to resume"
+        )
+    if compression == models.Compression.none:
+        os.replace(part, path)
     else:
-        print("Success!")
-    return response.text
+        _compress(part, path, compression)
+        part.unlink()
+    validator.unlink(missing_ok=True)
+    return path
+
+
+def write_stream(chunks: Iterator[bytes], filename: str, directory: str = None):
+    """Write chunks straight to a file, without parsing them
+
+    Args:
+        chunks (Iterator[bytes]): e.g. from `stream_content`
+        filename (str): the file to create
+        directory (str, optional): directory to create the file in
+    """
+    if directory:
+        filename = Path(directory) / filename
+    with open(filename, "wb") as fp:
+        for chunk in chunks:
+            fp.write(chunk)
 
 
 def write_file(
@@ -0,0 +1,415 @@
+"""Holds the local warehouse, a single sqlite file of companies, filings and facts
+
+`pyseek warehouse sync` pulls the submissions of every requested company (a
+cheap request) and compares the most recent accession number with what was
+stored on the last run. Only companies that filed something new have their
+filings replaced and their companyfacts document fetched again. Filings and
+facts keep their own sync state, so facts skipped with --no-facts are fetched on
+the next sync that asks for them. Everything ends up in indexed tables that can
+be queried with plain SQL.
+"""
+
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+import pandas as pd
+import requests
+import typer
+
+from pyseek import _read, bulk, config, edgar, models, setup, stream, syncstate, utils
+
+app = typer.Typer()
+
+WAREHOUSE_FILE = "warehouse.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    ticker TEXT PRIMARY KEY,
+    cik INTEGER NOT NULL,
+    title TEXT
+);
+CREATE INDEX IF NOT EXISTS companies_cik ON companies (cik);
+
+CREATE TABLE IF NOT EXISTS filings (
+    accession_number TEXT NOT NULL,
+    cik INTEGER NOT NULL,
+    form TEXT,
+    filing_date TEXT,
+    report_date TEXT,
+    acceptance_datetime TEXT,
+    items TEXT,
+    size INTEGER,
+    is_xbrl INTEGER,
+    is_inline_xbrl INTEGER,
+    primary_document TEXT,
+    primary_doc_description TEXT,
+    PRIMARY KEY (cik, accession_number)
+);
+CREATE INDEX IF NOT EXISTS filings_accession ON filings (accession_number);
+CREATE INDEX IF NOT EXISTS filings_cik_date ON filings (cik, filing_date);
+CREATE INDEX IF NOT EXISTS filings_form_date ON filings (form, filing_date);
+
+CREATE TABLE IF NOT EXISTS facts (
+    cik INTEGER NOT NULL,
+    taxonomy TEXT,
+    tag TEXT,
+    unit TEXT,
+    start TEXT,
+    "end" TEXT,
+    val REAL,
+    accn TEXT,
+    fy INTEGER,
+    fp TEXT,
+    form TEXT,
+    filed TEXT,
+    frame TEXT
+);
+CREATE INDEX IF NOT EXISTS facts_cik_tag ON facts (cik, tag);
+CREATE INDEX IF NOT EXISTS facts_tag_frame ON facts (tag, frame);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    cik INTEGER NOT NULL,
+    dataset TEXT NOT NULL,
+    last_accession TEXT,
+    synced_at REAL,
+    PRIMARY KEY (cik, dataset)
+);
+"""
+
+# warehouses created before facts had a sync state of their own
+_MIGRATE_SYNC_STATE = """
+ALTER TABLE sync_state RENAME TO sync_state_old;
+CREATE TABLE sync_state (
+    cik INTEGER NOT NULL,
+    dataset TEXT NOT NULL,
+    last_accession TEXT,
+    synced_at REAL,
+    PRIMARY KEY (cik, dataset)
+);
+INSERT INTO sync_state
+    SELECT cik, 'submissions', last_accession, synced_at FROM sync_state_old;
+DROP TABLE sync_state_old;
+"""
+
+# warehouses created when a filing listed by several companies, e.g. a Form 4 of
+# the issuer and the reporting owner, was kept for one of them only
+_MIGRATE_FILINGS = """
+ALTER TABLE filings RENAME TO filings_old;
+CREATE TABLE filings (
+    accession_number TEXT NOT NULL,
+    cik INTEGER NOT NULL,
+    form TEXT,
+    filing_date TEXT,
+    report_date TEXT,
+    acceptance_datetime TEXT,
+    items TEXT,
+    size INTEGER,
+    is_xbrl INTEGER,
+    is_inline_xbrl INTEGER,
+    primary_document TEXT,
+    primary_doc_description TEXT,
+    PRIMARY KEY (cik, accession_number)
+);
+INSERT INTO filings SELECT * FROM filings_old;
+DROP TABLE filings_old;
+CREATE INDEX filings_accession ON filings (accession_number);
+CREATE INDEX filings_cik_date ON filings (cik, filing_date);
+CREATE INDEX filings_form_date ON filings (form, filing_date);
+"""
+
+# submissions columns and their warehouse names
+FILING_COLUMNS = {
+    "accessionNumber": "accession_number",
+    "form": "form",
+    "filingDate": "filing_date",
+    "reportDate": "report_date",
+    "acceptanceDateTime": "acceptance_datetime",
+    "items": "items",
+    "size": "size",
+    "isXBRL": "is_xbrl",
+    "isInlineXBRL": "is_inline_xbrl",
+    "primaryDocument": "primary_document",
+    "primaryDocDescription": "primary_doc_description",
+}
+
+
+@dataclass
+class SyncResult:
+    updated: int = 0
+    unchanged: int = 0
+    failed: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def connect(path: Optional[Path] = None) -> sqlite3.Connection:
+    """Open the warehouse, creating the tables on first use
+
+    Args:
+        path (Path, optional): the database file. Defaults to warehouse.sqlite in the configuration directory.
+
+    Returns:
+        sqlite3.Connection: the open warehouse
+    """
+    if path is None:
+        path = Path(setup.CONFIGURATION_DIRECTORY) / WAREHOUSE_FILE
+    db = sqlite3.connect(path, timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_SCHEMA)
+    columns = [row[1] for row in db.execute("PRAGMA table_info(sync_state)")]
+    if "dataset" not in columns:
+        # the old state only ever proved the filings were stored, not the facts
+        db.executescript(f"BEGIN; {_MIGRATE_SYNC_STATE} COMMIT;")
+    keys = {row[1]: row[5] for row in db.execute("PRAGMA table_info(filings)")}
+    if not keys["cik"]:
+        db.executescript(f"BEGIN; {_MIGRATE_FILINGS} COMMIT;")
+    return db
+
+
+def load_companies(db: sqlite3.Connection, companies: Iterable[dict]) -> int:
+    """Replace the companies table with the SEC ticker list
+
+    Args:
+        db (sqlite3.Connection): the warehouse
+        companies (Iterable[dict]): rows with title, ticker and cik_str
+
+    Returns:
+        int: number of companies loaded
+    """
+    rows = [(c["ticker"], int(c["cik_str"]), c["title"]) for c in companies]
+    with db:
+        db.execute("DELETE FROM companies")
+        db.executemany("INSERT OR REPLACE INTO companies VALUES (?, ?, ?)", rows)
+    return len(rows)
+
+
+def _fact_rows(df: pd.DataFrame) -> list:
+    """Turn normalized facts into rows sqlite accepts"""
+    df = df.astype(object)
+    for column in _read.DATE_FACT_COLUMNS:
+        df[column] = [
+            d.strftime("%Y-%m-%d") if pd.notna(d) else None for d in df[column]
+        ]
+    df = df.where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+def _fetch(
+    company: models.CIK,
+    last_submissions: Optional[str],
+    last_facts: Optional[str],
+    facts: bool,
+):
+    """Fetch a company's submissions and facts when it filed something since they were stored
+
+    Returns:
+        tuple: latest accession number, then filings and facts dataframes, each None when unchanged or not requested
+    """
+    # the recent filings decide, older pages are only fetched for changed companies
+    results = utils.get_json(edgar.submissions_url(company.cik_str))
+    latest = syncstate.latest_accession(results)
+    submissions = None
+    if latest != last_submissions:
+        submissions = _read.read_submissions(
+            results, edgar.get_submissions_pages(results, workers=1)
+        )
+    facts_df = None
+    if facts and latest != last_facts:
+        records = stream.iter_company_facts(
+            utils.stream_content(edgar.company_facts_url(company.cik_str))
+        )
+        facts_df = _read.normalize_facts(records, int(company.cik_str))
+    return latest, submissions, facts_df
+
+
+def store(
+    db: sqlite3.Connection,
+    cik: int,
+    submissions: Optional[pd.DataFrame] = None,
+    facts_df: Optional[pd.DataFrame] = None,
+    last_accession: Optional[str] = None,
+) -> None:
+    """Replace a company's filings and/or facts in one transaction
+
+    Args:
+        db (sqlite3.Connection): the warehouse
+        cik (int): the company
+        submissions (pd.DataFrame, optional): from `_read.read_submissions`, also records its sync state
+        facts_df (pd.DataFrame, optional): from `_read.normalize_facts`
+        last_accession (str, optional): the company's latest accession number when the
+            data was fetched. Facts only record their sync state when it is given.
+    """
+    if last_accession is None and submissions is not None and len(submissions):
+        last_accession = submissions["accessionNumber"].iloc[0]
+    with db:
+        if submissions is not None:
+            filings = submissions[list(FILING_COLUMNS)].rename(columns=FILING_COLUMNS)
+            filings.insert(1, "cik", cik)
+            filings = filings.astype(object).where(filings.notna(), None)
+            columns = ", ".join(filings.columns)
+            marks = ", ".join("?" * len(filings.columns))
+            db.execute("DELETE FROM filings WHERE cik = ?", (cik,))
+            db.executemany(
+                f"INSERT OR REPLACE INTO filings ({columns}) VALUES ({marks})",
+                filings.itertuples(index=False, name=None),
+            )
+            if last_accession is not None:
+                _record(db, cik, models.Dataset.submissions, last_accession)
+        if facts_df is not None:
+            db.execute("DELETE FROM facts WHERE cik = ?", (cik,))
+            db.executemany(
+                f"INSERT INTO facts VALUES ({', '.join('?' * len(_read.FACT_COLUMNS))})",
+                _fact_rows(facts_df),
+            )
+            # facts read without knowing the latest filing, e.g. from an archive,
+            # leave the state alone so the next sync fetches them
+            if last_accession is not None:
+                _record(db, cik, models.Dataset.facts, last_accession)
+
+
+def _record(
+    db: sqlite3.Connection, cik: int, dataset: models.Dataset, last_accession: str
+) -> None:
+    db.execute(
+        "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+        (cik, dataset.value, last_accession, time.time()),
+    )
+
+
+def _sync_state(db: sqlite3.Connection, dataset: models.Dataset) -> dict:
+    """The last accession number stored per company for one dataset"""
+    return dict(
+        db.execute(
+            "SELECT cik, last_accession FROM sync_state WHERE dataset = ?",
+            (dataset.value,),
+        )
+    )
+
+
+def sync(
+    db: sqlite3.Connection,
+    companies: Iterable[models.CIK],
+    facts: bool = True,
+    workers: Optional[int] = None,
+    callback: Optional[Callable[[models.CIK], None]] = None,
+) -> SyncResult:
+    """Bring the warehouse up to date for the given companies
+
+    Submissions are fetched for every company. Filings and facts are each only
+    replaced for companies whose latest accession number differs from the one
+    recorded when they were last stored.
+
+    Args:
+        db (sqlite3.Connection): the warehouse
+        companies (Iterable[models.CIK]): companies to sync
+        facts (bool, optional): also refresh companyfacts. Defaults to True.
+        workers (int, optional): concurrent requests. Defaults to the connection pool size.
+        callback (Callable, optional): called after every company
+
+    Returns:
+        SyncResult: counts of updated, unchanged and failed companies
+    """
+    if workers is None:
+        workers = config.get_connection_settings()["pool_maxsize"]
+    stored_submissions = _sync_state(db, models.Dataset.submissions)
+    stored_facts = _sync_state(db, models.Dataset.facts)
+    result = SyncResult()
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                _fetch,
+                company,
+                stored_submissions.get(int(company.cik_str)),
+                stored_facts.get(int(company.cik_str)),
+                facts,
+            ): company
+            for company in companies
+        }
+        # fetching happens in the pool, writing stays on this thread
+        for future in as_completed(futures):
+            company = futures[future]
+            try:
+                latest, submissions, facts_df = future.result()
+            except (requests.RequestException, ValueError) as err:
+                result.failed.append(f"{company.cik_str}: {err}")
+            else:
+                if submissions is None and facts_df is None:
+                    result.unchanged += 1
+                else:
+                    store(db, int(company.cik_str), submissions, facts_df, latest)
+                    result.updated += 1
+            if callback:
+                callback(company)
+    result.seconds = time.monotonic() - start
+    return result
+
+
+def query(db: sqlite3.Connection, sql: str, params: Iterable = ()) -> pd.DataFrame:
+    """Run a SQL query against the warehouse
+
+    Args:
+        db (sqlite3.Connection): the warehouse
+        sql (str): the query
+        params (Iterable, optional): query parameters
+
+    Returns:
+        pd.DataFrame: the result
+    """
+    return pd.read_sql_query(sql, db, params=tuple(params))
+
+
+@app.command("sync")
+def sync_command(
+    companies: List[str] = typer.Argument(
+        ..., help="CIK numbers or tickers of the companies, or 'all'"
+    ),
+    facts: bool = typer.Option(
+        True, "--facts/--no-facts", help="Also refresh the company facts"
+    ),
+    database: Path = typer.Option(
+        None, "--database", "-d", help="The warehouse file to use"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of concurrent requests"
+    ),
+):
+    """Update the warehouse for companies that filed since the last sync"""
+    db = connect(database)
+    load_companies(db, utils.all_companies())
+    companies = bulk.resolve_companies(companies)
+    with typer.progressbar(length=len(companies), label="Syncing") as progress:
+        result = sync(
+            db,
+            companies,
+            facts=facts,
+            workers=workers,
+            callback=lambda company: progress.update(1),
+        )
+    typer.echo(
+        f"updated {result.updated}, unchanged {result.unchanged}, "
+        f"failed {len(result.failed)} in {result.seconds:.1f}s"
+    )
+    for failure in result.failed:
+        typer.echo(failure, err=True)
+
+
+@app.command("query")
+def query_command(
+    sql: str = typer.Argument(..., help="SQL to run against the warehouse"),
+    database: Path = typer.Option(
+        None, "--database", "-d", help="The warehouse file to use"
+    ),
+    output: Path = typer.Option(
+        None, "--output", "-o", help="Write the result to this csv file"
+    ),
+):
+    """Query the warehouse with SQL"""
+    df = query(connect(database), sql)
+    if output:
+        df.to_csv(output, index=False)
+    else:
+        print(df.to_string(index=False))
@@ -1,5 +1,14 @@
 import pytest
-from pyseek import setup, config
+from pyseek import (
+    setup,
+    config,
+    cache,
+    coalesce,
+    ratelimit,
+    session,
+    syncstate,
+    tickers,
+)
 
 
 @pytest.fixture
@@ -14,7 +23,19 @@ def test_dir(tmp_path):
 def configuration_directory(monkeypatch, tmp_path):
     """mock the configuration directory for testing"""
     monkeypatch.setattr(setup, "CONFIGURATION_DIRECTORY", tmp_path.as_posix())
-    return tmp_path
+    session.close_session()
+    ratelimit.reset_limiter()
+    cache.reset_cache()
+    tickers.reset_index()
+    syncstate.reset_state()
+    coalesce.reset_memo()
+    yield tmp_path
+    session.close_session()
+    ratelimit.reset_limiter()
+    cache.reset_cache()
+    tickers.reset_index()
+    syncstate.reset_state()
+    coalesce.reset_memo()
 
 
 @pytest.fixture
@@ -0,0 +1,97 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from pyseek import archives, warehouse
+
+from tests.test_read import COMPANY_FACTS
+from tests.test_utils import FakeDownload
+from tests.test_warehouse import submissions
+
+
+def test_ingest_archives(tmp_path):
+    facts_zip = tmp_path / "companyfacts.zip"
+    with zipfile.ZipFile(facts_zip, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("CIK0000320193.json", json.dumps(COMPANY_FACTS))
+        archive.writestr("CIK0000789019.json", json.dumps(COMPANY_FACTS))
+
+    recent = submissions(["0000320193-23-000106"])
+    recent["filings"]["files"] = [{"name": "CIK0000320193-submissions-001.json"}]
+    page = {
+        key: values[:1]
+        for key, values in submissions(["old"])["filings"]["recent"].items()
+    }
+    submissions_zip = tmp_path / "submissions.zip"
+    with zipfile.ZipFile(submissions_zip, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("CIK0000320193.json", json.dumps(recent))
+        archive.writestr("CIK0000320193-submissions-001.json", json.dumps(page))
+
+    assert archives.company_members(facts_zip, ciks=[789019]) == ["CIK0000789019.json"]
+    assert archives.company_members(submissions_zip) == ["CIK0000320193.json"]
+
+    db = warehouse.connect(tmp_path / "warehouse.sqlite")
+    result = archives.ingest(
+        facts_zip, submissions_zip, db=db, table=tmp_path / "facts", workers=2
+    )
+    assert result.companies == 3
+    assert not result.failed
+    counts = warehouse.query(
+        db, "SELECT cik, COUNT(*) AS n FROM facts GROUP BY cik ORDER BY cik"
+    )
+    assert counts.to_dict("records") == [
+        {"cik": 320193, "n": 2},
+        {"cik": 789019, "n": 2},
+    ]
+    filings = warehouse.query(db, "SELECT accession_number FROM filings")
+    assert sorted(filings["accession_number"]) == ["0000320193-23-000106", "old"]
+    assert (tmp_path / "facts" / "cik=789019" / "facts.parquet").exists()
+
+
+def test_iter_company_facts_reads_every_member_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(archives, "CHUNKSIZE", 2)
+    facts_zip = tmp_path / "companyfacts.zip"
+    ciks = list(range(1, 12))
+    with zipfile.ZipFile(facts_zip, "w", zipfile.ZIP_DEFLATED) as archive:
+        for cik in ciks:
+            archive.writestr(f"CIK{cik:010}.json", json.dumps(COMPANY_FACTS))
+
+    results = list(archives.iter_company_facts(facts_zip, workers=1))
+    assert [cik for cik, _, _ in results] == ciks
+    assert all(len(df) and error is None for _, df, error in results)
+
+
+def test_download_restarts_an_archive_rewritten_since(tmp_path, monkeypatch):
+    def archive(name):
+        body = io.BytesIO()
+        with zipfile.ZipFile(body, "w") as zf:
+            zf.writestr(name, json.dumps(COMPANY_FACTS))
+        return body.getvalue()
+
+    new = archive("CIK0000789019.json")
+    (tmp_path / "companyfacts.zip.part").write_bytes(archive("CIK0000320193.json")[:50])
+    (tmp_path / "companyfacts.zip.part.validator").write_text('"yesterday"')
+    sent = []
+
+    def fake_get_response(url, requestTimeout=5, headers=None, stream=False):
+        sent.append(headers)
+        # If-Range did not match today's archive, so all of it is sent
+        return FakeDownload(200, new, {"Content-Length": str(len(new))})
+
+    monkeypatch.setattr(archives.utils, "get_response", fake_get_response)
+    facts_zip, submissions_zip = archives.download(tmp_path)
+    assert sent[0]["If-Range"] == '"yesterday"'
+    assert facts_zip.read_bytes() == new
+    assert archives.company_members(submissions_zip) == ["CIK0000789019.json"]
+
+
+def test_download_rejects_a_corrupt_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        archives.utils,
+        "get_response",
+        lambda url, **kwargs: FakeDownload(200, b"not a zip", {}),
+    )
+    with pytest.raises(IOError):
+        archives.download(tmp_path)
+    assert not (tmp_path / "companyfacts.zip").exists()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+from pyseek import async_edgar, edgar, ratelimit, utils
+
+FRAME = {"taxonomy": "us-gaap", "tag": "Revenues", "data": []}
+
+
+def use_transport(monkeypatch, handler):
+    monkeypatch.setattr(
+        async_edgar,
+        "_build_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+
+def test_get_frames_shares_the_cache(configuration_directory, monkeypatch):
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(str(request.url))
+        return httpx.Response(200, json=FRAME)
+
+    use_transport(monkeypatch, handler)
+
+    async def main():
+        try:
+            return await async_edgar.get_frames("Revenues", "CY2019")
+        finally:
+            await async_edgar.close_client()
+
+    assert asyncio.run(main()) == FRAME
+    assert requests_seen == [edgar.frames_url("Revenues", "CY2019")]
+
+    # a settled frame is served from the cache by the blocking functions too
+    monkeypatch.setattr(utils, "get_response", pytest.fail)
+    assert edgar.get_frames("Revenues", "CY2019") == FRAME
+
+
+def test_concurrent_requests_retry_and_errors(configuration_directory, monkeypatch):
+    throttled = set()
+
+    def handler(request):
+        if request.url.path.endswith("CIK0000000404.json"):
+            return httpx.Response(404)
+        if request.url.path not in throttled:
+            throttled.add(request.url.path)
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, content=json.dumps({"cik": request.url.path}))
+
+    use_transport(monkeypatch, handler)
+
+    async def main():
+        try:
+            results = await asyncio.gather(
+                *(
+                    async_edgar.get_all_company_submissions(f"{cik:010}")
+                    for cik in range(1, 4)
+                )
+            )
+            with pytest.raises(httpx.HTTPStatusError):
+                await async_edgar.get_all_company_submissions("0000000404")
+            return results
+        finally:
+            await async_edgar.close_client()
+
+    results = asyncio.run(main())
+    assert [result["cik"] for result in results] == [
+        f"/submissions/CIK{cik:010}.json" for cik in range(1, 4)
+    ]
+
+
+def test_cancellation(configuration_directory, monkeypatch):
+    async def handler(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200, text="late")
+
+    use_transport(monkeypatch, handler)
+
+    async def main():
+        try:
+            await asyncio.wait_for(
+                async_edgar.download_company_submission("320193", "0-0-0", "a.htm"),
+                timeout=0.05,
+            )
+        finally:
+            await async_edgar.close_client()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(main())
+
+
+def test_cancelled_waiter_returns_its_token():
+    bucket = ratelimit.TokenBucket(rate=1, capacity=1)
+    bucket.reserve()
+
+    async def main():
+        waiter = asyncio.ensure_future(bucket.acquire_async())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(main())
+    # without the refund the next caller would queue behind the cancelled one
+    assert bucket.reserve() < 1.5
+
+
+def test_waiting_for_a_locked_bucket_leaves_the_loop_running(tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    bucket = ratelimit.TokenBucket(rate=100, state_file=tmp_path / "bucket")
+    # another process holding the state file
+    fd = os.open(tmp_path / "bucket", os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.ensure_future(tick())
+        waiter = asyncio.ensure_future(bucket.acquire_async())
+        await asyncio.sleep(0.1)
+        assert not waiter.done()
+        assert ticks >= 5
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        await waiter
+        ticker.cancel()
+
+    try:
+        asyncio.run(main())
+    finally:
+        os.close(fd)
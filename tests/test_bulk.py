@@ -0,0 +1,139 @@
+import json
+
+import pandas as pd
+import requests
+
+from pyseek import bulk, models, query
+
+
+class FakeResponse:
+    def __init__(self, url):
+        self.content = json.dumps({"url": url}).encode()
+
+
+def test_fetch_all_writes_and_resumes(monkeypatch, tmp_path):
+    urls = []
+
+    def fake_get_response(url, requestTimeout=5):
+        urls.append(url)
+        return FakeResponse(url)
+
+    monkeypatch.setattr(bulk.utils, "get_response", fake_get_response)
+    companies = [
+        models.CIK(title="Apple Inc.", ticker="AAPL", cik_str=320193),
+        models.CIK(title="Microsoft Corp", ticker="MSFT", cik_str=789019),
+    ]
+
+    result = bulk.fetch_all(companies, directory=tmp_path, workers=2)
+    assert result.fetched == 4
+    assert len(urls) == 4
+    facts = bulk.output_path(tmp_path, models.Dataset.facts, "0000320193")
+    assert json.loads(facts.read_text())["url"].endswith("CIK0000320193.json")
+
+    # a second run only fetches what is missing
+    facts.unlink()
+    urls.clear()
+    result = bulk.fetch_all(companies, directory=tmp_path, workers=2)
+    assert result.fetched == 1
+    assert result.skipped == 3
+    assert urls == ["https://data.sec.gov/api/xbrl/companyfacts/CIK0000320193.json"]
+
+
+def test_download_filings_dedupes_and_skips(monkeypatch, tmp_path):
+    downloaded = []
+
+    def fake_download_to_file(url, filename, compression):
+        downloaded.append(url)
+        filename.write_text("<html></html>")
+        return filename
+
+    monkeypatch.setattr(bulk.utils, "download_to_file", fake_download_to_file)
+    filings = pd.DataFrame(
+        {
+            "cik": [320193, 320193, 320193, 789019],
+            "accessionNumber": ["a-1", "a-1", "a-2", "m-1"],
+            "primaryDocument": ["a1.htm", "a1.htm", "a2.htm", "m1.htm"],
+        }
+    )
+    existing = bulk.filing_path(tmp_path, 789019, "m-1", "m1.htm")
+    existing.parent.mkdir(parents=True)
+    existing.write_text("already here")
+
+    result = bulk.download_filings(filings, directory=tmp_path, workers=2)
+    assert result.fetched == 2
+    assert result.skipped == 1
+    assert result.bytes == 2 * len("<html></html>")
+    assert sorted(downloaded) == [
+        "https://www.sec.gov/Archives/edgar/data/320193/a1/a1.htm",
+        "https://www.sec.gov/Archives/edgar/data/320193/a2/a2.htm",
+    ]
+
+
+def test_fetch_all_refresh_only_changed_facts(monkeypatch, tmp_path):
+    latest = {"0000320193": "a1", "0000789019": "m1"}
+    urls = []
+
+    def fake_get_response(url, requestTimeout=5):
+        urls.append(url)
+        return FakeResponse(url)
+
+    monkeypatch.setattr(bulk.utils, "get_response", fake_get_response)
+    monkeypatch.setattr(
+        bulk.utils,
+        "get_json",
+        lambda url: {"filings": {"recent": {"accessionNumber": [latest[url[-15:-5]]]}}},
+    )
+    companies = [
+        models.CIK(title="Apple Inc.", ticker="AAPL", cik_str=320193),
+        models.CIK(title="Microsoft Corp", ticker="MSFT", cik_str=789019),
+    ]
+    facts = [models.Dataset.facts]
+
+    result = bulk.fetch_all(companies, facts, directory=tmp_path, refresh=True)
+    assert result.fetched == 2
+
+    # only Microsoft filed since
+    latest["0000789019"] = "m2"
+    urls.clear()
+    result = bulk.fetch_all(
+        companies, facts, directory=tmp_path, workers=2, refresh=True
+    )
+    assert result.fetched == 1
+    assert result.skipped == 1
+    assert urls == ["https://data.sec.gov/api/xbrl/companyfacts/CIK0000789019.json"]
+
+
+def test_load_submissions_skips_failed_companies(monkeypatch):
+    def fake_history(cik, workers=None):
+        if cik == "0000320193":
+            raise requests.ConnectionError("connection reset")
+        return {"cik": cik}, []
+
+    def fake_read_submissions(results, pages):
+        return pd.DataFrame({"accessionNumber": [results["cik"]]})
+
+    monkeypatch.setattr(bulk.edgar, "get_company_submissions_history", fake_history)
+    monkeypatch.setattr(bulk._read, "read_submissions", fake_read_submissions)
+    companies = [
+        models.CIK(title="Apple Inc.", ticker="AAPL", cik_str=320193),
+        models.CIK(title="Microsoft Corp", ticker="MSFT", cik_str=789019),
+    ]
+
+    failed = []
+    df = bulk.load_submissions(companies, workers=2, failed=failed)
+    assert df["cik"].tolist() == [789019]
+    assert len(failed) == 1 and failed[0].startswith("0000320193:")
+
+
+def test_load_submissions_when_every_company_fails(monkeypatch):
+    def fake_history(cik, workers=None):
+        raise requests.ConnectionError("connection reset")
+
+    monkeypatch.setattr(bulk.edgar, "get_company_submissions_history", fake_history)
+    companies = [models.CIK(title="Apple Inc.", ticker="AAPL", cik_str=320193)]
+
+    failed = []
+    df = bulk.load_submissions(companies, workers=1, failed=failed)
+    assert len(failed) == 1
+    filings = query.select(query.typed(df), forms=["10-K"])
+    assert filings.empty
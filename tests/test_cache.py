@@ -0,0 +1,97 @@
+import json
+
+from typer.testing import CliRunner
+
+from pyseek import __main__, cache, utils
+
+runner = CliRunner()
+
+FACTS_URL = "https://data.sec.gov/api/xbrl/companyfacts/CIK0000320193.json"
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+def test_ttl_for():
+    assert cache.ttl_for(FACTS_URL) == 24 * 60 * 60
+    assert cache.ttl_for("https://www.sec.gov/Archives/edgar/data/1/2/a.htm") is None
+    assert cache.ttl_for("https://example.com") == cache.DEFAULT_TTL
+
+
+def test_get_content_uses_cache_and_revalidates(configuration_directory, monkeypatch):
+    sent = []
+    replies = [
+        FakeResponse(200, json.dumps({"cik": 320193}).encode(), {"ETag": '"v1"'}),
+        FakeResponse(304),
+    ]
+
+    def fake_get_response(url, requestTimeout=5, headers=None):
+        sent.append(headers)
+        return replies.pop(0)
+
+    monkeypatch.setattr(utils, "get_response", fake_get_response)
+
+    assert utils.make_request(FACTS_URL) == {"cik": 320193}
+    # fresh, so no request is sent
+    assert utils.make_request(FACTS_URL) == {"cik": 320193}
+    assert len(sent) == 1
+
+    responses = cache.get_cache()
+    responses._db.execute("UPDATE responses SET fetched_at = 0")
+    assert utils.make_request(FACTS_URL) == {"cik": 320193}
+    assert sent[1] == {"If-None-Match": '"v1"'}
+    assert responses.lookup(FACTS_URL).fresh
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    responses = cache.ResponseCache(tmp_path, max_bytes=10)
+    responses.store("https://a", b"123456", {})
+    responses.store("https://b", b"abcdef", {})
+    assert responses.lookup("https://a") is None
+    assert responses.lookup("https://b") is not None
+    assert responses.stats()["bytes"] == 6
+
+
+def test_cache_cli(configuration_directory):
+    cache.get_cache().store(FACTS_URL, b"{}", {})
+    result = runner.invoke(__main__.app, ["cache", "stats"])
+    assert result.exit_code == 0
+    assert "entries: 1 (1 fresh)" in result.output
+
+    result = runner.invoke(__main__.app, ["cache", "clear"])
+    assert result.exit_code == 0
+    assert "Removed 1 cached responses" in result.output
+    assert cache.get_cache().lookup(FACTS_URL) is None
+
+
+class FakeStreamingResponse(FakeResponse):
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i : i + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def test_stream_content_caches_complete_bodies(configuration_directory, monkeypatch):
+    body = json.dumps({"facts": {}}).encode()
+    monkeypatch.setattr(
+        utils,
+        "get_response",
+        lambda url, **kwargs: FakeStreamingResponse(200, body),
+    )
+
+    stream = utils.stream_content(FACTS_URL, chunk_size=4)
+    next(stream)
+    stream.close()
+    assert cache.get_cache().lookup(FACTS_URL) is None
+
+    assert b"".join(utils.stream_content(FACTS_URL, chunk_size=4)) == body
+    assert cache.get_cache().read(cache.get_cache().lookup(FACTS_URL)) == body
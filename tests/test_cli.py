@@ -1,6 +1,7 @@
+import requests
 from typer.testing import CliRunner
 from pyseek import __app_name__, __main__, __version__
-from pyseek import setup
+from pyseek import models, setup
 
 runner = CliRunner()
 
@@ -50,3 +51,37 @@ def test_init_cli_prompt(configuration_directory):
     # test that the download didn't occur
     company_ticker_file = configuration_directory / "company_tickers.json"
     assert not company_ticker_file.exists()
+
+
+APPLE = models.CIK(title="Apple Inc.", ticker="AAPL", cik_str="0000320193")
+
+
+def test_company_facts_reports_a_failed_submissions_fetch(
+    configuration_directory, monkeypatch
+):
+    def fake_get_json(url):
+        raise requests.ConnectionError("connection reset")
+
+    monkeypatch.chdir(configuration_directory)
+    monkeypatch.setattr(__main__.utils, "validate_ticker_or_cik", lambda c: APPLE)
+    monkeypatch.setattr(__main__.utils, "get_json", fake_get_json)
+    result = runner.invoke(__main__.app, ["company-facts", "AAPL"])
+    assert result.exit_code == 1
+    assert "Could not fetch the submissions of AAPL" in result.output
+
+
+def test_company_facts_force_skips_the_submissions(
+    configuration_directory, monkeypatch
+):
+    def fake_get_json(url):
+        raise AssertionError("--force must not ask what was filed")
+
+    monkeypatch.chdir(configuration_directory)
+    monkeypatch.setattr(__main__.utils, "validate_ticker_or_cik", lambda c: APPLE)
+    monkeypatch.setattr(__main__.utils, "get_json", fake_get_json)
+    monkeypatch.setattr(
+        __main__.utils, "stream_content", lambda url: iter([b'{"facts": {}}'])
+    )
+    result = runner.invoke(__main__.app, ["company-facts", "AAPL", "--force"])
+    assert result.exit_code == 0
+    assert (configuration_directory / "AAPL_facts.json").read_text() == '{"facts": {}}'
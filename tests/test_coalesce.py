@@ -0,0 +1,97 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from pyseek import async_edgar, coalesce, edgar, utils
+from tests.test_cache import FACTS_URL, FakeResponse
+
+
+def test_concurrent_requests_share_one_fetch(configuration_directory, monkeypatch):
+    sent = []
+
+    def fake_get_response(url, requestTimeout=5, headers=None):
+        sent.append(url)
+        time.sleep(0.1)
+        return FakeResponse(200, json.dumps({"cik": 320193}).encode())
+
+    monkeypatch.setattr(utils, "get_response", fake_get_response)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        documents = list(pool.map(utils.make_request, [FACTS_URL] * 8))
+    assert sent == [FACTS_URL]
+    assert all(document is documents[0] for document in documents)
+    # later calls are served from the memo
+    assert utils.make_request(FACTS_URL) is documents[0]
+
+
+def test_single_flight_shares_errors():
+    flights = coalesce.SingleFlight()
+    started = threading.Event()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    def follow():
+        started.wait()
+        return flights.do("key", fail)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(flights.do, "key", fail), pool.submit(follow)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+    assert calls == [1]
+
+
+def test_memo_is_bounded(configuration_directory):
+    memo = coalesce.Memo(max_bytes=10)
+    memo.put(FACTS_URL, {"a": 1}, 6)
+    other = FACTS_URL.replace("320193", "789019")
+    memo.put(other, {"b": 2}, 6)
+    assert memo.get(FACTS_URL) is None
+    assert memo.get(other) == {"b": 2}
+    # urls that are always revalidated are not kept
+    memo.put("https://example.com/a.json", {}, 1)
+    assert len(memo) == 1
+
+
+def test_async_requests_share_one_fetch(configuration_directory, monkeypatch):
+    sent = []
+
+    async def handler(request):
+        sent.append(str(request.url))
+        await asyncio.sleep(0.1)
+        return httpx.Response(200, json={"cik": 320193})
+
+    monkeypatch.setattr(
+        async_edgar,
+        "_build_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+    async def main():
+        try:
+            impatient = asyncio.ensure_future(
+                async_edgar.get_all_company_facts("0000320193")
+            )
+            others = [
+                async_edgar.get_all_company_facts("0000320193") for _ in range(20)
+            ]
+            await asyncio.sleep(0.01)
+            # one caller giving up does not cancel the fetch the others wait for
+            impatient.cancel()
+            return await asyncio.gather(*others)
+        finally:
+            await async_edgar.close_client()
+
+    documents = asyncio.run(main())
+    assert sent == [edgar.company_facts_url("0000320193")]
+    assert all(document is documents[0] for document in documents)
@@ -0,0 +1,129 @@
+import re
+
+import requests
+
+from pyseek import concepts, edgar, models
+
+from tests.test_read import COMPANY_FACTS
+from tests.test_stream import chunked
+
+APPLE = models.CIK(title="Apple Inc.", ticker="AAPL", cik_str=320193)
+MICROSOFT = models.CIK(title="Microsoft Corp", ticker="MSFT", cik_str=789019)
+
+
+def concept_document(cik, tag, rows):
+    return {
+        "cik": cik,
+        "taxonomy": "us-gaap",
+        "tag": tag,
+        "units": {
+            "USD": [
+                {
+                    "end": end,
+                    "val": val,
+                    "accn": accn,
+                    "fy": 2010,
+                    "fp": "FY",
+                    "form": "10-K",
+                    "filed": filed,
+                }
+                for end, val, accn, filed in rows
+            ]
+        },
+    }
+
+
+def concept_requests(fake_concept):
+    """A fake utils.get_json answering companyconcept urls with fake_concept"""
+
+    def get_json(url):
+        cik, taxonomy, concept = re.search(
+            r"CIK(\d+)/([^/]+)/([^/]+)\.json$", url
+        ).groups()
+        return fake_concept(cik, concept, taxonomy)
+
+    return get_json
+
+
+def test_parse_concept():
+    assert concepts.parse_concept("Revenues") == ("us-gaap", "Revenues")
+    assert concepts.parse_concept("dei:EntityCommonStockSharesOutstanding") == (
+        "dei",
+        "EntityCommonStockSharesOutstanding",
+    )
+
+
+def test_get_concepts_picks_the_cheaper_source(configuration_directory, monkeypatch):
+    streamed, requested = [], []
+
+    def fake_stream(cik):
+        streamed.append(cik)
+        return edgar.stream.iter_company_facts(chunked(COMPANY_FACTS, 64))
+
+    def fake_concept(cik, concept, taxonomy="us-gaap"):
+        requested.append((cik, concept))
+        if concept != "Assets":
+            response = requests.Response()
+            response.status_code = 404
+            raise requests.HTTPError(response=response)
+        return concept_document(
+            789019,
+            "Assets",
+            [
+                ("2010-06-30", 86113000000, "m1", "2010-07-30"),
+                # restated in a later filing
+                ("2010-06-30", 86100000000, "m2", "2011-07-28"),
+            ],
+        )
+
+    monkeypatch.setattr(concepts.edgar, "stream_company_facts", fake_stream)
+    monkeypatch.setattr(concepts.utils, "get_json", concept_requests(fake_concept))
+    # many concepts for Apple, a few for Microsoft
+    monkeypatch.setattr(
+        concepts,
+        "prefers_company_facts",
+        lambda cik, wanted: cik == APPLE.cik_str,
+    )
+
+    result = concepts.get_concepts(
+        [APPLE, MICROSOFT], ["Assets", "Revenues"], workers=2
+    )
+    assert streamed == [APPLE.cik_str]
+    assert sorted(requested) == [
+        (MICROSOFT.cik_str, "Assets"),
+        (MICROSOFT.cik_str, "Revenues"),
+    ]
+    assert result.facts_documents == 1
+    assert result.concept_requests == 2
+    facts = result.facts
+    assert list(zip(facts["cik"], facts["tag"], facts["val"])) == [
+        (320193, "Assets", 75183000000.0),
+        (320193, "Revenues", 65225000000.0),
+        (789019, "Assets", 86100000000.0),
+    ]
+    assert facts["tag"].dtype == "category"
+
+
+def test_prefers_company_facts(configuration_directory):
+    cik = APPLE.cik_str
+    few = [("us-gaap", "Revenues")] * 3
+    many = [("us-gaap", "Revenues")] * 200
+    assert not concepts.prefers_company_facts(cik, few)
+    assert concepts.prefers_company_facts(cik, many)
+
+
+def test_get_concepts_reports_failed_companies(configuration_directory, monkeypatch):
+    def fake_concept(cik, concept, taxonomy="us-gaap"):
+        if cik == APPLE.cik_str:
+            raise requests.ReadTimeout("the server did not respond in time")
+        return concept_document(
+            789019, "Assets", [("2010-06-30", 86113000000, "m1", "2010-07-30")]
+        )
+
+    monkeypatch.setattr(concepts.utils, "get_json", concept_requests(fake_concept))
+    monkeypatch.setattr(concepts, "prefers_company_facts", lambda cik, wanted: False)
+
+    result = concepts.get_concepts([APPLE, MICROSOFT], ["Assets"], workers=2)
+    assert len(result.failed) == 1
+    assert result.failed[0].startswith(f"{APPLE.cik_str}:")
+    assert list(result.facts["cik"]) == [789019]
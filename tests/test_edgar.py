@@ -0,0 +1,52 @@
+import pytest
+import requests
+
+from pyseek import _read, edgar
+
+RECENT = {
+    "cik": "320193",
+    "filings": {
+        "recent": {"accessionNumber": ["a3", "a2"], "form": ["10-K", "4"]},
+        "files": [
+            {"name": "CIK0000320193-submissions-001.json", "filingCount": 1},
+            {"name": "CIK0000320193-submissions-002.json", "filingCount": 2},
+        ],
+    },
+}
+PAGES = {
+    "https://data.sec.gov/submissions/CIK0000320193-submissions-001.json": {
+        "accessionNumber": ["a1"],
+        "form": ["10-Q"],
+    },
+    "https://data.sec.gov/submissions/CIK0000320193-submissions-002.json": {
+        "accessionNumber": ["a0", "a-1"],
+        "form": ["8-K", "4"],
+    },
+}
+
+
+def test_get_company_submissions_history(monkeypatch):
+    def fake_get_json(url):
+        if url == edgar.submissions_url("0000320193"):
+            return RECENT
+        return PAGES[url]
+
+    monkeypatch.setattr(edgar, "get_json", fake_get_json)
+    results, pages = edgar.get_company_submissions_history("0000320193", workers=2)
+    assert results is RECENT
+    assert pages == list(PAGES.values())
+
+    df = _read.read_submissions(results, pages)
+    assert df["accessionNumber"].tolist() == ["a3", "a2", "a1", "a0", "a-1"]
+    assert df["form"].tolist() == ["10-K", "4", "10-Q", "8-K", "4"]
+
+
+def test_get_submissions_pages_raises_when_a_page_fails(monkeypatch):
+    def fake_get_json(url):
+        if url.endswith("-002.json"):
+            raise requests.ReadTimeout("the server did not respond in time")
+        return PAGES[url]
+
+    monkeypatch.setattr(edgar, "get_json", fake_get_json)
+    with pytest.raises(requests.ReadTimeout):
+        edgar.get_submissions_pages(RECENT, workers=2)
@@ -0,0 +1,67 @@
+import gzip
+import json
+
+from pyseek import extract, models
+
+
+def write_filings(directory):
+    (directory / "320193").mkdir(parents=True)
+    (directory / "320193" / "a_10k.htm").write_text(
+        "<html><body><p>Risk factors</p><p>MD&amp;A</p></body></html>"
+    )
+    (directory / "320193" / "b_10q.htm.gz").write_bytes(
+        gzip.compress(b"<html><body><h1>Quarterly</h1></body></html>")
+    )
+    (directory / "320193" / "notes.csv").write_text("not a filing")
+
+
+def test_extract_filings_to_text(tmp_path):
+    source = tmp_path / "filings"
+    write_filings(source)
+    filings = extract.find_filings(source)
+    assert [path.name for path in filings] == ["a_10k.htm", "b_10q.htm.gz"]
+
+    result = extract.extract_filings(
+        filings, tmp_path / "text", root=source, workers=2, chunksize=1
+    )
+    assert result.extracted == 2
+    assert not result.failed
+    assert (tmp_path / "text" / "320193" / "a_10k.txt").read_text() == (
+        "Risk factors\nMD&A\n"
+    )
+    assert (tmp_path / "text" / "320193" / "b_10q.txt").read_text() == "Quarterly\n"
+
+
+def test_extract_filings_to_jsonl(tmp_path):
+    source = tmp_path / "filings"
+    write_filings(source)
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(
+        f"{source / '320193' / 'a_10k.htm'}\n{source / 'missing.htm'}\n"
+    )
+
+    output = tmp_path / "text.jsonl"
+    result = extract.extract_filings(
+        extract.find_filings(manifest), output, models.TextFormat.jsonl, workers=1
+    )
+    assert result.extracted == 1
+    assert len(result.failed) == 1
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert rows == [
+        {"path": str(source / "320193" / "a_10k.htm"), "text": "Risk factors\nMD&A"}
+    ]
+
+
+def test_extract_filings_reports_truncated_files(tmp_path):
+    source = tmp_path / "filings"
+    write_filings(source)
+    body = gzip.compress(b"<html><body><p>Annual report</p></body></html>" * 100)
+    (source / "320193" / "c_10k.htm.gz").write_bytes(body[: len(body) // 2])
+
+    result = extract.extract_filings(
+        extract.find_filings(source), tmp_path / "text", root=source, workers=1
+    )
+    assert result.extracted == 2
+    assert len(result.failed) == 1
+    assert "c_10k.htm.gz" in result.failed[0]
+    assert "EOFError" in result.failed[0]
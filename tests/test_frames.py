@@ -0,0 +1,82 @@
+import pytest
+import requests
+
+from pyseek import cache, edgar, frames
+
+
+def frame(period, *rows):
+    return {
+        "taxonomy": "us-gaap",
+        "tag": "Assets",
+        "ccp": period,
+        "uom": "USD",
+        "data": [
+            {
+                "accn": accn,
+                "cik": cik,
+                "entityName": name,
+                "loc": "US-CA",
+                "end": end,
+                "val": val,
+            }
+            for accn, cik, name, end, val in rows
+        ],
+    }
+
+
+def test_periods():
+    assert frames.periods(2010, 2011) == ["CY2010", "CY2011"]
+    assert frames.periods(2010, 2010, quarterly=True)[-1] == "CY2010Q4"
+    assert frames.periods(2010, 2011, instantaneous=True)[:2] == [
+        "CY2010Q1I",
+        "CY2010Q2I",
+    ]
+
+
+def test_frames_url_and_ttl():
+    url = edgar.frames_url("Assets", "CY2019Q1I")
+    assert (
+        url == "https://data.sec.gov/api/xbrl/frames/us-gaap/Assets/USD/CY2019Q1I.json"
+    )
+    # closed periods never expire
+    assert cache.ttl_for(url) is None
+    assert cache.ttl_for(edgar.frames_url("Assets", "CY2999")) == cache.FRAMES_TTL
+
+
+def test_get_panel(monkeypatch):
+    responses = {
+        "CY2019Q4I": frame(
+            "CY2019Q4I",
+            ("a1", 320193, "Apple Inc.", "2019-12-28", 340618000000),
+            ("m1", 789019, "Microsoft", "2019-12-31", 282794000000),
+        ),
+        "CY2020Q1I": frame(
+            "CY2020Q1I", ("a2", 320193, "Apple Inc.", "2020-03-28", 320400000000)
+        ),
+    }
+
+    def fake_get_json(url):
+        period = url.split("/")[-1][: -len(".json")]
+        if period not in responses:
+            response = requests.Response()
+            response.status_code = 404
+            raise requests.HTTPError(response=response)
+        return responses[period]
+
+    monkeypatch.setattr(frames.utils, "get_json", fake_get_json)
+    df = frames.get_panel("Assets", ["CY2019Q4I", "CY2020Q1I", "CY2020Q2I"], workers=3)
+    assert list(df.columns) == frames.FRAME_COLUMNS
+    assert list(df["cik"]) == [320193, 789019, 320193]
+    assert list(df["period"].cat.categories) == ["CY2019Q4I", "CY2020Q1I", "CY2020Q2I"]
+    assert df["period"].cat.ordered
+    assert df["val"].dtype == "float64"
+    assert str(df["end"].dtype).startswith("datetime64")
+
+
+def test_get_frame_raises_when_the_frame_cannot_be_fetched(monkeypatch):
+    def fake_get_json(url):
+        raise requests.ReadTimeout("the server did not respond in time")
+
+    monkeypatch.setattr(frames.utils, "get_json", fake_get_json)
+    with pytest.raises(requests.ReadTimeout):
+        frames.get_panel("Assets", ["CY2019Q4I", "CY2020Q1I"], workers=2)
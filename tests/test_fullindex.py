@@ -0,0 +1,88 @@
+from datetime import date
+
+import requests
+
+from pyseek import fullindex, models
+
+MASTER = """Description:           Master Index of EDGAR Dissemination Feed
+Last Data Received:    March 31, 2023
+Comments:              webmaster@sec.gov
+Anonymous FTP:         ftp://ftp.sec.gov/edgar/
+Cloud HTTP:            https://www.sec.gov/Archives/
+
+ 
+ 
+ 
+CIK|Company Name|Form Type|Date Filed|Filename
+--------------------------------------------------------------------------------
+320193|Apple Inc.|8-K|2023-02-02|edgar/data/320193/0000320193-23-000005.txt
+789019|MICROSOFT CORP|10-Q|2023-01-24|edgar/data/789019/0000950170-23-001409.txt
+"""
+
+FORM = """Description:           Daily Index of EDGAR Dissemination Feed by Form Type
+Last Data Received:    May 3, 2024
+Comments:              webmaster@sec.gov
+Anonymous FTP:         ftp://ftp.sec.gov/edgar/
+
+ 
+ 
+ 
+Form Type   Company Name                                                  CIK         Date Filed  File Name
+---------------------------------------------------------------------------------------------------------------------------------------------
+10-Q        Apple Inc.                                                    320193      20240503    edgar/data/320193/0000320193-24-000069.txt
+8-K         MICROSOFT CORP                                                789019      20240503    edgar/data/789019/0000950170-24-052555.txt
+"""
+
+
+def test_parse_index_layouts():
+    master = fullindex.parse_index(MASTER, models.IndexType.master)
+    assert list(master.columns) == fullindex.INDEX_COLUMNS
+    assert list(master["cik"]) == [320193, 789019]
+    assert list(master["accessionNumber"]) == [
+        "0000320193-23-000005",
+        "0000950170-23-001409",
+    ]
+    assert master["filingDate"].iloc[0].date() == date(2023, 2, 2)
+
+    form = fullindex.parse_index(FORM, models.IndexType.form)
+    assert list(form["companyName"]) == ["Apple Inc.", "MICROSOFT CORP"]
+    assert list(form["form"]) == ["10-Q", "8-K"]
+    assert form["filingDate"].iloc[1].date() == date(2024, 5, 3)
+    assert form["form"].dtype == "category"
+
+
+def test_index_parts():
+    parts = fullindex.index_parts(
+        date(2023, 12, 20), date(2024, 5, 6), today=date(2024, 5, 6)
+    )
+    assert parts[:2] == [("full", 2023, 4), ("full", 2024, 1)]
+    # the current quarter comes from daily indexes, business days only
+    assert parts[2:] == [("daily", date(2024, 4, 1))] + [
+        ("daily", day)
+        for day in [date(2024, 4, d) for d in range(2, 31)]
+        + [date(2024, 5, d) for d in range(1, 7)]
+        if day.weekday() < 5
+    ]
+
+
+def test_get_filings_stores_parsed_indexes(configuration_directory, monkeypatch):
+    urls = []
+
+    def fake_get_text(url, encoding="utf-8", requestTimeout=5):
+        urls.append(url)
+        if url.endswith("master.idx"):
+            return MASTER
+        response = requests.Response()
+        response.status_code = 404
+        raise requests.HTTPError(response=response)
+
+    monkeypatch.setattr(fullindex.utils, "get_text", fake_get_text)
+    df = fullindex.get_filings(date(2023, 2, 1), date(2023, 2, 28), forms=["8-K"])
+    assert list(df["accessionNumber"]) == ["0000320193-23-000005"]
+    assert urls == [fullindex.full_index_url(2023, 1)]
+
+    # parsed once, then read back from the local store
+    urls.clear()
+    df = fullindex.get_filings(date(2023, 1, 1), date(2023, 3, 31))
+    assert len(df) == 2
+    assert urls == []
@@ -0,0 +1,29 @@
+from pyseek import htmltext, submissions
+
+REPORT = (
+    "<html><head><title>ignored</title></head><body>"
+    "<div><span>outside any block</span><h2>Item 1A.&nbsp;</h2>"
+    "<p>Risk <b>factors</b><script>var x = 1;</script></p></div>"
+    "<table><tr><td>$ 1,000<p>nested</p></td><th> Total </th></tr></table>"
+    "<ul><li>one</li><li></li></ul>"
+    "</body></html>"
+)
+
+
+def test_extract_text():
+    assert submissions.extractText(REPORT) == (
+        "Item 1A.\nRisk factors\n$ 1,000nested\nTotal\none\n"
+    )
+
+
+def test_iter_text_blocks_chunked_bytes():
+    raw = REPORT.encode()
+    chunks = [raw[i : i + 5] for i in range(0, len(raw), 5)]
+    assert "\n".join(htmltext.iter_text_blocks(chunks)) == htmltext.extract_text(REPORT)
+
+
+def test_extract_text_deeply_nested():
+    depth = 5000
+    report = "<body>" + "<div>" * depth + "<p>deep</p>" + "</div>" * depth + "</body>"
+    assert htmltext.extract_text(report) == "deep"
+    assert htmltext.extract_text("") == ""
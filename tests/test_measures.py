@@ -0,0 +1,64 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from pyseek import _read, models, stream
+from pyseek.measures import Measures
+
+from tests.test_read import COMPANY_FACTS
+from tests.test_stream import chunked
+
+
+@pytest.fixture
+def measures():
+    records = stream.iter_company_facts(chunked(COMPANY_FACTS, 64))
+    return Measures.from_records(records, 320193)
+
+
+def test_models_are_slotted():
+    company = models.CIK(title="Apple Inc.", ticker="AAPL", cik_str=320193)
+    assert company.cik_str == "0000320193"
+    assert not hasattr(company, "__dict__")
+    assert not hasattr(measure_fields(), "__dict__")
+
+
+def measure_fields():
+    return models.Measure(
+        frame="CY2010",
+        filed=date(2010, 10, 27),
+        end=date(2010, 9, 25),
+        form="10-K",
+        fp="FY",
+        fy=2010,
+        val=1.0,
+        accn="a",
+    )
+
+
+def test_frame_round_trip_shares_memory(measures):
+    df = measures.to_frame()
+    assert list(df.columns) == _read.FACT_COLUMNS
+    assert np.shares_memory(df["val"].to_numpy(), measures.val)
+    again = Measures.from_frame(df)
+    assert np.shares_memory(again.val, measures.val)
+    assert again.tag is df["tag"].array
+
+
+def test_indexing_and_filters(measures):
+    assert len(measures) == 2
+    revenues = measures.where(tag="Revenues", unit="USD")
+    assert len(revenues) == 1
+    assert revenues[0] == models.Measure(
+        frame="CY2010",
+        filed=date(2010, 10, 27),
+        end=date(2010, 9, 25),
+        form="10-K",
+        fp="FY",
+        fy=2010,
+        val=65225000000.0,
+        accn="0001193125-10-238044",
+    )
+    assert len(measures.where(tag="NotReported")) == 0
+    assert measures[measures.val > 7e10].tag.tolist() == ["Assets"]
+    assert [m.val for m in measures] == measures.val.tolist()
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from pyseek import query
+
+SUBMISSIONS = pd.DataFrame(
+    {
+        "accessionNumber": ["a4", "a3", "a2", "a1"],
+        "filingDate": ["2023-11-03", "2023-08-04", "2023-05-05", "2022-10-28"],
+        "reportDate": ["2023-09-30", "", "2023-04-01", "2022-09-24"],
+        "acceptanceDateTime": [
+            "2023-11-02T18:08:27.000Z",
+            "2023-08-03T18:04:43.000Z",
+            "2023-05-04T18:03:52.000Z",
+            "2022-10-27T18:01:14.000Z",
+        ],
+        "form": ["10-K", "8-K", "10-Q", "10-K"],
+        "items": ["", "2.02,9.01", "", ""],
+        "size": [9000000, 20000, 5000000, 8000000],
+        "isXBRL": [1, 0, 1, 1],
+        "primaryDocument": ["k.htm", "8k.htm", "q.htm", "k22.htm"],
+    }
+)
+
+
+def test_typed():
+    df = query.typed(SUBMISSIONS)
+    assert df.index.name == "filingDate"
+    assert isinstance(df.index, pd.DatetimeIndex)
+    assert df["form"].dtype == "category"
+    assert df["size"].dtype == "Int64"
+    assert df["isXBRL"].dtype == "boolean"
+    assert df["reportDate"].isna().tolist() == [False, True, False, False]
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_select(shuffle):
+    df = query.typed(SUBMISSIONS)
+    if shuffle:
+        df = df.iloc[[2, 0, 3, 1]]
+    assert sorted(query.select(df, forms=["10-K"])["accessionNumber"]) == ["a1", "a4"]
+    assert sorted(
+        query.select(df, forms=["10-K", "10-Q"], since="2023-01-01")["accessionNumber"]
+    ) == ["a2", "a4"]
+    assert list(query.select(df, until="2022-12-31")["accessionNumber"]) == ["a1"]
+    assert list(query.select(df, items=["9.01"])["accessionNumber"]) == ["a3"]
+    assert list(query.select(df, items=["9.0"])["accessionNumber"]) == []
+    assert sorted(
+        query.select(df, min_size=6000000, max_size=8500000)["accessionNumber"]
+    ) == ["a1"]
+
+
+def test_load_caches_a_typed_sidecar(tmp_path):
+    record = tmp_path / "AAPL_submissions.csv"
+    SUBMISSIONS.to_csv(record, index=False)
+    df = query.load(record)
+    sidecar = query.sidecar_path(record)
+    assert sidecar.exists()
+    # items such as 9.10 must not be read as numbers
+    assert df["items"].iloc[1] == "2.02,9.01"
+
+    cached = query.load(record)
+    pd.testing.assert_frame_equal(df, cached)
+    assert cached["form"].dtype == "category"
@@ -0,0 +1,34 @@
+import time
+
+from pyseek import ratelimit
+
+
+def test_token_bucket_spaces_requests():
+    bucket = ratelimit.TokenBucket(rate=50)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # the first token is free, the next five are 1/50s apart
+    assert time.monotonic() - start >= 5 / 50 * 0.9
+
+
+def test_token_bucket_shared_through_state_file(tmp_path):
+    state_file = tmp_path / ratelimit.STATE_FILE
+    first = ratelimit.TokenBucket(rate=10, state_file=state_file)
+    second = ratelimit.TokenBucket(rate=10, state_file=state_file)
+    assert first.reserve() == 0
+    # the second bucket sees the token the first one took
+    assert second.reserve() > 0.05
+
+
+def test_token_bucket_pause(tmp_path):
+    bucket = ratelimit.TokenBucket(rate=10, state_file=tmp_path / "state")
+    bucket.pause(2)
+    assert bucket.reserve() >= 1.9
+
+
+def test_get_limiter_uses_configuration_directory(configuration_directory):
+    limiter = ratelimit.get_limiter()
+    assert limiter is ratelimit.get_limiter()
+    assert limiter.rate == 10
+    assert limiter.state_file == configuration_directory / ratelimit.STATE_FILE
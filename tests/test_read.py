@@ -0,0 +1,82 @@
+import json
+
+import pandas as pd
+import pytest
+
+from pyseek import _read
+
+COMPANY_FACTS = {
+    "cik": 320193,
+    "entityName": "Apple Inc.",
+    "facts": {
+        "us-gaap": {
+            "Revenues": {
+                "label": "Revenues",
+                "units": {
+                    "USD": [
+                        {
+                            "start": "2009-09-27",
+                            "end": "2010-09-25",
+                            "val": 65225000000,
+                            "accn": "0001193125-10-238044",
+                            "fy": 2010,
+                            "fp": "FY",
+                            "form": "10-K",
+                            "filed": "2010-10-27",
+                            "frame": "CY2010",
+                        }
+                    ]
+                },
+            },
+            "Assets": {
+                "label": "Assets",
+                "units": {
+                    "USD": [
+                        {
+                            "end": "2010-09-25",
+                            "val": 75183000000,
+                            "accn": "0001193125-10-238044",
+                            "fy": 2010,
+                            "fp": "FY",
+                            "form": "10-K",
+                            "filed": "2010-10-27",
+                        }
+                    ]
+                },
+            },
+        }
+    },
+}
+
+
+@pytest.fixture
+def facts_file(tmp_path):
+    path = tmp_path / "AAPL_facts.json"
+    path.write_text(json.dumps(COMPANY_FACTS))
+    return path
+
+
+def test_read_facts(facts_file):
+    df = _read.read_facts(facts_file)
+    assert list(df.columns) == _read.FACT_COLUMNS
+    assert len(df) == 2
+    assert df["cik"].tolist() == [320193, 320193]
+    assert isinstance(df["tag"].dtype, pd.CategoricalDtype)
+    assert df["end"].dtype.kind == "M"
+    assert df["val"].dtype == "float64"
+    assert pd.isna(df.loc[1, "start"])
+    assert pd.isna(df.loc[1, "frame"])
+
+
+def test_facts_table_round_trip(facts_file, tmp_path):
+    pytest.importorskip("pyarrow")
+    table = tmp_path / "facts"
+    df = _read.read_facts(facts_file)
+    _read.write_facts_table(df, table)
+    # rewriting a company replaces its partition
+    _read.write_facts_table(df, table)
+
+    result = _read.read_facts_table(table, columns=["tag", "val"], ciks=[320193])
+    assert sorted(result.columns) == ["tag", "val"]
+    assert len(result) == 2
+    assert _read.read_facts_table(table, ciks=[1]).empty
@@ -0,0 +1,106 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from pyseek import bulk, search
+
+DOCUMENTS = {
+    "AAPL_10-K.txt": "Substantial doubt about our ability to continue as a going concern.",
+    "MSFT_10-K.txt": "We are going to expand. Concern about supply chains remains.",
+    "TSLA_10-Q.txt": "The going concern assessment found no substantial doubt. Going concern.",
+    "AMZN_8-K.txt": "Results of operations and financial condition.",
+}
+
+
+def write_documents(directory):
+    paths = []
+    for name, text in DOCUMENTS.items():
+        path = directory / name
+        path.write_text(text)
+        paths.append(path)
+    return paths
+
+
+def test_parse_query():
+    assert search.tokenize("Going-Concern, 10-K!") == ["going", "concern", "10", "k"]
+    assert search.parse_query('"going concern" Doubt') == [
+        ["going", "concern"],
+        ["doubt"],
+    ]
+    assert search.describe("AAPL_10-K_0000320193-23-000106.txt") == ("10-K", "AAPL")
+    assert search.describe("AAPL_10-K_item1A.txt") == ("10-K", "AAPL")
+    assert search.describe("AAPL_10-K_0000320193-23-000106_item7.txt") == (
+        "10-K",
+        "AAPL",
+    )
+    # the layout of `submissions batch`
+    assert search.describe("0000320193-23-000106_aapl-20230930.htm") == ("", "")
+
+
+def test_search_phrases_forms_and_ranking(tmp_path):
+    index = search.SearchIndex(tmp_path / "index")
+    assert index.add(write_documents(tmp_path), segment_size=2) == 4
+    assert index.stats()["segments"] == 2
+
+    # a phrase needs the words next to each other
+    hits = index.search('"going concern"')
+    assert [hit.ticker for hit in hits] == ["TSLA", "AAPL"]
+    assert hits[0].form == "10-Q"
+    # plain words must all appear, anywhere
+    assert {hit.ticker for hit in index.search("going concern")} == {
+        "AAPL",
+        "MSFT",
+        "TSLA",
+    }
+    assert [hit.ticker for hit in index.search('"going concern"', forms=["10-K"])] == [
+        "AAPL"
+    ]
+    assert index.search("bankruptcy") == []
+    index.close()
+
+
+def test_incremental_add_and_merge(tmp_path):
+    index = search.SearchIndex(tmp_path / "index")
+    paths = write_documents(tmp_path)
+    index.add(paths)
+    # unchanged files are not read again
+    assert index.add(paths) == 0
+
+    changed = tmp_path / "AAPL_10-K.txt"
+    changed.write_text("No longer any doubt whatsoever.")
+    os.utime(changed, (1, 1))
+    assert index.add(paths) == 1
+    assert [hit.ticker for hit in index.search('"going concern"')] == ["TSLA"]
+    assert [hit.ticker for hit in index.search("whatsoever")] == ["AAPL"]
+
+    index.merge()
+    assert index.stats() == {"segments": 1, "documents": 4, "tokens": 31}
+    assert [hit.ticker for hit in index.search('"going concern"')] == ["TSLA"]
+    assert [hit.ticker for hit in index.search("whatsoever")] == ["AAPL"]
+    index.close()
+
+
+def test_batch_downloads_take_the_form_from_the_manifest(tmp_path):
+    filings = tmp_path / "filings"
+    bulk.write_manifest(
+        filings,
+        pd.DataFrame(
+            {
+                "cik": [320193, 320193],
+                "accessionNumber": ["0000320193-23-000106", "0000320193-23-000077"],
+                "form": ["10-K", "10-Q"],
+            }
+        ),
+    )
+    (filings / "320193").mkdir()
+    annual = filings / "320193" / "0000320193-23-000106_aapl-20230930.htm"
+    annual.write_text("<html><body><p>Going concern.</p></body></html>")
+    quarterly = filings / "320193" / "0000320193-23-000077_aapl-20230701.htm"
+    quarterly.write_text("<html><body><p>Going concern.</p></body></html>")
+
+    index = search.SearchIndex(tmp_path / "index")
+    index.add([annual, quarterly])
+    hits = index.search("going concern", forms=["10-K"])
+    assert [Path(hit.path).name for hit in hits] == [annual.name]
+    index.close()
@@ -0,0 +1,81 @@
+from pyseek import edgar, sections
+
+TENK = (
+    "<html><body>"
+    "<table>"
+    "<tr><td>PART I</td></tr>"
+    "<tr><td>Item 1.</td><td>Business</td><td>3</td></tr>"
+    "<tr><td>Item 1A.</td><td>Risk Factors</td><td>9</td></tr>"
+    "<tr><td>PART II</td></tr>"
+    "<tr><td>Item 7.</td><td>Management&#8217;s Discussion</td><td>30</td></tr>"
+    "</table>"
+    "<p>PART I</p>"
+    "<p>Item 1. Business</p><p>We make things.</p>"
+    "<p>ITEM&nbsp;1A.</p><p>Risk Factors</p>"
+    "<p>Our business is subject to many risks.</p>"
+    "<p>Item 1A of this report lists them, and this paragraph is long enough to be"
+    " a paragraph rather than a heading, since headings are short lines of text and"
+    " the splitter should never take a paragraph which mentions an item for one.</p>"
+    "<p>PART II</p>"
+    "<p>Item 7. Management&#8217;s Discussion and Analysis</p>"
+    "<p>Revenue grew.</p>"
+    "</body></html>"
+)
+
+TENQ = (
+    "<body><p>PART I</p><p>Item 1. Financial Statements</p><p>Balance sheet.</p>"
+    "<p>Item 2. Management&#8217;s Discussion</p><p>Results.</p>"
+    "<p>PART II</p><p>Item 1. Legal Proceedings</p><p>None.</p>"
+    "<p>Item 1A. Risk Factors</p><p>No changes.</p></body>"
+)
+
+
+def test_split_filing(tmp_path):
+    path = tmp_path / "filing.txt"
+    found = sections.split_filing(TENK, path)
+    assert [(s.part, s.item) for s in found] == [("I", "1"), ("I", "1A"), ("II", "7")]
+    risks = sections.find_section(found, "1a")
+    assert risks.title == "Risk Factors"
+    text = sections.read_section(path, risks)
+    assert text.startswith("ITEM 1A.\nRisk Factors\nOur business")
+    # the part heading after the item is not part of it
+    assert not text.endswith("PART II\n")
+    assert sections.read_section(path, sections.find_section(found, "7")) == (
+        "Item 7. Management’s Discussion and Analysis\nRevenue grew.\n"
+    )
+    assert sections.find_section(found, "9A") is None
+    # offsets are read back instead of located again
+    assert sections.load_sections(path) == found
+    path.with_suffix(".json").unlink()
+    assert sections.load_sections(path) == found
+
+
+def test_quarterly_parts(tmp_path):
+    path = tmp_path / "filing.txt"
+    found = sections.split_filing(TENQ, path)
+    assert [(s.part, s.item) for s in found] == [
+        ("I", "1"),
+        ("I", "2"),
+        ("II", "1"),
+        ("II", "1A"),
+    ]
+    legal = sections.find_section(found, "1", part="ii")
+    assert sections.read_section(path, legal) == "Item 1. Legal Proceedings\nNone.\n"
+    assert sections.find_section(found, "1").title == "Financial Statements"
+
+
+def test_get_section_splits_once(tmp_path, monkeypatch):
+    downloads = []
+
+    def download(cik, accession_number, primary_document):
+        downloads.append(accession_number)
+        return TENK
+
+    monkeypatch.setattr(edgar, "download_company_submission", download)
+    for _ in range(2):
+        text = sections.get_section(
+            "320193", "0000320193-23-000106", "aapl.htm", "7", directory=tmp_path
+        )
+        assert text.endswith("Revenue grew.\n")
+    assert downloads == ["0000320193-23-000106"]
+    assert (tmp_path / "0000320193-23-000106.json").exists()
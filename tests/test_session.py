@@ -0,0 +1,27 @@
+from pyseek import session
+
+
+def write_config(directory, extra=""):
+    (directory / "config.ini").write_text(
+        "[API]\nuser-agent = test_user_agent\n" + extra
+    )
+
+
+def test_get_session_is_shared(configuration_directory):
+    write_config(configuration_directory)
+    first = session.get_session()
+    assert session.get_session() is first
+    assert first.headers["User-Agent"] == "test_user_agent"
+
+    session.close_session()
+    assert session.get_session() is not first
+
+
+def test_session_pool_settings(configuration_directory):
+    write_config(
+        configuration_directory,
+        "[Connection]\npoolconnections = 3\npoolmaxsize = 25\n",
+    )
+    adapter = session.get_session().get_adapter("https://data.sec.gov")
+    assert adapter._pool_connections == 3
+    assert adapter._pool_maxsize == 25
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from pyseek import stream
+
+COMPANY_FACTS = {
+    "cik": 320193,
+    "entityName": "Apple Inc. – test",
+    "facts": {
+        "dei": {
+            "EntityCommonStockSharesOutstanding": {
+                "label": "Entity Common Stock, Shares Outstanding",
+                "description": "Shares “outstanding”",
+                "units": {
+                    "shares": [
+                        {"end": "2009-10-16", "val": 895816758, "fy": 2009},
+                        {"end": "2010-01-15", "val": 1.5e9, "fy": 2010},
+                    ]
+                },
+            }
+        },
+        "us-gaap": {
+            "Revenues": {
+                "label": "Revenues",
+                "units": {"USD": [{"end": "2010-09-25", "val": -12.5}]},
+            },
+            "Assets": {"label": "Assets", "units": {"USD": []}},
+        },
+    },
+}
+
+
+def chunked(document, size):
+    raw = json.dumps(document, indent=2, ensure_ascii=False).encode()
+    return [raw[i : i + size] for i in range(0, len(raw), size)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_iter_company_facts(size):
+    records = list(stream.iter_company_facts(chunked(COMPANY_FACTS, size)))
+    assert [(r.taxonomy, r.concept, r.unit) for r in records] == [
+        ("dei", "EntityCommonStockSharesOutstanding", "shares"),
+        ("dei", "EntityCommonStockSharesOutstanding", "shares"),
+        ("us-gaap", "Revenues", "USD"),
+    ]
+    assert records[1].fact["val"] == 1.5e9
+    assert records[2].fact["val"] == -12.5
+
+
+def test_iter_concepts_stops_early():
+    read = []
+
+    def chunks():
+        for chunk in chunked(COMPANY_FACTS, 16):
+            read.append(chunk)
+            yield chunk
+
+    taxonomy, concept, body = next(stream.iter_concepts(chunks()))
+    assert (taxonomy, concept) == ("dei", "EntityCommonStockSharesOutstanding")
+    assert body == COMPANY_FACTS["facts"]["dei"][concept]
+    assert len(read) < len(chunked(COMPANY_FACTS, 16))
+
+
+def test_iter_concepts_rejects_truncated_document():
+    with pytest.raises(json.JSONDecodeError):
+        list(stream.iter_concepts(chunked(COMPANY_FACTS, 50)[:-3]))
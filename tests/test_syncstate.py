@@ -0,0 +1,24 @@
+from pyseek import syncstate
+
+
+def test_sync_state(tmp_path):
+    state = syncstate.SyncState(tmp_path / syncstate.STATE_FILE)
+    assert state.get(320193, "facts") is None
+    assert state.changed("0000320193", "facts", "0000320193-23-000106")
+
+    state.record("0000320193", "facts", "0000320193-23-000106", synced_at=1.0)
+    assert state.get(320193, "facts") == ("0000320193-23-000106", 1.0)
+    assert not state.changed(320193, "facts", "0000320193-23-000106")
+    assert state.changed(320193, "facts", "0000320193-24-000001")
+    # datasets are tracked separately
+    assert state.changed(320193, "submissions", "0000320193-23-000106")
+    state.close()
+
+
+def test_latest_accession():
+    recent = {"filings": {"recent": {"accessionNumber": ["b", "a"]}}}
+    assert syncstate.latest_accession(recent) == "b"
+    assert (
+        syncstate.latest_accession({"filings": {"recent": {"accessionNumber": []}}})
+        is None
+    )
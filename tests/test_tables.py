@@ -0,0 +1,84 @@
+import gzip
+
+import pandas as pd
+
+from pyseek import tables
+
+STATEMENT = (
+    "<html><body><p>CONSOLIDATED STATEMENTS OF OPERATIONS</p>"
+    "<p>(In millions, except per share amounts)</p>"
+    "<table>"
+    "<tr><td></td><td colspan='5'>Years ended</td></tr>"
+    "<tr><td></td><td colspan='2'>2023</td><td></td><td colspan='2'>2022</td></tr>"
+    "<tr><td>Net sales</td><td>$</td><td>383,285</td><td></td><td>$</td><td>394,328</td></tr>"
+    "<tr><td>Other income</td><td></td><td>(565</td><td>)</td><td></td><td>&#8212;</td></tr>"
+    "<tr><td>Earnings per share</td><td>$</td><td>6.16</td><td></td><td>$</td><td>6.15</td></tr>"
+    "<tr><td>Gross margin</td><td></td><td>44.1</td><td>%</td><td></td><td>43.3%</td></tr>"
+    "</table>"
+    "<table><tr><td>Signature</td><td>Title</td></tr>"
+    "<tr><td>Tim Cook</td><td>CEO</td></tr></table>"
+    "</body></html>"
+)
+
+
+def test_grid_spans():
+    rows = [
+        [("a", 2, 1), ("b", 1, 2)],
+        [("c", 1, 1), ("d", 1, 1)],
+        [("e", 1, 1)],
+    ]
+    assert tables._grid(rows) == [["a", "b", "b"], ["a", "c", "d"], ["e", "", ""]]
+
+
+def test_parse_number():
+    assert tables.parse_number("$ 1,234.5") == 1234.5
+    assert tables.parse_number("(12)") == -12
+    assert tables.parse_number("4.5%") == 4.5
+    assert tables.parse_number("—") == 0
+    assert tables.parse_number("Net sales") is None
+
+
+def test_extract_tables():
+    frames = tables.extract_tables(STATEMENT)
+    assert len(frames) == 1
+    df = frames[0]
+    assert list(df.columns) == ["label", "Years ended 2023", "Years ended 2022"]
+    assert df.attrs["scale"] == 1e6
+    assert df["Years ended 2023"].tolist() == [383285e6, -565e6, 6.16, 44.1]
+    assert df["Years ended 2022"].tolist() == [394328e6, 0, 6.15, 43.3]
+    assert str(df["Years ended 2023"].dtype) == "Float64"
+    assert len(tables.extract_tables(STATEMENT, numeric_only=False)) == 2
+
+    chunks = [STATEMENT.encode()[i : i + 7] for i in range(0, len(STATEMENT), 7)]
+    pd.testing.assert_frame_equal(tables.extract_tables(chunks)[0], df)
+
+
+def test_extract_filings(tmp_path):
+    source = tmp_path / "filings"
+    source.mkdir()
+    (source / "a_10k.htm").write_text(STATEMENT)
+    (source / "b_8k.htm").write_text("<html><body><p>No tables</p></body></html>")
+    result = tables.extract_filings(
+        sorted(source.iterdir()), tmp_path / "tables", root=source, workers=2
+    )
+    assert (result.extracted, result.tables, result.failed) == (2, 1, [])
+    written = list((tmp_path / "tables").iterdir())
+    assert sorted(path.stem for path in written) == ["a_10k", "b_8k"]
+    path = next(path for path in written if path.stem == "a_10k")
+    df = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+    assert len(df) == 8
+    assert df.loc[df["label"] == "Net sales", "value"].tolist() == [383285e6, 394328e6]
+
+
+def test_extract_filings_reports_truncated_files(tmp_path):
+    source = tmp_path / "filings"
+    source.mkdir()
+    (source / "a_10k.htm").write_text(STATEMENT)
+    body = gzip.compress(STATEMENT.encode() * 50)
+    (source / "b_10k.htm.gz").write_bytes(body[: len(body) // 2])
+    result = tables.extract_filings(
+        sorted(source.iterdir()), tmp_path / "tables", root=source, workers=1
+    )
+    assert (result.extracted, result.tables) == (1, 1)
+    assert len(result.failed) == 1
+    assert "EOFError" in result.failed[0]
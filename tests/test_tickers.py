@@ -0,0 +1,31 @@
+import json
+
+from pyseek import tickers, utils
+
+COMPANY_TICKERS = {
+    "0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+    "1": {"cik_str": 789019, "ticker": "MSFT", "title": "MICROSOFT CORP"},
+    "2": {"cik_str": 1652044, "ticker": "GOOGL", "title": "Alphabet Inc."},
+    "3": {"cik_str": 1652044, "ticker": "GOOG", "title": "Alphabet Inc."},
+}
+
+
+def test_lookups_build_index_from_tickers_file(configuration_directory):
+    (configuration_directory / tickers.TICKERS_FILE).write_text(
+        json.dumps(COMPANY_TICKERS)
+    )
+    tickers.reset_index()
+
+    assert utils.company_from_ticker("aapl") == [COMPANY_TICKERS["0"]]
+    assert [c["ticker"] for c in utils.company_from_cik(1652044)] == ["GOOGL", "GOOG"]
+    assert utils.company_from_cik(1) == []
+    assert (configuration_directory / tickers.INDEX_FILE).exists()
+    assert utils.validate_ticker_or_cik("789019").ticker == "MSFT"
+
+
+def test_search(configuration_directory):
+    tickers.build_index(COMPANY_TICKERS)
+    index = tickers.get_index()
+    assert index.search("msft")[0]["title"] == "MICROSOFT CORP"
+    assert [c["ticker"] for c in index.search("alpha")] == ["GOOGL", "GOOG"]
+    assert index.search("Microsft Corp")[0]["ticker"] == "MSFT"
@@ -1,3 +1,5 @@
+import json
+
 from pyseek import utils
 import pytest
 import requests
@@ -38,3 +40,190 @@ def test_set_headers(set_up):
     """Test the set_headers function"""
     result = utils.set_headers()
     assert result["User-Agent"] == "test_user_agent"
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, payload=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.payload = payload
+        self.content = json.dumps(payload).encode()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+    def json(self):
+        return self.payload
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, timeout=None, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+class FakeLimiter:
+    def __init__(self):
+        self.pauses = []
+
+    def acquire(self):
+        pass
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+
+def test_make_request_retries_throttled(configuration_directory, monkeypatch):
+    fake = FakeSession(
+        [
+            FakeResponse(429, {"Retry-After": "3"}),
+            FakeResponse(503),
+            FakeResponse(200, payload={"ok": True}),
+        ]
+    )
+    limiter = FakeLimiter()
+    monkeypatch.setattr(utils.session, "get_session", lambda: fake)
+    monkeypatch.setattr(utils.ratelimit, "get_limiter", lambda: limiter)
+
+    assert utils.make_request("https://data.sec.gov/test.json") == {"ok": True}
+    assert fake.calls == 3
+    assert limiter.pauses[0] == 3
+    assert 0 <= limiter.pauses[1] <= utils.BACKOFF_BASE * 2
+
+
+def test_make_request_raises_when_still_throttled(configuration_directory, monkeypatch):
+    fake = FakeSession([FakeResponse(429)] * (utils.MAX_RETRIES + 1))
+    monkeypatch.setattr(utils.session, "get_session", lambda: fake)
+    monkeypatch.setattr(utils.ratelimit, "get_limiter", FakeLimiter)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        utils.make_request("https://data.sec.gov/test.json")
+    assert fake.calls == utils.MAX_RETRIES + 1
+
+
+def test_download_document_raises_for_errors(configuration_directory, monkeypatch):
+    monkeypatch.setattr(
+        utils.session, "get_session", lambda: FakeSession([FakeResponse(404)])
+    )
+    monkeypatch.setattr(utils.ratelimit, "get_limiter", FakeLimiter)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        utils.download_document("320193", "0000320193-23-000106", "missing.htm")
+
+
+def test_get_json_raises_instead_of_returning_none(
+    configuration_directory, monkeypatch
+):
+    html = FakeResponse(200)
+    html.content = b"<html>not json</html>"
+    monkeypatch.setattr(utils.session, "get_session", lambda: FakeSession([html]))
+    monkeypatch.setattr(utils.ratelimit, "get_limiter", FakeLimiter)
+
+    with pytest.raises(ValueError):
+        utils.get_json("https://data.sec.gov/submissions/CIK0000320193.json")
+
+
+class FakeDownload(FakeResponse):
+    def __init__(self, status_code, body, headers):
+        super().__init__(status_code, headers)
+        self.body = body
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i : i + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def test_download_to_file_resumes(tmp_path, monkeypatch):
+    document = b"<html>" + b"x" * 1000 + b"</html>"
+    target = tmp_path / "filing.htm"
+    (tmp_path / "filing.htm.part").write_bytes(document[:400])
+    (tmp_path / "filing.htm.part.validator").write_text('"v1"')
+    sent = []
+
+    def fake_get_response(url, requestTimeout=5, headers=None, stream=False):
+        sent.append(headers)
+        return FakeDownload(
+            206,
+            document[400:],
+            {
+                "Content-Range": f"bytes 400-{len(document) - 1}/{len(document)}",
+                "Content-Length": str(len(document) - 400),
+            },
+        )
+
+    monkeypatch.setattr(utils, "get_response", fake_get_response)
+    assert utils.download_to_file("https://www.sec.gov/x", target) == target
+    assert sent[0]["Range"] == "bytes=400-"
+    assert sent[0]["If-Range"] == '"v1"'
+    assert target.read_bytes() == document
+    assert not (tmp_path / "filing.htm.part").exists()
+    assert not (tmp_path / "filing.htm.part.validator").exists()
+
+
+def test_download_to_file_starts_over_when_the_document_changed(tmp_path, monkeypatch):
+    old, new = b"<html>old version", b"<html>the new version</html>"
+    target = tmp_path / "filing.htm"
+    (tmp_path / "filing.htm.part").write_bytes(old)
+    (tmp_path / "filing.htm.part.validator").write_text('"v1"')
+    sent = []
+
+    def fake_get_response(url, requestTimeout=5, headers=None, stream=False):
+        sent.append(headers)
+        # If-Range did not match, so the server sends the whole new document
+        return FakeDownload(200, new, {"Content-Length": str(len(new)), "ETag": '"v2"'})
+
+    monkeypatch.setattr(utils, "get_response", fake_get_response)
+    assert utils.download_to_file("https://www.sec.gov/x", target) == target
+    assert sent[0]["If-Range"] == '"v1"'
+    assert target.read_bytes() == new
+
+
+def test_download_to_file_does_not_resume_an_unversioned_part(tmp_path, monkeypatch):
+    document = b"<html>filing</html>"
+    target = tmp_path / "filing.htm"
+    (tmp_path / "filing.htm.part").write_bytes(b"<html>fil")
+    sent = []
+
+    def fake_get_response(url, requestTimeout=5, headers=None, stream=False):
+        sent.append(headers)
+        return FakeDownload(200, document, {"Content-Length": str(len(document))})
+
+    monkeypatch.setattr(utils, "get_response", fake_get_response)
+    utils.download_to_file("https://www.sec.gov/x", target)
+    assert "Range" not in sent[0]
+    assert target.read_bytes() == document
+
+
+def test_download_to_file_checks_size_and_compresses(tmp_path, monkeypatch):
+    import gzip
+
+    document = b"<html>filing</html>"
+    lengths = [len(document) + 5, len(document)]
+    monkeypatch.setattr(
+        utils,
+        "get_response",
+        lambda url, **kwargs: FakeDownload(
+            200, document, {"Content-Length": str(lengths.pop(0))}
+        ),
+    )
+    target = tmp_path / "filing.htm"
+    with pytest.raises(IOError):
+        utils.download_to_file("https://www.sec.gov/x", target, "gzip")
+
+    path = utils.download_to_file("https://www.sec.gov/x", target, "gzip")
+    assert path.name == "filing.htm.gz"
+    assert gzip.decompress(path.read_bytes()) == document
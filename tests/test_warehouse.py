@@ -0,0 +1,160 @@
+import json
+
+from pyseek import models, warehouse
+
+from tests.test_read import COMPANY_FACTS
+
+APPLE = models.CIK(title="Apple Inc.", ticker="AAPL", cik_str=320193)
+
+
+def submissions(accessions):
+    n = len(accessions)
+    return {
+        "cik": "320193",
+        "filings": {
+            "recent": {
+                "accessionNumber": accessions,
+                "filingDate": ["2023-11-03"] * n,
+                "reportDate": ["2023-09-30"] * n,
+                "acceptanceDateTime": ["2023-11-02T18:08:27.000Z"] * n,
+                "act": ["34"] * n,
+                "form": ["10-K"] * n,
+                "fileNumber": ["001-36743"] * n,
+                "filmNumber": ["231373899"] * n,
+                "items": [""] * n,
+                "size": [9000000] * n,
+                "isXBRL": [1] * n,
+                "isInlineXBRL": [1] * n,
+                "primaryDocument": ["aapl-20230930.htm"] * n,
+                "primaryDocDescription": ["10-K"] * n,
+            }
+        },
+    }
+
+
+def test_sync_only_refreshes_changed_companies(tmp_path, monkeypatch):
+    latest = ["0000320193-23-000106"]
+    fetched_facts = []
+    monkeypatch.setattr(
+        warehouse.utils, "get_json", lambda url: submissions(list(latest))
+    )
+
+    def fake_stream_content(url):
+        fetched_facts.append(url)
+        yield json.dumps(COMPANY_FACTS).encode()
+
+    monkeypatch.setattr(warehouse.utils, "stream_content", fake_stream_content)
+    db = warehouse.connect(tmp_path / "warehouse.sqlite")
+
+    result = warehouse.sync(db, [APPLE], workers=1)
+    assert result.updated == 1
+    assert len(fetched_facts) == 1
+
+    result = warehouse.sync(db, [APPLE], workers=1)
+    assert result.unchanged == 1
+    assert len(fetched_facts) == 1
+
+    latest.insert(0, "0000320193-24-000001")
+    result = warehouse.sync(db, [APPLE], workers=1)
+    assert result.updated == 1
+    assert len(fetched_facts) == 2
+
+    filings = warehouse.query(db, "SELECT * FROM filings WHERE cik = ?", [320193])
+    assert len(filings) == 2
+    facts = warehouse.query(
+        db, "SELECT tag, val, start, \"end\" FROM facts WHERE tag = 'Revenues'"
+    )
+    assert facts.to_dict("records") == [
+        {
+            "tag": "Revenues",
+            "val": 65225000000.0,
+            "start": "2009-09-27",
+            "end": "2010-09-25",
+        }
+    ]
+
+
+def test_sync_fetches_facts_skipped_by_an_earlier_sync(tmp_path, monkeypatch):
+    fetched_facts = []
+    monkeypatch.setattr(
+        warehouse.utils,
+        "get_json",
+        lambda url: submissions(["0000320193-23-000106"]),
+    )
+
+    def fake_stream_content(url):
+        fetched_facts.append(url)
+        yield json.dumps(COMPANY_FACTS).encode()
+
+    monkeypatch.setattr(warehouse.utils, "stream_content", fake_stream_content)
+    db = warehouse.connect(tmp_path / "warehouse.sqlite")
+
+    assert warehouse.sync(db, [APPLE], facts=False, workers=1).updated == 1
+    assert fetched_facts == []
+
+    assert warehouse.sync(db, [APPLE], workers=1).updated == 1
+    assert len(fetched_facts) == 1
+    assert warehouse.query(db, "SELECT COUNT(*) AS n FROM facts")["n"][0] > 0
+
+    assert warehouse.sync(db, [APPLE], workers=1).unchanged == 1
+    assert len(fetched_facts) == 1
+
+
+def test_store_without_accession_leaves_facts_unsynced(tmp_path):
+    db = warehouse.connect(tmp_path / "warehouse.sqlite")
+    facts_df = warehouse._read.normalize_facts(
+        warehouse.stream.iter_company_facts([json.dumps(COMPANY_FACTS).encode()]),
+        320193,
+    )
+    warehouse.store(db, 320193, facts_df=facts_df)
+    assert warehouse._sync_state(db, models.Dataset.facts) == {}
+
+
+def test_connect_migrates_the_old_sync_state(tmp_path):
+    path = tmp_path / "warehouse.sqlite"
+    db = warehouse.sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE sync_state (cik INTEGER PRIMARY KEY, last_accession TEXT, synced_at REAL)"
+    )
+    db.execute("INSERT INTO sync_state VALUES (320193, '0000320193-23-000106', 1.0)")
+    db.commit()
+    db.close()
+
+    db = warehouse.connect(path)
+    assert warehouse._sync_state(db, models.Dataset.submissions) == {
+        320193: "0000320193-23-000106"
+    }
+    assert warehouse._sync_state(db, models.Dataset.facts) == {}
+
+
+def test_store_keeps_a_filing_listed_by_several_companies(tmp_path):
+    db = warehouse.connect(tmp_path / "warehouse.sqlite")
+    df = warehouse._read.read_submissions(submissions(["0001067983-23-000001"]), [])
+    warehouse.store(db, 1067983, submissions=df)
+    warehouse.store(db, 320193, submissions=df)
+    filings = warehouse.query(
+        db,
+        "SELECT cik FROM filings WHERE accession_number = ? ORDER BY cik",
+        ["0001067983-23-000001"],
+    )
+    assert filings["cik"].tolist() == [320193, 1067983]
+
+
+def test_connect_migrates_the_old_filings_key(tmp_path):
+    path = tmp_path / "warehouse.sqlite"
+    db = warehouse.sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE filings (accession_number TEXT PRIMARY KEY, cik INTEGER NOT NULL, "
+        "form TEXT, filing_date TEXT, report_date TEXT, acceptance_datetime TEXT, "
+        "items TEXT, size INTEGER, is_xbrl INTEGER, is_inline_xbrl INTEGER, "
+        "primary_document TEXT, primary_doc_description TEXT)"
+    )
+    db.execute("INSERT INTO filings (accession_number, cik) VALUES ('a1', 320193)")
+    db.commit()
+    db.close()
+
+    db = warehouse.connect(path)
+    db.execute("INSERT INTO filings (accession_number, cik) VALUES ('a1', 1067983)")
+    assert warehouse.query(db, "SELECT COUNT(*) AS n FROM filings")["n"][0] == 2
+    indexes = {row[1] for row in db.execute("PRAGMA index_list(filings)")}
+    assert {"filings_accession", "filings_cik_date", "filings_form_date"} <= indexes